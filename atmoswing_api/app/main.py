@@ -3,15 +3,22 @@ logger = create_logger()
 
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from starlette.exceptions import HTTPException as StarletteHTTPException
+from atmoswing_api import config
 from atmoswing_api.__version__ import __version__
-from atmoswing_api.app.routes import meta, forecasts, aggregations, docs
+from atmoswing_api.app.routes import meta, forecasts, aggregations, batch, docs
+from atmoswing_api.app.utils import executors
+from atmoswing_api.app.utils.catalog import forecast_catalog
+from atmoswing_api.app.utils.compression import CompressionMiddleware
+from atmoswing_api.app.utils.conditional import ConditionalHeadersMiddleware
+from atmoswing_api.app.utils.watcher import forecast_watcher, make_invalidation_listener
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
 import traceback
+import asyncio
 import os
 
 app = FastAPI(
@@ -27,6 +34,13 @@ app.state.limiter = limiter
 # Add SlowAPI middleware for rate limiting
 app.add_middleware(SlowAPIMiddleware)
 
+# Add the ETag and Cache-Control headers of the forecast routes
+app.add_middleware(ConditionalHeadersMiddleware)
+
+# Compress the responses according to the Accept-Encoding header
+app.add_middleware(CompressionMiddleware,
+                   minimum_size=config.Settings().compression_minimum_size)
+
 # Configure CORS middleware -- disabled as it is not working as expected.
 #app.add_middleware(
 #    CORSMiddleware,
@@ -40,9 +54,12 @@ app.include_router(docs.router, tags=["Documentation"])
 app.include_router(meta.router, prefix="/meta", tags=["Metadata"])
 app.include_router(forecasts.router, prefix="/forecasts", tags=["Data from a single forecast"])
 app.include_router(aggregations.router, prefix="/aggregations", tags=["Aggregated forecast data"])
+app.include_router(batch.router, tags=["Batch requests"])
 
 @app.exception_handler(StarletteHTTPException)
 async def custom_http_exception_handler(request: Request, exc: StarletteHTTPException):
+    if exc.status_code == 304:
+        return Response(status_code=304, headers=exc.headers)
     if exc.status_code == 404:
         return JSONResponse(
             status_code=404,
@@ -76,3 +93,45 @@ async def check_redis_on_startup():
         logger.info("Redis reachable at %s:%s; caching enabled", os.getenv("REDIS_HOST", "localhost"), os.getenv("REDIS_PORT", 6379))
     except Exception as e:
         logger.warning("Redis unreachable; caching will be bypassed until Redis is available: %s", e)
+
+# FastAPI startup: keep the in-process caches of the workers coherent
+@app.on_event("startup")
+async def start_cache_invalidation_listener():
+    from atmoswing_api import cache
+    cache.start_invalidation_listener()
+
+@app.on_event("shutdown")
+async def stop_cache_invalidation_listener():
+    from atmoswing_api import cache
+    await cache.stop_invalidation_listener()
+
+# FastAPI startup: catalog the available forecasts so that metadata lookups do not
+# scan the data directory on every request
+@app.on_event("startup")
+async def build_forecast_catalog():
+    data_dir = config.Settings().data_dir
+    await asyncio.to_thread(forecast_catalog.build, data_dir)
+    logger.info("Forecast catalog built: %s", forecast_catalog.stats())
+
+# FastAPI startup: watch the data directory to invalidate the caches when forecasts
+# are added or rewritten, which allows keeping past forecasts cached for longer
+@app.on_event("startup")
+async def start_forecast_watcher():
+    settings = config.Settings()
+    if not settings.watch_data_dir:
+        return
+    from atmoswing_api import cache
+    forecast_watcher.add_listener(
+        make_invalidation_listener(settings.data_dir, warmup=settings.watcher_warmup))
+    forecast_watcher.start()
+    cache.enable_change_invalidation(settings.cache_ttl_watched)
+    logger.info("Watching %s for forecast changes", settings.data_dir)
+
+@app.on_event("shutdown")
+async def stop_forecast_watcher():
+    await forecast_watcher.stop()
+
+@app.on_event("shutdown")
+async def shutdown_executors():
+    logger.info("Executors: %s", executors.stats())
+    executors.shutdown(wait=False)
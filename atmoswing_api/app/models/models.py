@@ -1,10 +1,15 @@
 from pydantic import BaseModel, AfterValidator
-from typing import List, Optional, Annotated
+from typing import Any, Dict, List, Optional, Annotated
 from datetime import datetime
 
 
 def round_to(ndigits: int, /) -> AfterValidator:
-    return AfterValidator(lambda v: round(v, ndigits))
+    def _round(v):
+        return round(v, ndigits)
+
+    # Exposed for the fast JSON responses, which round whole lists with NumPy
+    _round.ndigits = ndigits
+    return AfterValidator(_round)
 
 
 class Parameters(BaseModel):
@@ -140,6 +145,29 @@ class AnalogValuesPercentilesResponse(BaseModel):
     values: List[Annotated[float, round_to(2)]]
 
 
+class AnalogValuesPercentilesHistoryResponse(BaseModel):
+    parameters: Parameters
+    percentiles: List[int]
+    forecast_dates: List[datetime]
+    lead_times: List[int]
+    values: List[List[Annotated[float, round_to(2)]]]
+
+
+class EntitiesAnalogValuesPercentilesResponse(BaseModel):
+    parameters: Parameters
+    percentiles: List[int]
+    entity_ids: List[int]
+    values: List[List[Annotated[float, round_to(2)]]]
+
+
+class EntitiesSeriesValuesPercentilesResponse(BaseModel):
+    parameters: Parameters
+    percentiles: List[int]
+    entity_ids: List[int]
+    target_dates: List[datetime]
+    series_values: List[List[List[Annotated[float, round_to(2)]]]]
+
+
 class SeriesSynthesisPerMethod(BaseModel):
     method_id: str
     target_dates: List[datetime]
@@ -162,3 +190,23 @@ class SeriesSynthesisTotal(BaseModel):
 class SeriesSynthesisTotalListResponse(BaseModel):
     parameters: Parameters
     series_percentiles: List[SeriesSynthesisTotal]
+
+
+class BatchItem(BaseModel):
+    id: str
+    path: str
+    params: Dict[str, Any] = {}
+
+
+class BatchRequest(BaseModel):
+    requests: List[BatchItem]
+
+
+class BatchItemResult(BaseModel):
+    status: int
+    data: Optional[Any] = None
+    detail: Optional[str] = None
+
+
+class BatchResponse(BaseModel):
+    results: Dict[str, BatchItemResult]
@@ -5,12 +5,13 @@ from fastapi import APIRouter, HTTPException, Depends, Query
 from atmoswing_api import config
 from atmoswing_api.cache import *
 from atmoswing_api.app.models.models import *
+from atmoswing_api.app.utils.responses import fast_json_response
 from atmoswing_api.app.services.aggregations import *
 from atmoswing_api.app.utils.utils import compute_cache_hash, make_cache_paths
+from atmoswing_api.app.utils.conditional import conditional_get
 import json
 from pathlib import Path
 
-router = APIRouter()
 debug = False
 
 
@@ -19,6 +20,10 @@ def get_settings():
     return config.Settings()
 
 
+# Answer 304 Not Modified to conditional requests before reading any forecast file
+router = APIRouter(dependencies=[Depends(conditional_get(get_settings))])
+
+
 # Helper function to check for a prebuilt JSON and return it if present
 def load_prebuilt_result(settings: config.Settings, func_name: str, region: str, forecast_date: str, percentile: int | None = None, normalize: int | None = None, **extra):
     prebuilt_dir = Path(settings.data_dir) / '.prebuilt_cache'
@@ -64,6 +69,7 @@ async def _handle_request(func, settings: config.Settings, region: str, **kwargs
             response_model=EntitiesValuesPercentileAggregationResponse,
             response_model_exclude_none=True)
 @redis_cache(ttl=3600)
+@fast_json_response(EntitiesValuesPercentileAggregationResponse)
 async def entities_analog_values_percentile(
         region: str,
         forecast_date: str,
@@ -91,6 +97,7 @@ async def entities_analog_values_percentile(
             response_model=SeriesSynthesisPerMethodListResponse,
             response_model_exclude_none=True)
 @redis_cache(ttl=3600)
+@fast_json_response(SeriesSynthesisPerMethodListResponse)
 async def series_synthesis_per_method(
         region: str,
         forecast_date: str,
@@ -114,6 +121,7 @@ async def series_synthesis_per_method(
             response_model=SeriesSynthesisTotalListResponse,
             response_model_exclude_none=True)
 @redis_cache(ttl=3600)
+@fast_json_response(SeriesSynthesisTotalListResponse)
 async def series_synthesis_total(
         region: str,
         forecast_date: str,
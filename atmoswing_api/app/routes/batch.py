@@ -0,0 +1,164 @@
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from contextlib import AsyncExitStack
+from functools import lru_cache
+from urllib.parse import urlencode
+
+from fastapi import APIRouter, HTTPException, Depends, Request
+from starlette.exceptions import HTTPException as StarletteHTTPException
+from starlette.routing import Match
+from typing_extensions import Annotated
+
+from atmoswing_api import config
+from atmoswing_api.app.models.models import BatchRequest, BatchResponse
+from atmoswing_api.app.utils import compression
+from atmoswing_api.app.utils.responses import fast_json_response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Path parameters identifying the forecast file read by a route
+FILE_PARAMS = ("region", "forecast_date", "method", "configuration")
+
+
+@lru_cache
+def get_settings():
+    return config.Settings()
+
+
+router = APIRouter()
+
+
+def _loads(body: bytes):
+    return orjson.loads(body) if orjson is not None else json.loads(body)
+
+
+def _build_scope(request: Request, path: str, params: dict) -> dict:
+    """ASGI scope of a sub-request, inheriting the connection of the batch request."""
+    path, _, query_string = path.partition("?")
+    if params:
+        query = urlencode(params, doseq=True)
+        query_string = f"{query_string}&{query}" if query_string else query
+    return {
+        "type": "http",
+        "asgi": request.scope.get("asgi", {"version": "3.0"}),
+        "http_version": request.scope.get("http_version", "1.1"),
+        "method": "GET",
+        "scheme": request.scope.get("scheme", "http"),
+        "server": request.scope.get("server"),
+        "client": request.scope.get("client"),
+        "root_path": request.scope.get("root_path", ""),
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query_string.encode(),
+        "headers": [(b"host", request.headers.get("host", "").encode())],
+        "app": request.app,
+        "state": {},
+        # Let the exception handlers of the app answer the errors of the routes
+        "starlette.exception_handlers": request.scope.get(
+            "starlette.exception_handlers"),
+    }
+
+
+def _get_file_key(request: Request, scope: dict) -> tuple | None:
+    """The forecast file parameters of the route matching a sub-request."""
+    for route in request.app.router.routes:
+        match, child_scope = route.matches(scope)
+        if match == Match.FULL:
+            path_params = child_scope.get("path_params", {})
+            if not any(name in path_params for name in FILE_PARAMS):
+                return None
+            return tuple(path_params.get(name) for name in FILE_PARAMS)
+    return None
+
+
+async def _execute(request: Request, scope: dict) -> dict:
+    """Run a sub-request through the router of the app and collect its response."""
+    response = {"status": 500, "body": []}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            response["body"].append(message.get("body", b""))
+
+    try:
+        # Normally provided by the middleware stack of the app, which is bypassed
+        async with AsyncExitStack() as stack:
+            scope["fastapi_middleware_astack"] = stack
+            await request.app.router(scope, receive, send)
+    except StarletteHTTPException as e:
+        return {"status": e.status_code, "detail": str(e.detail)}
+    except Exception as e:
+        logging.error(f"Batch sub-request {scope['path']} failed: {e}")
+        return {"status": 500, "detail": "Internal server error."}
+
+    body = b"".join(response["body"])
+    try:
+        content = _loads(body) if body else None
+    except ValueError:
+        content = body.decode("utf-8", errors="replace")
+    if response["status"] == 200:
+        return {"status": 200, "data": content}
+    if isinstance(content, dict) and "detail" in content:
+        content = content["detail"]
+    return {"status": response["status"], "detail": str(content)}
+
+
+async def _execute_group(request: Request, items: list[tuple[str, dict]]) -> dict:
+    """
+    Run the sub-requests reading the same forecast file: the first one opens the
+    dataset and builds the file index, which the others then share concurrently.
+    """
+    results = {items[0][0]: await _execute(request, items[0][1])}
+    others = await asyncio.gather(*(_execute(request, scope)
+                                    for _, scope in items[1:]))
+    results.update((item_id, result) for (item_id, _), result in zip(items[1:], others))
+    return results
+
+
+@router.post("/batch",
+             summary="Execute several data requests at once",
+             response_model=BatchResponse,
+             response_model_exclude_none=True)
+@fast_json_response(BatchResponse)
+async def batch(
+        request: Request,
+        body: BatchRequest,
+        settings: Annotated[config.Settings, Depends(get_settings)]):
+    """
+    Execute several GET requests of the API (e.g. /forecasts/adn/latest/...) in a single call. The sub-requests are grouped by forecast file and executed concurrently, and their results (or errors) are returned by request ID.
+    """
+    if len(body.requests) > settings.batch_max_requests:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many requests ({len(body.requests)} > "
+                   f"{settings.batch_max_requests})")
+    ids = [item.id for item in body.requests]
+    if len(set(ids)) != len(ids):
+        raise HTTPException(status_code=400, detail="Duplicate request IDs")
+
+    # Group the sub-requests by forecast file
+    groups = defaultdict(list)
+    for item in body.requests:
+        scope = _build_scope(request, item.path, item.params)
+        key = _get_file_key(request, scope) or (item.id,)
+        groups[key].append((item.id, scope))
+
+    # The sub-responses are returned uncompressed, whatever the batch request accepts
+    with compression.accepted_encodings(None):
+        group_results = await asyncio.gather(
+            *(_execute_group(request, items) for items in groups.values()))
+
+    results = {}
+    for group_result in group_results:
+        results.update(group_result)
+
+    return {"results": {item_id: results[item_id] for item_id in ids}}
@@ -7,9 +7,10 @@ from typing_extensions import Annotated
 from atmoswing_api import config
 from atmoswing_api.cache import *
 from atmoswing_api.app.models.models import *
+from atmoswing_api.app.utils.responses import fast_json_response
 from atmoswing_api.app.services.forecasts import *
+from atmoswing_api.app.utils.conditional import conditional_get
 
-router = APIRouter()
 debug = False
 
 
@@ -18,6 +19,10 @@ def get_settings():
     return config.Settings()
 
 
+# Answer 304 Not Modified to conditional requests before reading any forecast file
+router = APIRouter(dependencies=[Depends(conditional_get(get_settings))])
+
+
 # Helper function to handle requests and catch exceptions
 async def _handle_request(func, settings: config.Settings, region: str, **kwargs):
     try:
@@ -37,11 +42,24 @@ async def _handle_request(func, settings: config.Settings, region: str, **kwargs
         raise HTTPException(status_code=500, detail=f"Internal Server Error ({e})")
 
 
+def _parse_entities(entities: List[str]) -> List[int] | None:
+    """Parse the entity IDs of a request ('all', or IDs possibly comma-separated)."""
+    ids = [item.strip() for value in entities for item in value.split(",")
+           if item.strip()]
+    if not ids or "all" in ids:
+        return None
+    try:
+        return [int(x) for x in ids]
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid entity IDs ({entities})")
+
+
 @router.get("/{region}/{forecast_date}/{method}/{configuration}/{lead_time}/analog-dates",
             summary="Analog dates for a given forecast and target date",
             response_model=AnalogDatesResponse,
             response_model_exclude_none=True)
 @redis_cache(ttl=3600)
+@fast_json_response(AnalogDatesResponse)
 async def analog_dates(
         region: str,
         forecast_date: str,
@@ -62,6 +80,7 @@ async def analog_dates(
             response_model=AnalogCriteriaResponse,
             response_model_exclude_none=True)
 @redis_cache(ttl=3600)
+@fast_json_response(AnalogCriteriaResponse)
 async def analog_criteria(
         region: str,
         forecast_date: str,
@@ -82,6 +101,7 @@ async def analog_criteria(
             response_model=EntitiesValuesPercentileResponse,
             response_model_exclude_none=True)
 @redis_cache(ttl=3600)
+@fast_json_response(EntitiesValuesPercentileResponse)
 async def entities_analog_values_percentile(
         region: str,
         forecast_date: str,
@@ -100,11 +120,61 @@ async def entities_analog_values_percentile(
                                  percentile=percentile, normalize=normalize)
 
 
+@router.get("/{region}/{forecast_date}/{method}/{configuration}/{lead_time}/entities-analog-values-percentiles",
+            summary="Values for several entities for the given quantiles, forecast and target date",
+            response_model=EntitiesAnalogValuesPercentilesResponse,
+            response_model_exclude_none=True)
+@redis_cache(ttl=3600)
+@fast_json_response(EntitiesAnalogValuesPercentilesResponse)
+async def entities_analog_values_percentiles(
+        region: str,
+        forecast_date: str,
+        method: str,
+        configuration: str,
+        lead_time: int|str,
+        settings: Annotated[config.Settings, Depends(get_settings)],
+        entities: List[str] = Query(["all"]),
+        percentiles: List[int] = Query([20, 60, 90])):
+    """
+    Get the precipitation values for the provided percentiles and for a given region, forecast date, method, configuration, lead time, and list of entities ('all' for every entity).
+    """
+    return await _handle_request(get_entities_analog_values_percentiles, settings,
+                                 region, forecast_date=forecast_date, method=method,
+                                 configuration=configuration,
+                                 entities=_parse_entities(entities),
+                                 lead_time=lead_time, percentiles=percentiles)
+
+
+@router.get("/{region}/{forecast_date}/{method}/{configuration}/entities-series-values-percentiles",
+            summary="Time series for several entities for the given quantiles and forecast",
+            response_model=EntitiesSeriesValuesPercentilesResponse,
+            response_model_exclude_none=True)
+@redis_cache(ttl=3600)
+@fast_json_response(EntitiesSeriesValuesPercentilesResponse)
+async def entities_series_analog_values_percentiles(
+        region: str,
+        forecast_date: str,
+        method: str,
+        configuration: str,
+        settings: Annotated[config.Settings, Depends(get_settings)],
+        entities: List[str] = Query(["all"]),
+        percentiles: List[int] = Query([20, 60, 90])):
+    """
+    Get the precipitation time series for the provided percentiles and for a given region, forecast date, method, configuration, and list of entities ('all' for every entity).
+    """
+    return await _handle_request(get_entities_series_analog_values_percentiles,
+                                 settings, region, forecast_date=forecast_date,
+                                 method=method, configuration=configuration,
+                                 entities=_parse_entities(entities),
+                                 percentiles=percentiles)
+
+
 @router.get("/{region}/{forecast_date}/{method}/{configuration}/{entity}/reference-values",
             summary="Reference values (e.g. for different return periods) for a given entity",
             response_model=ReferenceValuesResponse,
             response_model_exclude_none=True)
 @redis_cache(ttl=3600)
+@fast_json_response(ReferenceValuesResponse)
 async def reference_values(
         region: str,
         forecast_date: str,
@@ -125,6 +195,7 @@ async def reference_values(
             response_model=SeriesAnalogValuesResponse,
             response_model_exclude_none=True)
 @redis_cache(ttl=3600)
+@fast_json_response(SeriesAnalogValuesResponse)
 async def series_analog_values_best(
         region: str,
         forecast_date: str,
@@ -147,6 +218,7 @@ async def series_analog_values_best(
             response_model=SeriesValuesPercentilesResponse,
             response_model_exclude_none=True)
 @redis_cache(ttl=3600)
+@fast_json_response(SeriesValuesPercentilesResponse)
 async def series_analog_values_percentiles(
         region: str,
         forecast_date: str,
@@ -169,6 +241,7 @@ async def series_analog_values_percentiles(
             response_model=SeriesValuesPercentilesHistoryResponse,
             response_model_exclude_none=True)
 @redis_cache(ttl=3600)
+@fast_json_response(SeriesValuesPercentilesHistoryResponse)
 async def series_analog_values_percentiles_history(
         region: str,
         forecast_date: str,
@@ -192,6 +265,7 @@ async def series_analog_values_percentiles_history(
             response_model=AnalogsResponse,
             response_model_exclude_none=True)
 @redis_cache(ttl=3600)
+@fast_json_response(AnalogsResponse)
 async def analogs(
         region: str,
         forecast_date: str,
@@ -214,6 +288,7 @@ async def analogs(
             response_model=AnalogValuesResponse,
             response_model_exclude_none=True)
 @redis_cache(ttl=3600)
+@fast_json_response(AnalogValuesResponse)
 async def analog_values(
         region: str,
         forecast_date: str,
@@ -236,6 +311,7 @@ async def analog_values(
             response_model=AnalogValuesPercentilesResponse,
             response_model_exclude_none=True)
 @redis_cache(ttl=3600)
+@fast_json_response(AnalogValuesPercentilesResponse)
 async def analog_values_percentiles(
         region: str,
         forecast_date: str,
@@ -254,11 +330,38 @@ async def analog_values_percentiles(
                                  lead_time=lead_time, percentiles=percentiles)
 
 
+@router.get("/{region}/{forecast_date}/{method}/{configuration}/{entity}/{lead_time}/analog-values-percentiles-history",
+            summary="Values from the current and past forecasts (lagged forecasts) for one entity, the given quantiles and a fixed target date",
+            response_model=AnalogValuesPercentilesHistoryResponse,
+            response_model_exclude_none=True)
+@redis_cache(ttl=3600)
+@fast_json_response(AnalogValuesPercentilesHistoryResponse)
+async def analog_values_percentiles_history(
+        region: str,
+        forecast_date: str,
+        method: str,
+        configuration: str,
+        entity: int,
+        lead_time: int|str,
+        settings: Annotated[config.Settings, Depends(get_settings)],
+        percentiles: List[int] = Query([20, 60, 90]),
+        number: int = 5):
+    """
+    Get the precipitation values for the provided percentiles that the given forecast and the previous ones predicted for the same target date, for a given region, method, configuration, and entity.
+    """
+    return await _handle_request(get_lagged_analog_values_percentiles, settings,
+                                 region, forecast_date=forecast_date, method=method,
+                                 configuration=configuration, entity=entity,
+                                 lead_time=lead_time, percentiles=percentiles,
+                                 number=number)
+
+
 @router.get("/{region}/{forecast_date}/{method}/{configuration}/{entity}/{lead_time}/analog-values-best",
             summary="Values for one entity for a given quantile, forecast and target date",
             response_model=AnalogValuesResponse,
             response_model_exclude_none=True)
 @redis_cache(ttl=3600)
+@fast_json_response(AnalogValuesResponse)
 async def analog_values_best(
         region: str,
         forecast_date: str,
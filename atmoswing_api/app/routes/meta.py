@@ -11,17 +11,20 @@ from atmoswing_api.app.services.meta import get_last_forecast_date, \
     get_relevant_entities_list, has_forecast_date
 from atmoswing_api.app.models.models import *
 from atmoswing_api.app.utils.utils import sanitize_unicode_surrogates, compute_cache_hash, make_cache_paths
+from atmoswing_api.app.utils.conditional import conditional_get
 import json
 from pathlib import Path
 
-router = APIRouter()
-
 
 @lru_cache
 def get_settings():
     return config.Settings()
 
 
+# Answer 304 Not Modified to conditional requests before reading any forecast file
+router = APIRouter(dependencies=[Depends(conditional_get(get_settings))])
+
+
 # Helper to load prebuilt cache if available
 def load_prebuilt_result(settings: config.Settings, func_name: str, region: str, forecast_date: str):
     prebuilt_dir = Path(settings.data_dir) / '.prebuilt_cache'
@@ -1,11 +1,9 @@
 import os
-import glob
 
-import xarray as xr
 import numpy as np
-import asyncio
 
-from atmoswing_api.app.utils import utils
+from atmoswing_api.app.utils import utils, bundle, executors, forecast_index, \
+    percentile_sidecar
 
 
 async def get_entities_analog_values_percentile(
@@ -15,7 +13,7 @@ async def get_entities_analog_values_percentile(
     Get the precipitation values for a given region, date, method, configuration,
     target date, and percentile.
     """
-    return await asyncio.to_thread(_get_entities_analog_values_percentile,
+    return await executors.run_cpu(_get_entities_analog_values_percentile,
                                    data_dir, region, forecast_date, method,
                                    lead_time, percentile, normalize)
 
@@ -26,7 +24,7 @@ async def get_series_synthesis_per_method(
     """
     Get the largest values per method for a given region, date, and percentile.
     """
-    return await asyncio.to_thread(_get_series_synthesis_per_method, data_dir, region,
+    return await executors.run_cpu(_get_series_synthesis_per_method, data_dir, region,
                                    forecast_date, percentile, normalize)
 
 
@@ -36,7 +34,7 @@ async def get_series_synthesis_total(
     """
     Get the largest values for a given region, date, and percentile.
     """
-    return await asyncio.to_thread(_get_series_synthesis_total, data_dir, region,
+    return await executors.run_cpu(_get_series_synthesis_total, data_dir, region,
                                    forecast_date, percentile, normalize)
 
 
@@ -51,11 +49,11 @@ def _get_entities_analog_values_percentile(
         forecast_date = utils.get_last_forecast_date(data_dir, region)
 
     region_path = utils.check_region_path(data_dir, region)
-    pattern = utils.get_files_pattern(region_path, forecast_date, method)
-    files = sorted(glob.glob(pattern))
+    files = utils.list_files(region_path, forecast_date, method)
 
     if not files:
-        raise FileNotFoundError(f"No files found for pattern: {pattern}")
+        raise FileNotFoundError(f"No files found for date: {forecast_date} "
+                                f"(method: {method})")
 
     target_date = utils.convert_to_target_date(forecast_date, lead_time)
 
@@ -65,16 +63,17 @@ def _get_entities_analog_values_percentile(
 
     for file_path in files:
 
-        with xr.open_dataset(file_path, engine="h5netcdf") as ds:
+        with bundle.open_dataset(file_path) as ds:
+            index = forecast_index.get_index(file_path, ds)
             # Select the relevant stations
             if all_station_ids is None:
-                all_station_ids = ds.station_ids.values.tolist()
+                all_station_ids = list(index.station_ids)
             else:
-                assert all_station_ids == ds.station_ids.values.tolist()
-            station_indices = utils.get_relevant_stations_idx(ds)
+                assert all_station_ids == index.station_ids
+            station_indices = index.relevant_station_idx
 
             # Extracting the values
-            row_indices = utils.get_row_indices(ds, target_date)
+            row_indices = index.get_row_indices(target_date)
             if row_indices is None:
                 values = []
                 values_normalized = []
@@ -84,20 +83,19 @@ def _get_entities_analog_values_percentile(
                 if values is None:
                     values = np.ones((len(all_station_ids),)) * np.nan
                     values_normalized = np.ones((len(all_station_ids),)) * np.nan
-                analog_values = ds.analog_values_raw[station_indices, start_idx:end_idx].astype(float).values
-                values_sorted = np.sort(analog_values, axis=1)
+                grid = percentile_sidecar.get_percentiles(file_path, [percentile])
+                if grid is not None:
+                    lead_time_idx, _ = index.get_target_date_index(target_date)
+                    values[station_indices] = grid[station_indices, lead_time_idx, 0]
+                else:
+                    analog_values = ds.analog_values_raw[station_indices, start_idx:end_idx].astype(float).values
 
-                # Compute the percentiles
-                n_entities = values_sorted.shape[0]
-                n_analogs = values_sorted.shape[1]
-                freq = utils.build_cumulative_frequency(n_analogs)
-
-                # Store in the values array
-                values[station_indices] = [float(np.interp(percentile / 100, freq, values_sorted[i, :])) for i in
-                          range(n_entities)]
+                    # Compute the percentiles and store in the values array
+                    values[station_indices] = utils.compute_analog_percentiles(
+                        analog_values, [end_idx - start_idx], [percentile])[:, 0, 0]
 
                 # Normalize the values
-                ref_values = _get_reference_values(ds, normalize, station_indices)
+                ref_values = _get_reference_values(ds, index, normalize, station_indices)
                 values_normalized[station_indices] = values[station_indices] / ref_values
 
     if isinstance(values, np.ndarray):
@@ -131,19 +129,19 @@ def _get_series_synthesis_per_method(data_dir: str, region: str, forecast_date:
         forecast_date = utils.get_last_forecast_date(data_dir, region)
 
     region_path = utils.check_region_path(data_dir, region)
-    pattern = utils.get_files_pattern(region_path, forecast_date)
-    files = sorted(glob.glob(pattern))
+    files = utils.list_files(region_path, forecast_date)
 
     if not files:
-        raise FileNotFoundError(f"No files found for pattern: {pattern}")
+        raise FileNotFoundError(f"No files found for date: {forecast_date}")
 
     method_ids = []
     largest_values = []
 
     for file_path in files:
 
-        with xr.open_dataset(file_path, engine="h5netcdf") as ds:
-            analogs_nb = ds.analogs_nb.values
+        with bundle.open_dataset(file_path) as ds:
+            index = forecast_index.get_index(file_path, ds)
+            lead_times_nb = index.lead_times_nb
 
             # Select the relevant method
             method_id = ds.method_id
@@ -151,47 +149,38 @@ def _get_series_synthesis_per_method(data_dir: str, region: str, forecast_date:
                 method_ids.append(method_id)
                 largest_values.append({
                     "method_id": method_id,
-                    "target_dates": [np.datetime64(date).astype('datetime64[s]').item()
-                                     for date in ds.target_dates.values],
-                    "values": np.zeros((len(analogs_nb),)).astype(float).tolist(),
-                    "values_normalized": np.zeros((len(analogs_nb),)).astype(float).tolist()
+                    "target_dates": list(index.target_dates),
+                    "values": np.zeros((lead_times_nb,)).astype(float).tolist(),
+                    "values_normalized": np.zeros((lead_times_nb,)).astype(float).tolist()
                 })
             method_idx = method_ids.index(method_id)
 
             # Select the relevant stations
-            station_indices = utils.get_relevant_stations_idx(ds)
+            station_indices = index.relevant_station_idx
 
-            # Extracting the values
-            for lead_time_idx in range(len(analogs_nb)):
-                start_idx = int(np.sum(analogs_nb[:lead_time_idx]))
-                end_idx = start_idx + int(analogs_nb[lead_time_idx])
-                analog_values = ds.analog_values_raw[station_indices, start_idx:end_idx].astype(
-                    float).values
-                values_sorted = np.sort(analog_values, axis=1)
-
-                # Compute the percentiles
-                n_entities = values_sorted.shape[0]
-                n_analogs = values_sorted.shape[1]
-                freq = utils.build_cumulative_frequency(n_analogs)
-
-                # Store in the values array
-                values_percentile = [
-                    float(np.interp(percentile / 100, freq, values_sorted[i, :])) for i
-                    in range(n_entities)]
+            # Compute the percentiles for all stations and lead times
+            grid = percentile_sidecar.get_percentiles(file_path, [percentile])
+            if grid is not None:
+                values_percentile = grid[station_indices, :, 0]
+            else:
+                analog_values = ds.analog_values_raw[station_indices, :].astype(float).values
+                values_percentile = utils.compute_analog_percentiles(
+                    analog_values, index.analogs_nb, [percentile])[:, :, 0]
 
-                # Normalize the values
-                ref_values = _get_reference_values(ds, normalize, station_indices)
-                values_normalized = np.array(values_percentile) / ref_values
+            # Normalize the values
+            ref_values = _get_reference_values(ds, index, normalize, station_indices)
+            values_normalized = values_percentile / ref_values[:, np.newaxis]
 
-                # Store the largest values
-                largest_values[method_idx]["values"][lead_time_idx] = float(max(
-                    largest_values[method_idx]["values"][lead_time_idx],
-                    np.max(values_percentile)))
+            # Store the largest values (NaNs are ignored)
+            method_values = largest_values[method_idx]
+            method_values["values"] = np.fmax(
+                method_values["values"],
+                np.max(values_percentile, axis=0)).tolist()
 
-                # Store the normalized values
-                largest_values[method_idx]["values_normalized"][lead_time_idx] = float(max(
-                    largest_values[method_idx]["values_normalized"][lead_time_idx],
-                    np.max(values_normalized)))
+            # Store the normalized values
+            method_values["values_normalized"] = np.fmax(
+                method_values["values_normalized"],
+                np.max(values_normalized, axis=0)).tolist()
 
     return {
         "parameters": {
@@ -274,13 +263,8 @@ def _get_series_synthesis_total(data_dir: str, region: str, forecast_date: str,
     }
 
 
-def _get_reference_values(ds, normalize, station_indices):
-    axis = ds.reference_axis.values.tolist()
-    try:
-        ref_idx = axis.index(normalize)
-    except ValueError:
-        raise ValueError(f"normalize must be in {axis}")
-
+def _get_reference_values(ds, index, normalize, station_indices):
+    ref_idx = index.get_reference_index(normalize)
     ref_values = ds.reference_values[station_indices, ref_idx].astype(
         float).values
 
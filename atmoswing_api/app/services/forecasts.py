@@ -1,10 +1,12 @@
+import asyncio
 import os
+from datetime import datetime
 
-import xarray as xr
 import numpy as np
-import asyncio
 
-from atmoswing_api.app.utils import utils
+from atmoswing_api.app.utils import utils, array_mirror, executors, forecast_index, \
+    percentile_sidecar, history_store
+from atmoswing_api.app.utils.catalog import forecast_catalog
 
 
 async def get_reference_values(data_dir: str, region: str, forecast_date: str,
@@ -13,8 +15,8 @@ async def get_reference_values(data_dir: str, region: str, forecast_date: str,
     Get the reference values (e.g. for different return periods) for a given region,
     forecast date, method, configuration, and entity.
     """
-    return await asyncio.to_thread(_get_reference_values, data_dir, region,
-                                   forecast_date, method, configuration, entity)
+    return await executors.run_io(_get_reference_values, data_dir, region,
+                                  forecast_date, method, configuration, entity)
 
 
 async def get_analogs(data_dir: str, region: str, forecast_date: str, method: str,
@@ -23,8 +25,8 @@ async def get_analogs(data_dir: str, region: str, forecast_date: str, method: st
     Get the analogs for a given region, forecast date, method, configuration, entity,
     and target date.
     """
-    return await asyncio.to_thread(_get_analogs, data_dir, region, forecast_date,
-                                   method, configuration, entity, lead_time)
+    return await executors.run_io(_get_analogs, data_dir, region, forecast_date,
+                                  method, configuration, entity, lead_time)
 
 
 async def get_analog_dates(data_dir: str, region: str, forecast_date: str, method: str,
@@ -33,8 +35,8 @@ async def get_analog_dates(data_dir: str, region: str, forecast_date: str, metho
     Get the analog dates for a given region, date, method, configuration,
     and target date.
     """
-    return await asyncio.to_thread(_get_analog_dates, data_dir, region, forecast_date,
-                                   method, configuration, lead_time)
+    return await executors.run_io(_get_analog_dates, data_dir, region, forecast_date,
+                                  method, configuration, lead_time)
 
 
 async def get_analog_criteria(data_dir: str, region: str, forecast_date: str,
@@ -43,8 +45,8 @@ async def get_analog_criteria(data_dir: str, region: str, forecast_date: str,
     Get the analog criteria for a given region, date, method, configuration,
     and target date.
     """
-    return await asyncio.to_thread(_get_analog_criteria, data_dir, region,
-                                   forecast_date, method, configuration, lead_time)
+    return await executors.run_io(_get_analog_criteria, data_dir, region,
+                                  forecast_date, method, configuration, lead_time)
 
 
 async def get_analog_values(data_dir: str, region: str, forecast_date: str, method: str,
@@ -53,8 +55,8 @@ async def get_analog_values(data_dir: str, region: str, forecast_date: str, meth
     Get the precipitation values for a given region, date, method, configuration,
     and entity.
     """
-    return await asyncio.to_thread(_get_analog_values, data_dir, region, forecast_date,
-                                   method, configuration, entity, lead_time)
+    return await executors.run_io(_get_analog_values, data_dir, region, forecast_date,
+                                  method, configuration, entity, lead_time)
 
 
 async def get_analog_values_percentiles(
@@ -64,9 +66,9 @@ async def get_analog_values_percentiles(
     Get the precipitation values for specific percentiles for a given region, date,
     method, configuration, and entity.
     """
-    return await asyncio.to_thread(_get_analog_values_percentiles, data_dir, region,
-                                   forecast_date, method, configuration, entity,
-                                   lead_time, percentiles)
+    return await executors.run_io(_get_analog_values_percentiles, data_dir, region,
+                                  forecast_date, method, configuration, entity,
+                                  lead_time, percentiles)
 
 
 async def get_analog_values_best(
@@ -76,9 +78,21 @@ async def get_analog_values_best(
     Get the precipitation values for the best analogs for a given region, date, method,
     configuration, and entity.
     """
-    return await asyncio.to_thread(_get_analog_values_best, data_dir, region,
-                                   forecast_date, method, configuration, entity,
-                                   lead_time, number)
+    return await executors.run_io(_get_analog_values_best, data_dir, region,
+                                  forecast_date, method, configuration, entity,
+                                  lead_time, number)
+
+
+async def get_entities_analog_values_percentiles(
+        data_dir: str, region: str, forecast_date: str, method: str, configuration: str,
+        entities: list[int] | None, lead_time: int | str, percentiles: list[int]):
+    """
+    Get the precipitation values for specific percentiles for a given region, date,
+    method, configuration, and several entities (all of them if None).
+    """
+    return await executors.run_io(_get_entities_analog_values_percentiles, data_dir,
+                                  region, forecast_date, method, configuration,
+                                  entities, lead_time, percentiles)
 
 
 async def get_entities_analog_values_percentile(
@@ -88,9 +102,9 @@ async def get_entities_analog_values_percentile(
     Get the precipitation values for a given region, date, method, configuration,
     target date, and percentile.
     """
-    return await asyncio.to_thread(_get_entities_analog_values_percentile, data_dir,
-                                   region, forecast_date, method, configuration,
-                                   lead_time, percentile, normalize)
+    return await executors.run_io(_get_entities_analog_values_percentile, data_dir,
+                                  region, forecast_date, method, configuration,
+                                  lead_time, percentile, normalize)
 
 
 async def get_series_analog_values_best(
@@ -100,8 +114,8 @@ async def get_series_analog_values_best(
     Get the time series of the best analog values for a given region, date, method,
     configuration, and entity.
     """
-    return await asyncio.to_thread(_get_series_analog_values_best, data_dir, region,
-                                   forecast_date, method, configuration, entity, number)
+    return await executors.run_io(_get_series_analog_values_best, data_dir, region,
+                                  forecast_date, method, configuration, entity, number)
 
 
 async def get_series_analog_values_percentiles(
@@ -111,9 +125,21 @@ async def get_series_analog_values_percentiles(
     Get the time series for specific percentiles for a given region, date, method,
     configuration, and entity.
     """
-    return await asyncio.to_thread(_get_series_analog_values_percentiles, data_dir,
-                                   region, forecast_date, method, configuration, entity,
-                                   percentiles)
+    return await executors.run_io(_get_series_analog_values_percentiles, data_dir,
+                                  region, forecast_date, method, configuration, entity,
+                                  percentiles)
+
+
+async def get_entities_series_analog_values_percentiles(
+        data_dir: str, region: str, forecast_date: str, method: str, configuration: str,
+        entities: list[int] | None, percentiles: list[int]):
+    """
+    Get the time series for specific percentiles for a given region, date, method,
+    configuration, and several entities (all of them if None).
+    """
+    return await executors.run_io(_get_entities_series_analog_values_percentiles,
+                                  data_dir, region, forecast_date, method,
+                                  configuration, entities, percentiles)
 
 
 async def get_series_analog_values_percentiles_history(
@@ -121,11 +147,103 @@ async def get_series_analog_values_percentiles_history(
         entity: int, percentiles: list[int], number: int):
     """
     Get the time series for historical percentiles for a given region, date, method,
-    configuration, entity, and number of past forecasts.
+    configuration, entity, and number of past forecasts. The past forecasts are
+    read from the history store, or concurrently from the files when not stored.
+    """
+    forecast_date, past_forecasts = await executors.run_io(
+        _get_past_forecast_files, data_dir, region, forecast_date, method,
+        configuration, number)
+    forecasts = await _read_past_series_analog_values_percentiles(
+        data_dir, region, method, configuration, entity, past_forecasts, percentiles)
+
+    return {
+        "parameters": {
+            "region": region,
+            "forecast_date": utils.convert_to_datetime(forecast_date),
+            "method": method,
+            "configuration": configuration,
+            "entity_id": entity,
+            "percentiles": percentiles,
+            "number": number
+        },
+        "past_forecasts": list(forecasts)
+    }
+
+
+async def get_lagged_analog_values_percentiles(
+        data_dir: str, region: str, forecast_date: str, method: str, configuration: str,
+        entity: int, lead_time: int | str, percentiles: list[int], number: int):
+    """
+    Get the precipitation values for specific percentiles that the given forecast
+    and the previous ones predicted for the same target date (lagged forecasts),
+    for a given region, method, configuration, and entity.
+    """
+    forecast_date, past_forecasts = await executors.run_io(
+        _get_past_forecast_files, data_dir, region, forecast_date, method,
+        configuration, number, True)
+    target_date = utils.convert_to_target_date(forecast_date, lead_time)
+    forecasts = await _read_past_series_analog_values_percentiles(
+        data_dir, region, method, configuration, entity, past_forecasts, percentiles)
+
+    # Keep the runs covering the target date
+    forecast_dates = []
+    lead_times = []
+    values = []
+    for forecast in forecasts:
+        if target_date not in forecast["target_dates"]:
+            continue
+        idx = forecast["target_dates"].index(target_date)
+        forecast_dates.append(forecast["forecast_date"])
+        lead_times.append(utils.compute_lead_time(forecast["forecast_date"],
+                                                  target_date))
+        values.append([pc["series_values"][idx]
+                       for pc in forecast["series_percentiles"]])
+
+    return {
+        "parameters": {
+            "region": region,
+            "forecast_date": utils.convert_to_datetime(forecast_date),
+            "target_date": target_date,
+            "lead_time": utils.compute_lead_time(forecast_date, target_date),
+            "method": method,
+            "configuration": configuration,
+            "entity_id": entity,
+            "percentiles": percentiles,
+            "number": number
+        },
+        "percentiles": percentiles,
+        "forecast_dates": forecast_dates,
+        "lead_times": lead_times,
+        "values": values
+    }
+
+
+async def _read_past_series_analog_values_percentiles(
+        data_dir: str, region: str, method: str, configuration: str, entity: int,
+        past_forecasts: list[tuple[datetime, str]], percentiles: list[int]):
+    """
+    Get the time series for specific percentiles of several forecasts, from the
+    history store when available, otherwise from the files (concurrently).
     """
-    return await asyncio.to_thread(_get_series_analog_values_percentiles_history,
-                                   data_dir, region, forecast_date, method,
-                                   configuration, entity, percentiles, number)
+    stored = await executors.run_io(
+        history_store.read_entity_history, data_dir, region, method, configuration,
+        entity, past_forecasts, percentiles)
+    read = await asyncio.gather(
+        *(executors.run_io(_read_series_analog_values_percentiles, file_path, dt,
+                           entity, percentiles)
+          for dt, file_path in past_forecasts if dt not in stored))
+    read = iter(read)
+
+    forecasts = []
+    for dt, _ in past_forecasts:
+        if dt in stored:
+            target_dates, series_values = stored[dt]
+            forecasts.append(_format_series_percentiles(
+                dt, target_dates, series_values, percentiles))
+        else:
+            forecasts.append(next(read))
+
+    return forecasts
 
 
 def _get_reference_values(data_dir: str, region: str, forecast_date: str, method: str,
@@ -141,9 +259,10 @@ def _get_reference_values(data_dir: str, region: str, forecast_date: str, method
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"File not found: {file_path}")
 
-    with xr.open_dataset(file_path, engine="h5netcdf") as ds:
-        entity_idx = utils.get_entity_index(ds, entity)
-        axis = ds.reference_axis.values.tolist()
+    with array_mirror.open_dataset(file_path) as ds:
+        index = forecast_index.get_index(file_path, ds)
+        entity_idx = index.get_entity_index(entity)
+        axis = list(index.reference_axis)
         values = ds.reference_values[entity_idx, :].astype(float).values.tolist()
 
     return {
@@ -174,15 +293,17 @@ def _get_analogs(data_dir: str, region: str, forecast_date: str, method: str,
 
     target_date = utils.convert_to_target_date(forecast_date, lead_time)
 
-    with xr.open_dataset(file_path, engine="h5netcdf") as ds:
-        entity_idx = utils.get_entity_index(ds, entity)
-        row_indices = utils.get_row_indices(ds, target_date)
+    with array_mirror.open_dataset(file_path) as ds:
+        index = forecast_index.get_index(file_path, ds)
+        entity_idx = index.get_entity_index(entity)
+        row_indices = index.get_row_indices(target_date)
         if row_indices is None:
             analogs = []
         else:
             start_idx, end_idx, target_date = row_indices
-            analog_dates = [date.astype('datetime64[s]').item() for date in
-                            ds.analog_dates.values[start_idx:end_idx]]
+            analog_dates = utils.decode_dates(
+                ds.analog_dates[start_idx:end_idx].values,
+                ds.analog_dates.attrs["units"]).tolist()
             analog_criteria = ds.analog_criteria[start_idx:end_idx].astype(
                 float).values.tolist()
             values = ds.analog_values_raw[entity_idx, start_idx:end_idx].astype(
@@ -221,14 +342,16 @@ def _get_analog_dates(data_dir: str, region: str, forecast_date: str, method: st
 
     target_date = utils.convert_to_target_date(forecast_date, lead_time)
 
-    with xr.open_dataset(file_path, engine="h5netcdf") as ds:
-        row_indices = utils.get_row_indices(ds, target_date)
+    with array_mirror.open_dataset(file_path) as ds:
+        index = forecast_index.get_index(file_path, ds)
+        row_indices = index.get_row_indices(target_date)
         if row_indices is None:
             analog_dates = []
         else:
             start_idx, end_idx, target_date = row_indices
-            analog_dates = [date.astype('datetime64[s]').item() for date in
-                            ds.analog_dates.values[start_idx:end_idx]]
+            analog_dates = utils.decode_dates(
+                ds.analog_dates[start_idx:end_idx].values,
+                ds.analog_dates.attrs["units"]).tolist()
 
     return {
         "parameters": {
@@ -258,8 +381,9 @@ def _get_analog_criteria(data_dir: str, region: str, forecast_date: str, method:
 
     target_date = utils.convert_to_target_date(forecast_date, lead_time)
 
-    with (xr.open_dataset(file_path, engine="h5netcdf") as ds):
-        row_indices = utils.get_row_indices(ds, target_date)
+    with array_mirror.open_dataset(file_path) as ds:
+        index = forecast_index.get_index(file_path, ds)
+        row_indices = index.get_row_indices(target_date)
         if row_indices is None:
             analog_criteria = []
         else:
@@ -295,9 +419,10 @@ def _get_analog_values(data_dir: str, region: str, forecast_date: str, method: s
 
     target_date = utils.convert_to_target_date(forecast_date, lead_time)
 
-    with xr.open_dataset(file_path, engine="h5netcdf") as ds:
-        entity_idx = utils.get_entity_index(ds, entity)
-        row_indices = utils.get_row_indices(ds, target_date)
+    with array_mirror.open_dataset(file_path) as ds:
+        index = forecast_index.get_index(file_path, ds)
+        entity_idx = index.get_entity_index(entity)
+        row_indices = index.get_row_indices(target_date)
         if row_indices is None:
             values = []
         else:
@@ -336,21 +461,25 @@ def _get_analog_values_percentiles(
 
     target_date = utils.convert_to_target_date(forecast_date, lead_time)
 
-    with xr.open_dataset(file_path, engine="h5netcdf") as ds:
-        entity_idx = utils.get_entity_index(ds, entity)
-        row_indices = utils.get_row_indices(ds, target_date)
+    with array_mirror.open_dataset(file_path) as ds:
+        index = forecast_index.get_index(file_path, ds)
+        entity_idx = index.get_entity_index(entity)
+        row_indices = index.get_row_indices(target_date)
         if row_indices is None:
             values = [None for _ in percentiles]
         else:
             start_idx, end_idx, target_date = row_indices
-            values = ds.analog_values_raw[entity_idx, start_idx:end_idx].astype(
-                float).values
-            values_sorted = np.sort(values)
-
-            # Compute the percentiles
-            frequencies = utils.build_cumulative_frequency(len(values))
-            values = [float(np.interp(percentile / 100, frequencies, values_sorted)) for
-                      percentile in percentiles]
+            grid = percentile_sidecar.get_percentiles(file_path, percentiles)
+            if grid is not None:
+                lead_time_idx, _ = index.get_target_date_index(target_date)
+                values = grid[entity_idx, lead_time_idx, :].tolist()
+            else:
+                values = ds.analog_values_raw[entity_idx, start_idx:end_idx].astype(
+                    float).values
+
+                # Compute the percentiles
+                values = utils.compute_analog_percentiles(
+                    values, [end_idx - start_idx], percentiles)[0, 0, :].tolist()
 
     return {
         "parameters": {
@@ -385,9 +514,10 @@ def _get_analog_values_best(
 
     target_date = utils.convert_to_target_date(forecast_date, lead_time)
 
-    with xr.open_dataset(file_path, engine="h5netcdf") as ds:
-        entity_idx = utils.get_entity_index(ds, entity)
-        row_indices = utils.get_row_indices(ds, target_date)
+    with array_mirror.open_dataset(file_path) as ds:
+        index = forecast_index.get_index(file_path, ds)
+        entity_idx = index.get_entity_index(entity)
+        row_indices = index.get_row_indices(target_date)
         if row_indices is None:
             values = []
         else:
@@ -411,6 +541,59 @@ def _get_analog_values_best(
     }
 
 
+def _get_entities_analog_values_percentiles(
+        data_dir: str, region: str, forecast_date: str, method: str, configuration: str,
+        entities: list[int] | None, lead_time: int | str, percentiles: list[int]):
+    """
+    Synchronous function to get the precipitation values for specific percentiles
+    and several entities from the netCDF file, in a single read.
+    """
+    if forecast_date == 'latest':
+        forecast_date = utils.get_last_forecast_date(data_dir, region)
+
+    region_path = utils.check_region_path(data_dir, region)
+    file_path = utils.get_file_path(region_path, forecast_date, method, configuration)
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"File not found: {file_path}")
+
+    target_date = utils.convert_to_target_date(forecast_date, lead_time)
+
+    with array_mirror.open_dataset(file_path) as ds:
+        index = forecast_index.get_index(file_path, ds)
+        entities_idx, entity_ids = index.get_entity_indices(entities)
+        row_indices = index.get_row_indices(target_date)
+        if row_indices is None:
+            values = [[None for _ in percentiles] for _ in entity_ids]
+        else:
+            start_idx, end_idx, target_date = row_indices
+            grid = percentile_sidecar.get_percentiles(file_path, percentiles)
+            if grid is not None:
+                lead_time_idx, _ = index.get_target_date_index(target_date)
+                values = grid[entities_idx, lead_time_idx, :].tolist()
+            else:
+                values = ds.analog_values_raw[:, start_idx:end_idx].astype(
+                    float).values[entities_idx]
+
+                # Compute the percentiles of all entities at once
+                values = utils.compute_analog_percentiles(
+                    values, [end_idx - start_idx], percentiles)[:, 0, :].tolist()
+
+    return {
+        "parameters": {
+            "region": region,
+            "forecast_date": utils.convert_to_datetime(forecast_date),
+            "target_date": target_date,
+            "lead_time": utils.compute_lead_time(forecast_date, target_date),
+            "method": method,
+            "configuration": configuration,
+            "percentiles": percentiles,
+        },
+        "percentiles": percentiles,
+        "entity_ids": entity_ids,
+        "values": values
+    }
+
+
 def _get_entities_analog_values_percentile(
         data_dir: str, region: str, forecast_date: str, method: str, configuration: str,
         lead_time: int | str, percentile: int, normalize: int = 10):
@@ -428,34 +611,33 @@ def _get_entities_analog_values_percentile(
 
     target_date = utils.convert_to_target_date(forecast_date, lead_time)
 
-    with xr.open_dataset(file_path, engine="h5netcdf") as ds:
-        station_ids = ds.station_ids.values.tolist()
-        row_indices = utils.get_row_indices(ds, target_date)
+    with array_mirror.open_dataset(file_path) as ds:
+        index = forecast_index.get_index(file_path, ds)
+        station_ids = list(index.station_ids)
+        row_indices = index.get_row_indices(target_date)
         if row_indices is None:
             values = []
             values_normalized = []
         else:
             start_idx, end_idx, target_date = row_indices
-            values = ds.analog_values_raw[:, start_idx:end_idx].astype(float).values
-            values_sorted = np.sort(values, axis=1)
+            grid = percentile_sidecar.get_percentiles(file_path, [percentile])
+            if grid is not None:
+                lead_time_idx, _ = index.get_target_date_index(target_date)
+                values = grid[:, lead_time_idx, 0]
+            else:
+                values = ds.analog_values_raw[:, start_idx:end_idx].astype(float).values
 
-            # Compute the percentiles
-            n_entities = values_sorted.shape[0]
-            n_analogs = values_sorted.shape[1]
-            freq = utils.build_cumulative_frequency(n_analogs)
-            values = [float(np.interp(percentile / 100, freq, values_sorted[i, :])) for i in
-                      range(n_entities)]
+                # Compute the percentiles
+                values = utils.compute_analog_percentiles(
+                    values, [end_idx - start_idx], [percentile])[:, 0, 0]
 
             # Get the reference values for normalization
-            axis = ds.reference_axis.values.tolist()
-            try:
-                ref_idx = axis.index(normalize)
-            except ValueError:
-                raise ValueError(f"normalize must be in {axis}")
+            ref_idx = index.get_reference_index(normalize)
             ref_values = ds.reference_values[:, ref_idx].astype(float).values
 
             # Normalize the values
-            values_normalized = np.array(values) / ref_values
+            values_normalized = values / ref_values
+            values = values.tolist()
             values_normalized = values_normalized.tolist()
 
     return {
@@ -489,15 +671,14 @@ def _get_series_analog_values_best(
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"File not found: {file_path}")
 
-    with xr.open_dataset(file_path, engine="h5netcdf") as ds:
-        target_dates = [np.datetime64(date).astype('datetime64[s]').item() for date in
-                        ds.target_dates.values]
+    with array_mirror.open_dataset(file_path) as ds:
+        index = forecast_index.get_index(file_path, ds)
+        target_dates = list(index.target_dates)
         series_values = []
-        entity_idx = utils.get_entity_index(ds, entity)
-        analogs_nb = ds.analogs_nb.values
-        for idx in range(len(analogs_nb)):
-            start_idx = int(np.sum(analogs_nb[:idx]))
-            end_idx = start_idx + min(number, int(analogs_nb[idx]))
+        entity_idx = index.get_entity_index(entity)
+        for idx in range(index.lead_times_nb):
+            start_idx, end_idx = index.get_rows(idx)
+            end_idx = min(end_idx, start_idx + number)
             values = ds.analog_values_raw[entity_idx, start_idx:end_idx].astype(
                 float).values.tolist()
             series_values.append(values)
@@ -531,26 +712,50 @@ def _get_series_analog_values_percentiles(
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"File not found: {file_path}")
 
-    with xr.open_dataset(file_path, engine="h5netcdf") as ds:
-        entity_idx = utils.get_entity_index(ds, entity)
-        analogs_nb = ds.analogs_nb.values
-        series_values = np.ones((len(percentiles), len(analogs_nb))) * np.nan
-        target_dates = [np.datetime64(date).astype('datetime64[s]').item() for date in
-                        ds.target_dates.values]
+    return {
+        "parameters": {
+            "region": region,
+            "forecast_date": utils.convert_to_datetime(forecast_date),
+            "method": method,
+            "configuration": configuration,
+            "entity_id": entity,
+            "percentiles": percentiles
+        },
+        "series_values": _read_series_analog_values_percentiles(
+            file_path, utils.convert_to_datetime(forecast_date), entity, percentiles)
+    }
+
 
-        for analog_idx in range(len(analogs_nb)):
-            start_idx = int(np.sum(analogs_nb[:analog_idx]))
-            end_idx = start_idx + int(analogs_nb[analog_idx])
-            values = ds.analog_values_raw[entity_idx, start_idx:end_idx].astype(
-                float).values
-            values_sorted = np.sort(values)
+def _read_series_analog_values_percentiles(
+        file_path: str, forecast_date: datetime, entity: int, percentiles: list[int]):
+    """
+    Synchronous function to read the time series for specific percentiles
+    from a given netCDF file.
+    """
+    with array_mirror.open_dataset(file_path) as ds:
+        index = forecast_index.get_index(file_path, ds)
+        entity_idx = index.get_entity_index(entity)
+        target_dates = list(index.target_dates)
+        grid = percentile_sidecar.get_percentiles(file_path, percentiles)
+        if grid is not None:
+            series_values = grid[entity_idx].T
+        else:
+            values = ds.analog_values_raw[entity_idx, :].astype(float).values
 
-            # Compute the percentiles
-            frequencies = utils.build_cumulative_frequency(analogs_nb[analog_idx])
-            for i_pc, pc in enumerate(percentiles):
-                val = np.interp(pc / 100, frequencies, values_sorted)
-                series_values[i_pc, analog_idx] = val
+            # Compute the percentiles for all lead times (percentiles x lead times)
+            series_values = utils.compute_analog_percentiles(
+                values, index.analogs_nb, percentiles)[0].T
 
+    return _format_series_percentiles(forecast_date, target_dates, series_values,
+                                      percentiles)
+
+
+def _format_series_percentiles(forecast_date: datetime, target_dates: list,
+                               series_values: np.ndarray, percentiles: list[int]):
+    """
+    Format the time series of the percentiles (percentiles x lead times) of a
+    forecast.
+    """
     # Extract lists of values per percentile
     output = []
     for i_pc, pc in enumerate(percentiles):
@@ -558,69 +763,97 @@ def _get_series_analog_values_percentiles(
             {"percentile": pc,
              "series_values": series_values[i_pc, :].tolist()})
 
+    return {
+        "forecast_date": forecast_date,
+        "target_dates": target_dates,
+        "series_percentiles": output
+    }
+
+
+def _get_entities_series_analog_values_percentiles(
+        data_dir: str, region: str, forecast_date: str, method: str, configuration: str,
+        entities: list[int] | None, percentiles: list[int]):
+    """
+    Synchronous function to get the time series for specific percentiles and
+    several entities from the netCDF file, in a single read.
+    """
+    if forecast_date == 'latest':
+        forecast_date = utils.get_last_forecast_date(data_dir, region)
+
+    region_path = utils.check_region_path(data_dir, region)
+    file_path = utils.get_file_path(region_path, forecast_date, method, configuration)
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"File not found: {file_path}")
+
+    with array_mirror.open_dataset(file_path) as ds:
+        index = forecast_index.get_index(file_path, ds)
+        entities_idx, entity_ids = index.get_entity_indices(entities)
+        target_dates = list(index.target_dates)
+        grid = percentile_sidecar.get_percentiles(file_path, percentiles)
+        if grid is not None:
+            grid = grid[entities_idx]
+        else:
+            values = ds.analog_values_raw.astype(float).values[entities_idx]
+
+            # Compute the percentiles of all entities and lead times at once
+            grid = utils.compute_analog_percentiles(
+                values, index.analogs_nb, percentiles)
+
     return {
         "parameters": {
             "region": region,
             "forecast_date": utils.convert_to_datetime(forecast_date),
             "method": method,
             "configuration": configuration,
-            "entity_id": entity,
             "percentiles": percentiles
         },
-        "series_values": {
-            "forecast_date": utils.convert_to_datetime(forecast_date),
-            "target_dates": target_dates,
-            "series_percentiles": output
-        }
+        "percentiles": percentiles,
+        "entity_ids": entity_ids,
+        "target_dates": target_dates,
+        # Entities x percentiles x lead times
+        "series_values": grid.transpose(0, 2, 1).tolist()
     }
 
 
-def _get_series_analog_values_percentiles_history(
+def _get_past_forecast_files(
         data_dir: str, region: str, forecast_date: str, method: str, configuration: str,
-        entity: int, percentiles: list[int], number: int):
+        number: int, include_current: bool = False
+) -> tuple[str, list[tuple[datetime, str]]]:
     """
-    Synchronous function to get the time series for historical percentiles
-    from the netCDF file.
+    Synchronous function to find the files of the forecasts issued before a given
+    forecast date (and of the forecast itself if `include_current`), from the
+    forecast catalog. When the region is not cataloged, the previous 3-hourly
+    forecast dates are probed (up to 50 steps).
     """
     if forecast_date == 'latest':
         forecast_date = utils.get_last_forecast_date(data_dir, region)
 
     region_path = utils.check_region_path(data_dir, region)
-    diff = np.timedelta64(3, 'h')
     dt = utils.convert_to_datetime(forecast_date)
-    counter_found = 0
-    counter_tot = 0
-    forecasts = []
-    while True:
-        if counter_found >= number:
-            break
-        if counter_tot > 50:
-            break
 
+    current = []
+    if include_current:
+        file_path = utils.get_file_path(region_path, forecast_date, method,
+                                        configuration)
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"File not found: {file_path}")
+        current = [(dt, file_path)]
+
+    previous = forecast_catalog.get_previous_forecasts(
+        region_path, dt, method, configuration, number)
+    if previous is not None:
+        return forecast_date, current + [(date, entry.path) for date, entry in previous]
+
+    diff = np.timedelta64(3, 'h')
+    counter_tot = 0
+    past_forecasts = list(current)
+    number += len(current)
+    while len(past_forecasts) < number and counter_tot < 50:
         counter_tot += 1
         dt = dt - diff
         path_dir = f"{region_path}/{dt.year:04d}/{dt.month:02d}/{dt.day:02d}"
         path = f"{path_dir}/{dt.year:04d}-{dt.month:02d}-{dt.day:02d}_{dt.hour:02d}.{method}.{configuration}.nc"
-        if not os.path.exists(path):
-            continue
-
-        dt_str = f"{dt.year:04d}-{dt.month:02d}-{dt.day:02d}T{dt.hour:02d}"
-        series_percentiles = _get_series_analog_values_percentiles(
-            data_dir, region, dt_str, method, configuration, entity, percentiles)
-        series_percentiles = series_percentiles["series_values"]
+        if os.path.exists(path):
+            past_forecasts.append((dt, path))
 
-        forecasts.append(series_percentiles)
-        counter_found += 1
-
-    return {
-        "parameters": {
-            "region": region,
-            "forecast_date": utils.convert_to_datetime(forecast_date),
-            "method": method,
-            "configuration": configuration,
-            "entity_id": entity,
-            "percentiles": percentiles,
-            "number": number
-        },
-        "past_forecasts": forecasts
-    }
+    return forecast_date, past_forecasts
@@ -1,30 +1,28 @@
-import xarray as xr
-import asyncio
 import os
 
-from atmoswing_api.app.utils import utils
+from atmoswing_api.app.utils import utils, bundle, executors, forecast_index
 
 
 async def get_config_data(data_dir: str):
     """
     Get the configuration data from the settings.
     """
-    return await asyncio.to_thread(_get_config_data, data_dir)
+    return await executors.run_io(_get_config_data, data_dir)
 
 
 async def get_last_forecast_date(data_dir: str, region: str):
     """
     Get the last available forecast date for a given region.
     """
-    return await asyncio.to_thread(_get_last_forecast_date, data_dir, region)
+    return await executors.run_io(_get_last_forecast_date, data_dir, region)
 
 
 async def has_forecast_date(data_dir: str, region: str, forecast_date: str):
     """
     Check if forecasts are available for a given region and forecast date.
     """
-    return await asyncio.to_thread(_has_forecast_date, data_dir, region,
-                                   forecast_date)
+    return await executors.run_io(_has_forecast_date, data_dir, region,
+                                  forecast_date)
 
 
 async def get_method_list(data_dir: str, region: str, forecast_date: str):
@@ -32,8 +30,8 @@ async def get_method_list(data_dir: str, region: str, forecast_date: str):
     Get the list of available method types for a given region.
     Simulate async reading by using asyncio to run blocking I/O functions
     """
-    return await asyncio.to_thread(_get_methods_from_netcdf, data_dir, region,
-                                   forecast_date)
+    return await executors.run_io(_get_methods_from_netcdf, data_dir, region,
+                                  forecast_date)
 
 
 async def get_method_configs_list(data_dir: str, region: str, forecast_date: str):
@@ -41,8 +39,8 @@ async def get_method_configs_list(data_dir: str, region: str, forecast_date: str
     Get the list of available method types and configurations for a given region.
     Simulate async reading by using asyncio to run blocking I/O functions
     """
-    return await asyncio.to_thread(_get_method_configs_from_netcdf, data_dir, region,
-                                   forecast_date)
+    return await executors.run_io(_get_method_configs_from_netcdf, data_dir, region,
+                                  forecast_date)
 
 
 async def get_entities_list(data_dir: str, region: str, forecast_date: str, method: str,
@@ -50,8 +48,8 @@ async def get_entities_list(data_dir: str, region: str, forecast_date: str, meth
     """
     Get the list of available entities for a given region, forecast_date, method, and configuration.
     """
-    return await asyncio.to_thread(_get_entities_from_netcdf, data_dir, region,
-                                   forecast_date, method, configuration)
+    return await executors.run_io(_get_entities_from_netcdf, data_dir, region,
+                                  forecast_date, method, configuration)
 
 
 async def get_relevant_entities_list(data_dir: str, region: str, forecast_date: str,
@@ -59,8 +57,8 @@ async def get_relevant_entities_list(data_dir: str, region: str, forecast_date:
     """
     Get the list of relevant entities for a given region, forecast_date, method, and configuration.
     """
-    return await asyncio.to_thread(_get_relevant_entities_from_netcdf, data_dir,
-                                   region, forecast_date, method, configuration)
+    return await executors.run_io(_get_relevant_entities_from_netcdf, data_dir,
+                                  region, forecast_date, method, configuration)
 
 
 def _get_config_data(data_dir: str):
@@ -133,13 +131,13 @@ def _get_methods_from_netcdf(data_dir: str, region: str, forecast_date: str):
 
     methods = []
 
-    # Open the NetCDF files and get the method IDs and names
+    # Read the method IDs and names from the global attributes of the files
     for file in files:
-        with xr.open_dataset(file, engine="h5netcdf") as ds:
-            method_id = ds.method_id
-            method_name = utils.decode_surrogate_escaped_utf8(ds.method_id_display)
-            if not any(method['id'] == method_id for method in methods):
-                methods.append({"id": method_id, "name": method_name})
+        attrs = bundle.read_global_attributes(file)
+        method_id = attrs['method_id']
+        method_name = utils.decode_surrogate_escaped_utf8(attrs['method_id_display'])
+        if not any(method['id'] == method_id for method in methods):
+            methods.append({"id": method_id, "name": method_name})
 
     methods.sort(key=lambda x: x['id'])
 
@@ -167,22 +165,22 @@ def _get_method_configs_from_netcdf(data_dir: str, region: str, forecast_date: s
 
     method_configs = []
 
-    # Open the NetCDF files and get the method IDs and configurations
+    # Read the method IDs and configurations from the global attributes of the files
     for file in files:
-        with xr.open_dataset(file, engine="h5netcdf") as ds:
-            method_id = ds.method_id
-            method_name = utils.decode_surrogate_escaped_utf8(ds.method_id_display)
-            config_id = ds.specific_tag
-            config_name = utils.decode_surrogate_escaped_utf8(ds.specific_tag_display)
-            for method in method_configs:
-                if method['id'] == method_id:
-                    method['configurations'].append(
-                        {"id": config_id, "name": config_name})
-                    break
-            else:
-                method_configs.append(
-                    {"id": method_id, "name": method_name,
-                     "configurations": [{"id": config_id, "name": config_name}]})
+        attrs = bundle.read_global_attributes(file)
+        method_id = attrs['method_id']
+        method_name = utils.decode_surrogate_escaped_utf8(attrs['method_id_display'])
+        config_id = attrs['specific_tag']
+        config_name = utils.decode_surrogate_escaped_utf8(attrs['specific_tag_display'])
+        for method in method_configs:
+            if method['id'] == method_id:
+                method['configurations'].append(
+                    {"id": config_id, "name": config_name})
+                break
+        else:
+            method_configs.append(
+                {"id": method_id, "name": method_name,
+                 "configurations": [{"id": config_id, "name": config_name}]})
 
     # Sort the method configurations by ID
     method_configs.sort(key=lambda x: x['id'])
@@ -211,7 +209,7 @@ def _get_entities_from_netcdf(data_dir: str, region: str, forecast_date: str, me
     entities = []
 
     # Open the NetCDF files and get the entities
-    with xr.open_dataset(file_path, engine="h5netcdf") as ds:
+    with bundle.open_dataset(file_path) as ds:
         station_ids = ds.station_ids.values
         station_official_ids = ds.station_official_ids.values
         station_names = ds.station_names.values
@@ -261,7 +259,7 @@ def _get_relevant_entities_from_netcdf(data_dir: str, region: str, forecast_date
     entities = []
 
     # Open the NetCDF files and get the entities
-    with xr.open_dataset(file_path, engine="h5netcdf") as ds:
+    with bundle.open_dataset(file_path) as ds:
         station_ids = ds.station_ids.values
         station_official_ids = ds.station_official_ids.values
         station_names = ds.station_names.values
@@ -269,7 +267,7 @@ def _get_relevant_entities_from_netcdf(data_dir: str, region: str, forecast_date
         station_y_coords = ds.station_y_coords.values
 
         # Create a list of dictionaries with the entity information
-        relevant_idx = utils.get_relevant_stations_idx(ds)
+        relevant_idx = forecast_index.get_index(file_path, ds).relevant_station_idx
         for i in relevant_idx:
             entity = {
                 "id": int(station_ids[i]),
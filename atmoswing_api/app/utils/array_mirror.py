@@ -0,0 +1,346 @@
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import numpy as np
+import xarray as xr
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from atmoswing_api import config
+from atmoswing_api.app.utils import dataset_pool
+from atmoswing_api.app.utils.catalog import parse_forecast_filename
+
+MIRROR_SUFFIX = ".mirror"
+MIRROR_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+# Variables mirrored as uncompressed arrays
+MIRROR_VARIABLES = ("analog_values_raw", "analogs_nb", "target_dates",
+                    "reference_values")
+
+
+def get_mirror_path(file_path: str) -> str:
+    """
+    Get the path of the array mirror of a forecast file, which is a directory
+    stored next to it: YYYY-MM-DD_HH.method.configuration.mirror
+
+    Parameters
+    ----------
+    file_path: str
+        The path to the forecast file (.nc).
+
+    Returns
+    -------
+    str
+        The path to the mirror directory.
+    """
+    base = file_path[:-3] if file_path.endswith(".nc") else file_path
+    return base + MIRROR_SUFFIX
+
+
+@contextmanager
+def _build_lock(mirror_path: str):
+    # Several workers may build the same mirror (see the watcher warmup)
+    with open(f"{mirror_path}.lock", "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def build_mirror(file_path: str, force: bool = False) -> str:
+    """
+    Write the variables read by the forecast endpoints (see `MIRROR_VARIABLES`) of
+    a forecast file as uncompressed .npy files, with the values as read through
+    xarray (masked values are NaN), so that they can be memory-mapped. Nothing is
+    written if the mirror is already up to date.
+
+    Parameters
+    ----------
+    file_path: str
+        The path to the forecast file (.nc).
+    force: bool
+        Rebuild the mirror even if it is up to date.
+
+    Returns
+    -------
+    str
+        The path to the mirror directory.
+    """
+    fingerprint = dataset_pool.source_fingerprint(file_path)
+    if fingerprint is None:
+        raise FileNotFoundError(f"File not found: {file_path}")
+
+    mirror_path = get_mirror_path(file_path)
+    with _build_lock(mirror_path):
+        if not force and _load_mirror(file_path, fingerprint) is not None:
+            return mirror_path
+
+        tmp_path = f"{mirror_path}.{os.getpid()}.tmp"
+        old_path = f"{mirror_path}.{os.getpid()}.old"
+        try:
+            os.makedirs(tmp_path)
+            # Not borrowed from the pool, whose datasets would keep the values
+            # loaded, but read under the same lock as the pooled datasets
+            with dataset_pool.HDF5_LOCK, \
+                    xr.open_dataset(file_path, engine="h5netcdf", decode_times=False,
+                                    lock=dataset_pool.HDF5_LOCK) as ds:
+                arrays = {name: ds[name].values for name in MIRROR_VARIABLES
+                          if name in ds.variables}
+            for name, values in arrays.items():
+                np.save(os.path.join(tmp_path, f"{name}.npy"), values,
+                        allow_pickle=False)
+            with open(os.path.join(tmp_path, MANIFEST_NAME), "w") as f:
+                json.dump({"version": MIRROR_VERSION,
+                           "source_fingerprint": fingerprint,
+                           "variables": list(arrays)}, f)
+            # The previous mirror is moved aside rather than removed first, so that
+            # it is replaced by two renames. Its arrays remain readable by the
+            # requests mapping them.
+            if os.path.isdir(mirror_path):
+                os.replace(mirror_path, old_path)
+            os.replace(tmp_path, mirror_path)
+        finally:
+            for path in (tmp_path, old_path):
+                if os.path.exists(path):
+                    shutil.rmtree(path, ignore_errors=True)
+
+    return mirror_path
+
+
+def remove_mirror(file_path: str) -> bool:
+    """
+    Remove the array mirror of a forecast file.
+
+    Parameters
+    ----------
+    file_path: str
+        The path to the forecast file (.nc).
+
+    Returns
+    -------
+    bool
+        True if a mirror was removed.
+    """
+    mirror_path = get_mirror_path(file_path)
+    if not os.path.isdir(mirror_path):
+        return False
+    with _build_lock(mirror_path):
+        shutil.rmtree(mirror_path, ignore_errors=True)
+    if os.path.exists(f"{mirror_path}.lock"):
+        os.remove(f"{mirror_path}.lock")
+    mirror_cache.invalidate(file_path)
+    return True
+
+
+def prune_mirrors(region_path: str, keep: int) -> int:
+    """
+    Remove the array mirrors of a region, except the ones of the latest forecast
+    dates.
+
+    Parameters
+    ----------
+    region_path: str
+        The path to the region directory.
+    keep: int
+        The number of forecast dates (the latest ones) whose mirrors are kept.
+
+    Returns
+    -------
+    int
+        The number of mirrors removed.
+    """
+    mirrors = []
+    for root, dirs, _ in os.walk(region_path):
+        for name in list(dirs):
+            if not name.endswith(MIRROR_SUFFIX):
+                continue
+            dirs.remove(name)
+            file_name = name[:-len(MIRROR_SUFFIX)] + ".nc"
+            parsed = parse_forecast_filename(file_name)
+            if parsed is not None:
+                mirrors.append((parsed[0], os.path.join(root, file_name)))
+
+    kept_dates = sorted({dt for dt, _ in mirrors}, reverse=True)[:max(keep, 0)]
+    removed = 0
+    for dt, file_path in mirrors:
+        if dt not in kept_dates:
+            removed += remove_mirror(file_path)
+
+    return removed
+
+
+def is_mirror_up_to_date(file_path: str) -> bool:
+    """
+    Check if the array mirror of a forecast file exists and matches the current
+    file.
+
+    Parameters
+    ----------
+    file_path: str
+        The path to the forecast file (.nc).
+
+    Returns
+    -------
+    bool
+        True if the mirror can be used.
+    """
+    fingerprint = dataset_pool.source_fingerprint(file_path)
+    return _load_mirror(file_path, fingerprint) is not None
+
+
+def _load_mirror(file_path: str, fingerprint: tuple | None) -> dict | None:
+    if fingerprint is None:
+        return None
+    mirror_path = get_mirror_path(file_path)
+    try:
+        with open(os.path.join(mirror_path, MANIFEST_NAME)) as f:
+            manifest = json.load(f)
+        if manifest.get("version") != MIRROR_VERSION:
+            return None
+        if tuple(manifest.get("source_fingerprint", ())) != fingerprint:
+            return None
+        return {name: np.load(os.path.join(mirror_path, f"{name}.npy"),
+                              mmap_mode='r', allow_pickle=False)
+                for name in manifest["variables"]}
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+class MirrorCache:
+    """
+    Thread-safe LRU cache of the memory-mapped arrays of the mirrors, bounded in
+    number of forecast files. Mirrors are checked against the (mtime, size) of
+    their forecast file, so that stale mirrors are never used. The dataset using
+    the arrays is kept as well, as long as the pooled dataset it is built from is
+    the same.
+    """
+
+    def __init__(self, max_files: int = 64):
+        self.max_files = max_files
+        # file path -> (fingerprint, arrays, pooled dataset, mirrored dataset)
+        self._entries: OrderedDict[str, tuple] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, file_path: str) -> dict | None:
+        """
+        Get the memory-mapped arrays of a forecast file.
+
+        Parameters
+        ----------
+        file_path: str
+            The path to the forecast file (.nc).
+
+        Returns
+        -------
+        dict|None
+            The read-only arrays by variable name, or None if there is no
+            up-to-date mirror.
+        """
+        if self.max_files <= 0:
+            return None
+        fingerprint = dataset_pool.source_fingerprint(file_path)
+        if fingerprint is None:
+            return None
+
+        with self._lock:
+            cached = self._entries.get(file_path)
+            if cached is not None and cached[0] == fingerprint:
+                self._entries.move_to_end(file_path)
+                return cached[1]
+
+        arrays = _load_mirror(file_path, fingerprint)
+        if arrays is None:
+            return None
+
+        with self._lock:
+            self._entries.pop(file_path, None)
+            self._entries[file_path] = (fingerprint, arrays, None, None)
+            while len(self._entries) > self.max_files:
+                self._entries.popitem(last=False)
+
+        return arrays
+
+    def get_dataset(self, file_path: str, ds: xr.Dataset) -> xr.Dataset:
+        """
+        Get a dataset of a forecast file with the variables of its mirror replaced
+        by the memory-mapped arrays.
+
+        Parameters
+        ----------
+        file_path: str
+            The path to the forecast file (.nc).
+        ds: xarray.Dataset
+            The dataset of the forecast file, borrowed from the dataset pool.
+
+        Returns
+        -------
+        xarray.Dataset
+            The dataset with the mirrored variables, or the given dataset if there
+            is no up-to-date mirror.
+        """
+        arrays = self.get(file_path)
+        if not arrays:
+            return ds
+
+        with self._lock:
+            cached = self._entries.get(file_path)
+            if cached is not None and cached[1] is arrays and cached[2] is ds:
+                return cached[3]
+
+        mirrored = {name: ds[name].copy(data=array) for name, array in arrays.items()
+                    if name in ds.variables and ds[name].shape == array.shape}
+        if not mirrored:
+            return ds
+        mirrored_ds = ds.assign(mirrored)
+
+        with self._lock:
+            cached = self._entries.get(file_path)
+            if cached is not None and cached[1] is arrays:
+                self._entries[file_path] = (cached[0], arrays, ds, mirrored_ds)
+
+        return mirrored_ds
+
+    def invalidate(self, file_path: str):
+        """Drop the arrays of a given file."""
+        with self._lock:
+            self._entries.pop(file_path, None)
+
+    def clear(self):
+        """Drop all arrays."""
+        with self._lock:
+            self._entries.clear()
+
+
+mirror_cache = MirrorCache(max_files=config.Settings().array_mirror_max_files)
+
+
+@contextmanager
+def open_dataset(file_path: str):
+    """
+    Borrow the dataset of a forecast file from the dataset pool, with the variables
+    of its array mirror (when it is up to date) replaced by the memory-mapped
+    arrays: slicing them then reads the page cache directly, without decompressing
+    the variables.
+
+    Parameters
+    ----------
+    file_path: str
+        The path to the forecast file (.nc).
+
+    Yields
+    ------
+    xarray.Dataset
+        The opened dataset. It must not be closed by the caller.
+    """
+    with dataset_pool.open_dataset(file_path) as ds:
+        yield mirror_cache.get_dataset(file_path, ds)
@@ -0,0 +1,494 @@
+import os
+import threading
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+
+import h5netcdf
+import h5py
+import xarray as xr
+from xarray.backends import H5NetCDFStore
+
+from atmoswing_api import config
+from atmoswing_api.app.utils import dataset_pool, utils
+from atmoswing_api.app.utils.catalog import parse_forecast_filename
+
+BUNDLE_SUFFIX = ".bundle.h5"
+BUNDLE_VERSION = 1
+# Station variables stored once (in _stations/0, _stations/1, ...) for the methods
+# and configurations having identical ones
+STATION_VARIABLES = ("station_ids", "station_official_ids", "station_names",
+                     "station_heights", "station_x_coords", "station_y_coords")
+STATION_DIMENSION = "stations"
+STATIONS_GROUP = "_stations"
+# Attributes of the HDF5 dimension scales, which hold references to the objects
+# of the source file and are rebuilt in the bundle
+_SCALE_ATTRIBUTES = ("DIMENSION_LIST", "REFERENCE_LIST")
+# Attributes of the groups that are not global attributes of the forecast files
+_MEMBER_ATTRIBUTES = ("_source_mtime_ns", "_source_size", "_stations")
+
+
+def get_bundle_path(file_path: str) -> str:
+    """
+    Get the path of the bundle holding a forecast file, which is stored next to it:
+    YYYY-MM-DD_HH.bundle.h5
+
+    Parameters
+    ----------
+    file_path: str
+        The path to the forecast file (.nc).
+
+    Returns
+    -------
+    str
+        The path to the bundle file.
+    """
+    prefix = os.path.basename(file_path).split(".", 1)[0]
+    return os.path.join(os.path.dirname(file_path), prefix + BUNDLE_SUFFIX)
+
+
+def get_member_name(file_path: str) -> str:
+    """
+    Get the name of the group of a forecast file in its bundle: method.configuration
+
+    Parameters
+    ----------
+    file_path: str
+        The path to the forecast file (.nc).
+
+    Returns
+    -------
+    str
+        The group name.
+    """
+    parsed = parse_forecast_filename(os.path.basename(file_path))
+    if parsed is None:
+        raise ValueError(f"Not a forecast file: {file_path}")
+    _, method, configuration = parsed
+    return f"{method}.{configuration}"
+
+
+def copy_attributes(src, dst):
+    """
+    Copy the attributes of an HDF5 object with their HDF5 type (some hold text
+    that is not valid UTF-8), except the references of the dimension scales.
+
+    Parameters
+    ----------
+    src: h5py.Group|h5py.Dataset
+        The source object.
+    dst: h5py.Group|h5py.Dataset
+        The destination object.
+    """
+    for name in src.attrs:
+        if name not in _SCALE_ATTRIBUTES:
+            dst.attrs.create(name, src.attrs[name], dtype=src.attrs.get_id(name).dtype)
+
+
+def copy_variables(src: h5py.Group, dst: h5py.Group, names: list[str],
+                   layouts: dict[str, dict] | None = None):
+    """
+    Copy NetCDF variables and dimensions between HDF5 groups, and attach the
+    variables to their dimensions in the destination group.
+
+    Parameters
+    ----------
+    src: h5py.Group
+        The source group.
+    dst: h5py.Group
+        The destination group.
+    names: list
+        The names of the variables and dimensions to copy, which must include the
+        dimensions of the variables.
+    layouts: dict|None
+        Storage options (chunks, compression, compression_opts, shuffle) replacing
+        the ones of the source, by variable name.
+    """
+    layouts = layouts or {}
+    for name in names:
+        variable = src[name]
+        options = dict(chunks=variable.chunks, compression=variable.compression,
+                       compression_opts=variable.compression_opts,
+                       shuffle=variable.shuffle, fletcher32=variable.fletcher32)
+        # A maximum shape makes h5py chunk the contiguous variables
+        if variable.chunks is not None:
+            options["maxshape"] = variable.maxshape
+        if variable.dtype.kind != "O":
+            options["fillvalue"] = variable.fillvalue
+        options.update(layouts.get(name, {}))
+        copy = dst.create_dataset(name, shape=variable.shape, dtype=variable.dtype,
+                                  **options)
+        # The dimensions without coordinate variable hold no data
+        if variable.id.get_storage_size():
+            copy[()] = variable[()]
+        copy_attributes(variable, copy)
+
+    for name in names:
+        for axis, dimension in enumerate(src[name].dims):
+            for scale in dimension.values():
+                scale_name = scale.name.rsplit("/", 1)[-1]
+                if scale_name != name:
+                    dst[name].dims[axis].attach_scale(dst[scale_name])
+
+
+def _get_station_sets(sources: list[h5py.File]) -> list[tuple[list[str], list[int]]]:
+    """The station variables and the indices of the forecast files sharing them."""
+    sets = defaultdict(list)
+    for i, src in enumerate(sources):
+        if STATION_DIMENSION not in src:
+            continue
+        key = tuple((name, src[name].dtype.str, tuple(src[name][()].tolist()))
+                    for name in STATION_VARIABLES if name in src)
+        if key:
+            sets[key].append(i)
+
+    return [([name for name, _, _ in key], indices)
+            for key, indices in sets.items() if len(indices) > 1]
+
+
+def _iter_members(bundle: h5py.File):
+    for name, group in bundle.items():
+        if isinstance(group, h5py.Group) and name != STATIONS_GROUP:
+            yield name, group
+
+
+def build_bundle(file_paths: list[str]) -> str:
+    """
+    Pack the forecast files of a forecast datetime (all methods and configurations
+    of a region) into a single HDF5 file, with one NetCDF group per method and
+    configuration. The station variables that are identical in several files
+    (e.g. for the methods of a same configuration) are stored once. The forecast
+    files are kept.
+
+    Parameters
+    ----------
+    file_paths: list
+        The paths to the forecast files (.nc), which must share the same forecast
+        datetime and directory.
+
+    Returns
+    -------
+    str
+        The path to the bundle file.
+    """
+    if not file_paths:
+        raise ValueError("No forecast files to bundle")
+    bundle_path = get_bundle_path(file_paths[0])
+    if any(get_bundle_path(fp) != bundle_path for fp in file_paths):
+        raise ValueError("The forecast files do not belong to the same bundle")
+
+    tmp_path = f"{bundle_path}.tmp"
+    # Bundles are built by the ingest script: holding the lock during the copy does
+    # not delay requests
+    with dataset_pool.HDF5_LOCK:
+        _write_bundle(tmp_path, bundle_path, sorted(file_paths))
+
+    bundle_pool.invalidate(bundle_path)
+
+    return bundle_path
+
+
+def _write_bundle(tmp_path: str, bundle_path: str, file_paths: list[str]):
+    sources = [h5py.File(fp, "r") for fp in file_paths]
+    try:
+        with h5py.File(tmp_path, "w", libver="latest") as bundle:
+            bundle.attrs["version"] = BUNDLE_VERSION
+            shared = {}
+            for k, (names, indices) in enumerate(_get_station_sets(sources)):
+                path = f"{STATIONS_GROUP}/{k}"
+                copy_variables(sources[indices[0]], bundle.require_group(path),
+                                [STATION_DIMENSION] + names)
+                shared.update((i, (path, names)) for i in indices)
+
+            for i, src in enumerate(sources):
+                fingerprint = dataset_pool.source_fingerprint(src.filename)
+                stations_path, station_names = shared.get(i, (None, []))
+                group = bundle.create_group(get_member_name(src.filename))
+                copy_attributes(src, group)
+                copy_variables(src, group, [name for name in src
+                                             if name not in station_names])
+                if stations_path is not None:
+                    group.attrs["_stations"] = stations_path
+                group.attrs["_source_mtime_ns"] = fingerprint[0]
+                group.attrs["_source_size"] = fingerprint[1]
+        os.replace(tmp_path, bundle_path)
+    finally:
+        for src in sources:
+            src.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def is_bundle_up_to_date(file_paths: list[str]) -> bool:
+    """
+    Check whether the bundle of forecast files exists and holds exactly these
+    files, unchanged since the bundle was built.
+
+    Parameters
+    ----------
+    file_paths: list
+        The paths to the forecast files (.nc) of a forecast datetime.
+
+    Returns
+    -------
+    bool
+        True if the bundle is up to date.
+    """
+    if not file_paths:
+        return False
+    bundle_path = get_bundle_path(file_paths[0])
+    try:
+        with dataset_pool.HDF5_LOCK, h5py.File(bundle_path, "r") as bundle:
+            if bundle.attrs.get("version") != BUNDLE_VERSION:
+                return False
+            members = {name: (int(group.attrs["_source_mtime_ns"]),
+                              int(group.attrs["_source_size"]))
+                       for name, group in _iter_members(bundle)}
+    except (OSError, KeyError):
+        return False
+
+    return members == {get_member_name(fp): dataset_pool.source_fingerprint(fp)
+                       for fp in file_paths}
+
+
+class _BundleEntry:
+    """An open bundle, with the datasets of its members opened on demand."""
+
+    __slots__ = ("bundle_path", "fingerprint", "h5file", "file", "members",
+                 "datasets", "stations", "lock", "borrowers", "retired")
+
+    def __init__(self, bundle_path: str, fingerprint: tuple):
+        self.bundle_path = bundle_path
+        self.fingerprint = fingerprint
+        with dataset_pool.HDF5_LOCK:
+            self.h5file = h5py.File(bundle_path, "r")
+            try:
+                if self.h5file.attrs.get("version") != BUNDLE_VERSION:
+                    raise ValueError(f"Unsupported bundle version: {bundle_path}")
+                self.members = {}
+                for name, group in _iter_members(self.h5file):
+                    source = (int(group.attrs["_source_mtime_ns"]),
+                              int(group.attrs["_source_size"]))
+                    attrs = {key: utils._decode_attribute(value)
+                             for key, value in group.attrs.items()
+                             if not key.startswith('_')}
+                    self.members[name] = (source, attrs, group.attrs.get("_stations"))
+                self.file = h5netcdf.File(self.h5file, "r", decode_vlen_strings=True)
+            except Exception:
+                self.h5file.close()
+                raise
+        self.datasets = {}
+        self.stations = {}
+        self.lock = threading.Lock()
+        self.borrowers = 0
+        self.retired = False
+
+    def get_dataset(self, name: str) -> xr.Dataset:
+        with self.lock:
+            ds = self.datasets.get(name)
+            if ds is None:
+                with dataset_pool.HDF5_LOCK:
+                    ds = xr.open_dataset(
+                        H5NetCDFStore(self.file[name], lock=dataset_pool.HDF5_LOCK),
+                        decode_times=False)
+                ds.attrs = {key: value for key, value in ds.attrs.items()
+                            if key not in _MEMBER_ATTRIBUTES}
+                stations_path = self.members[name][2]
+                if stations_path is not None:
+                    # Add the station variables shared with other members
+                    stations = self.stations.get(stations_path)
+                    if stations is None:
+                        with dataset_pool.HDF5_LOCK:
+                            group = self.file
+                            for part in stations_path.split("/"):
+                                group = group[part]
+                            stations = xr.open_dataset(
+                                H5NetCDFStore(group, lock=dataset_pool.HDF5_LOCK),
+                                decode_times=False)
+                        self.stations[stations_path] = stations
+                    ds = ds.assign(dict(stations.data_vars))
+                self.datasets[name] = ds
+            return ds
+
+    def close(self):
+        with dataset_pool.HDF5_LOCK:
+            self.file.close()
+            self.h5file.close()
+
+
+class BundlePool:
+    """
+    Bounded, thread-safe LRU pool of open bundles. A single file handle serves the
+    datasets of all the forecast files of a bundle. The members of a bundle are
+    only used while their forecast file is unchanged (mtime and size) since the
+    bundle was built; otherwise the forecast file is read instead.
+    """
+
+    def __init__(self, max_handles: int = 8):
+        self.max_handles = max_handles
+        self._entries: OrderedDict[str, _BundleEntry] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def acquire(self, file_path: str) -> tuple[_BundleEntry, str] | None:
+        """
+        Borrow the bundle holding a forecast file, if it exists and is up to date
+        for this file. It must be given back with `release`.
+
+        Parameters
+        ----------
+        file_path: str
+            The path to the forecast file (.nc).
+
+        Returns
+        -------
+        tuple|None
+            The bundle and the group name of the forecast file, or None if the
+            forecast file is to be read directly.
+        """
+        if self.max_handles <= 0:
+            return None
+        bundle_path = get_bundle_path(file_path)
+        fingerprint = dataset_pool.file_fingerprint(bundle_path)
+        if fingerprint is None:
+            return None
+        try:
+            name = get_member_name(file_path)
+        except ValueError:
+            return None
+
+        entry = self._get_entry(bundle_path, fingerprint)
+        if entry is None:
+            return None
+        member = entry.members.get(name)
+        if member is None or \
+                member[0] != dataset_pool.source_fingerprint(file_path):
+            self.release(entry)
+            return None
+
+        return entry, name
+
+    def release(self, entry: _BundleEntry):
+        with self._lock:
+            entry.borrowers -= 1
+            if entry.retired and entry.borrowers == 0:
+                entry.close()
+
+    def invalidate(self, bundle_path: str):
+        """
+        Drop a bundle from the pool.
+
+        Parameters
+        ----------
+        bundle_path: str
+            The path to the bundle file.
+        """
+        with self._lock:
+            entry = self._entries.get(bundle_path)
+            if entry is not None:
+                self._retire(entry)
+
+    def clear(self):
+        """Drop all bundles from the pool."""
+        with self._lock:
+            for entry in list(self._entries.values()):
+                self._retire(entry)
+
+    def _get_entry(self, bundle_path: str, fingerprint: tuple) -> _BundleEntry | None:
+        with self._lock:
+            entry = self._entries.get(bundle_path)
+            if entry is not None and entry.fingerprint != fingerprint:
+                self._retire(entry)
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(bundle_path)
+                entry.borrowers += 1
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        try:
+            new_entry = _BundleEntry(bundle_path, fingerprint)
+        except (OSError, KeyError, ValueError):
+            return None
+
+        with self._lock:
+            entry = self._entries.get(bundle_path)
+            if entry is not None and entry.fingerprint == fingerprint:
+                # Another thread opened the same bundle in the meantime.
+                entry.borrowers += 1
+                new_entry.close()
+                return entry
+            if entry is not None:
+                self._retire(entry)
+            new_entry.borrowers += 1
+            self._entries[bundle_path] = new_entry
+            while len(self._entries) > self.max_handles:
+                self._retire(next(iter(self._entries.values())))
+            return new_entry
+
+    def _retire(self, entry: _BundleEntry):
+        if self._entries.get(entry.bundle_path) is entry:
+            del self._entries[entry.bundle_path]
+        entry.retired = True
+        if entry.borrowers == 0:
+            entry.close()
+
+
+_settings = config.Settings()
+bundle_pool = BundlePool(max_handles=_settings.bundle_pool_max_handles)
+
+
+@contextmanager
+def open_dataset(file_path: str):
+    """
+    Borrow the dataset of a forecast file, from its bundle when the bundle holds
+    the current version of the file, and from the dataset pool otherwise.
+
+    Parameters
+    ----------
+    file_path: str
+        The path to the forecast file (.nc).
+
+    Yields
+    ------
+    xarray.Dataset
+        The opened dataset. It must not be closed by the caller.
+    """
+    member = bundle_pool.acquire(file_path)
+    if member is None:
+        with dataset_pool.open_dataset(file_path) as ds:
+            yield ds
+        return
+
+    entry, name = member
+    try:
+        yield entry.get_dataset(name)
+    finally:
+        bundle_pool.release(entry)
+
+
+def read_global_attributes(file_path: str) -> dict:
+    """
+    Read the global attributes of a forecast file, from its bundle when the bundle
+    holds the current version of the file (see `utils.read_global_attributes`).
+
+    Parameters
+    ----------
+    file_path: str
+        The path to the forecast file (.nc).
+
+    Returns
+    -------
+    dict
+        The global attributes, with text attributes decoded to str.
+    """
+    member = bundle_pool.acquire(file_path)
+    if member is None:
+        return utils.read_global_attributes(file_path)
+
+    entry, name = member
+    try:
+        return entry.members[name][1]
+    finally:
+        bundle_pool.release(entry)
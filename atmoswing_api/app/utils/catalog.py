@@ -0,0 +1,404 @@
+import bisect
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import NamedTuple
+
+from atmoswing_api import config
+
+
+class CatalogEntry(NamedTuple):
+    """A forecast file known to the catalog."""
+    method: str
+    configuration: str
+    path: str
+    mtime: float
+    size: int
+
+
+def parse_forecast_filename(filename: str) -> tuple[datetime, str, str] | None:
+    """
+    Parse a forecast file name of the form YYYY-MM-DD_HH.method.configuration.nc
+
+    Parameters
+    ----------
+    filename: str
+        The name of the file (without directory).
+
+    Returns
+    -------
+    tuple|None
+        The forecast datetime, the method and the configuration, or None if the
+        file name does not match the expected pattern.
+    """
+    if not filename.endswith(".nc"):
+        return None
+    date_part, _, rest = filename[:-3].partition(".")
+    method, _, configuration = rest.partition(".")
+    if not method or not configuration:
+        return None
+    try:
+        forecast_date = datetime.strptime(date_part, "%Y-%m-%d_%H")
+    except ValueError:
+        return None
+
+    return forecast_date, method, configuration
+
+
+def _list_subdirs(path: str) -> list[str]:
+    with os.scandir(path) as it:
+        return sorted(entry.name for entry in it
+                      if entry.name.isdigit() and entry.is_dir())
+
+
+def _scan_day(path: str) -> dict[datetime, list[CatalogEntry]]:
+    forecasts = {}
+    with os.scandir(path) as it:
+        for entry in it:
+            parsed = parse_forecast_filename(entry.name)
+            if parsed is None:
+                continue
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            forecast_date, method, configuration = parsed
+            forecasts.setdefault(forecast_date, []).append(
+                CatalogEntry(method, configuration, entry.path, st.st_mtime,
+                             st.st_size))
+    for entries in forecasts.values():
+        entries.sort(key=lambda e: e.path)
+
+    return forecasts
+
+
+class RegionCatalog:
+    """
+    Forecast files of a region, organized by forecast datetime.
+
+    The directory tree (region/YYYY/MM/DD) is refreshed incrementally: directories
+    are only listed again when their mtime changed, except the most recent day,
+    which is always rescanned to catch files rewritten in place. Periodic refreshes
+    only check the directories of the latest year and month, and the ones listed
+    again because their parent changed. A full refresh checks all directories; it
+    is done at first, after an invalidation, and every `FULL_REFRESH_INTERVAL`
+    seconds.
+    """
+
+    FULL_REFRESH_INTERVAL = 300.0
+
+    def __init__(self, region_path: str):
+        self.region_path = region_path
+        self.forecasts: dict[datetime, list[CatalogEntry]] = {}
+        self.forecast_dates: list[datetime] = []
+        self.refreshed_at = 0.0
+        self.fully_refreshed_at = 0.0
+        self.dirty = True
+        self.scans = 0
+        self._subdirs: dict[str, tuple[int, list[str]]] = {}
+        self._days: dict[str, tuple[int, dict[datetime, list[CatalogEntry]]]] = {}
+        self._lock = threading.Lock()
+
+    def refresh(self, min_interval: float = 0.0):
+        """
+        Refresh the catalog from the file system if it is older than the given
+        interval or if it was marked as dirty.
+
+        Parameters
+        ----------
+        min_interval: float
+            The minimum time (in seconds) between two refreshes.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if not self.dirty and now - self.refreshed_at < min_interval:
+                return
+            full = self.dirty or \
+                now - self.fully_refreshed_at >= self.FULL_REFRESH_INTERVAL
+            self._refresh(full)
+            self.refreshed_at = time.monotonic()
+            if full:
+                self.fully_refreshed_at = self.refreshed_at
+            self.dirty = False
+
+    def _get_subdirs(self, path: str, check: bool) -> tuple[list[str], bool]:
+        # Returns the subdirectories and whether they were listed again
+        cached = self._subdirs.get(path)
+        if cached is not None and not check:
+            return cached[1], False
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            self._subdirs.pop(path, None)
+            return [], True
+        if cached is not None and cached[0] == mtime:
+            return cached[1], False
+        try:
+            subdirs = _list_subdirs(path)
+        except OSError:
+            subdirs = []
+        self._subdirs[path] = (mtime, subdirs)
+        self.scans += 1
+        return subdirs, True
+
+    def _refresh(self, full: bool):
+        day_paths = []
+        checked = set()
+        years, region_changed = self._get_subdirs(self.region_path, True)
+        for i, year in enumerate(years):
+            year_path = os.path.join(self.region_path, year)
+            latest_year = i == len(years) - 1
+            months, year_changed = self._get_subdirs(
+                year_path, full or region_changed or latest_year)
+            for j, month in enumerate(months):
+                month_path = os.path.join(year_path, month)
+                latest_month = latest_year and j == len(months) - 1
+                days, month_changed = self._get_subdirs(
+                    month_path, full or year_changed or latest_month)
+                paths = [os.path.join(month_path, day) for day in days]
+                day_paths.extend(paths)
+                if full or month_changed or latest_month:
+                    checked.update(paths)
+
+        latest_day = day_paths[-1] if day_paths else None
+        days = {}
+        for day_path in day_paths:
+            cached = self._days.get(day_path)
+            if cached is not None and day_path not in checked:
+                days[day_path] = cached
+                continue
+            try:
+                mtime = os.stat(day_path).st_mtime_ns
+            except OSError:
+                continue
+            if cached is not None and cached[0] == mtime and day_path != latest_day:
+                days[day_path] = cached
+                continue
+            try:
+                days[day_path] = (mtime, _scan_day(day_path))
+                self.scans += 1
+            except OSError:
+                continue
+        self._days = days
+
+        forecasts = {}
+        for _, day_forecasts in days.values():
+            forecasts.update(day_forecasts)
+        self.forecasts = forecasts
+        self.forecast_dates = sorted(forecasts)
+
+
+class ForecastCatalog:
+    """
+    In-memory catalog of the forecast files of all regions:
+    region -> forecast datetime -> (method, configuration, path, mtime, size).
+
+    Regions are cataloged on first access (or at startup with `build`) and are
+    refreshed at most every `refresh_interval` seconds, unless invalidated. Only
+    existing directories are cataloged; lookups on other paths return None so
+    that callers can fall back to the file system.
+    """
+
+    def __init__(self, refresh_interval: float = 10.0):
+        self.refresh_interval = refresh_interval
+        self._regions: dict[str, RegionCatalog] = {}
+        self._lock = threading.Lock()
+
+    def build(self, data_dir: str):
+        """
+        Catalog all the regions of the data directory.
+
+        Parameters
+        ----------
+        data_dir: str
+            The base directory where the region directories are located.
+        """
+        try:
+            regions = [d for d in os.listdir(data_dir)
+                       if not d.startswith('.') and
+                       os.path.isdir(os.path.join(data_dir, d))]
+        except OSError:
+            return
+        for region in regions:
+            self.get_region(str(Path(data_dir, region).resolve()))
+
+    def get_region(self, region_path: str) -> RegionCatalog | None:
+        """
+        Get the up-to-date catalog of a region.
+
+        Parameters
+        ----------
+        region_path: str
+            The resolved path to the region directory.
+
+        Returns
+        -------
+        RegionCatalog|None
+            The catalog of the region, or None if the directory does not exist.
+        """
+        if self.refresh_interval < 0:
+            return None
+        with self._lock:
+            region = self._regions.get(region_path)
+            if region is None:
+                if not os.path.isdir(region_path):
+                    return None
+                region = RegionCatalog(region_path)
+                self._regions[region_path] = region
+        region.refresh(self.refresh_interval)
+
+        return region
+
+    def get_forecast_dates(self, region_path: str) -> list[datetime] | None:
+        """
+        Get the sorted list of the forecast datetimes of a region.
+
+        Parameters
+        ----------
+        region_path: str
+            The resolved path to the region directory.
+
+        Returns
+        -------
+        list|None
+            The forecast datetimes, or None if the region is not cataloged.
+        """
+        region = self.get_region(region_path)
+        if region is None:
+            return None
+
+        return list(region.forecast_dates)
+
+    def get_last_forecast_date(self, region_path: str) -> str | None:
+        """
+        Get the last forecast date of a region.
+
+        Parameters
+        ----------
+        region_path: str
+            The resolved path to the region directory.
+
+        Returns
+        -------
+        str|None
+            The last forecast date in the format "YYYY-MM-DDTHH", or None if the
+            region is not cataloged or has no forecasts.
+        """
+        region = self.get_region(region_path)
+        if region is None or not region.forecast_dates:
+            return None
+
+        return region.forecast_dates[-1].strftime("%Y-%m-%dT%H")
+
+    def get_entries(self, region_path: str,
+                    forecast_date: datetime) -> list[CatalogEntry] | None:
+        """
+        Get the files of a forecast.
+
+        Parameters
+        ----------
+        region_path: str
+            The resolved path to the region directory.
+        forecast_date: datetime
+            The forecast datetime.
+
+        Returns
+        -------
+        list|None
+            The catalog entries of the forecast (possibly empty), or None if the
+            region is not cataloged.
+        """
+        region = self.get_region(region_path)
+        if region is None:
+            return None
+
+        return list(region.forecasts.get(forecast_date, []))
+
+    def get_previous_forecasts(
+            self, region_path: str, forecast_date: datetime, method: str,
+            configuration: str, number: int
+    ) -> list[tuple[datetime, CatalogEntry]] | None:
+        """
+        Get the files of the last forecasts of a method and configuration issued
+        before a given forecast date, whatever the time step between them.
+
+        Parameters
+        ----------
+        region_path: str
+            The resolved path to the region directory.
+        forecast_date: datetime
+            The forecast datetime (excluded).
+        method: str
+            The method of the forecasts.
+        configuration: str
+            The configuration of the forecasts.
+        number: int
+            The maximum number of forecasts to return.
+
+        Returns
+        -------
+        list|None
+            The forecast datetimes and catalog entries, most recent first, or None
+            if the region is not cataloged.
+        """
+        region = self.get_region(region_path)
+        if region is None:
+            return None
+
+        forecasts = region.forecasts
+        forecast_dates = region.forecast_dates
+        previous = []
+        idx = bisect.bisect_left(forecast_dates, forecast_date)
+        while idx > 0 and len(previous) < number:
+            idx -= 1
+            dt = forecast_dates[idx]
+            for entry in forecasts.get(dt, []):
+                if entry.method == method and entry.configuration == configuration:
+                    previous.append((dt, entry))
+                    break
+
+        return previous
+
+    def invalidate(self, region_path: str | None = None):
+        """
+        Mark a region (or all regions) to be refreshed on next access.
+
+        Parameters
+        ----------
+        region_path: str|None
+            The resolved path to the region directory, or None for all regions.
+        """
+        with self._lock:
+            regions = list(self._regions.values()) if region_path is None else \
+                [r for p, r in self._regions.items() if p == region_path]
+        for region in regions:
+            region.dirty = True
+
+    def clear(self):
+        """Forget all cataloged regions."""
+        with self._lock:
+            self._regions.clear()
+
+    def stats(self) -> dict:
+        """
+        Get the catalog counters.
+
+        Returns
+        -------
+        dict
+            The number of regions, forecasts, files and directory scans.
+        """
+        with self._lock:
+            regions = list(self._regions.values())
+        return {
+            "regions": len(regions),
+            "forecasts": sum(len(r.forecast_dates) for r in regions),
+            "files": sum(len(e) for r in regions for e in r.forecasts.values()),
+            "scans": sum(r.scans for r in regions),
+        }
+
+
+forecast_catalog = ForecastCatalog(
+    refresh_interval=config.Settings().catalog_refresh_interval)
@@ -0,0 +1,258 @@
+import contextlib
+import contextvars
+import gzip
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from atmoswing_api import config
+from atmoswing_api.app.utils.logger import get_logger
+
+logger = get_logger()
+
+_COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript",
+                       "application/xml")
+
+# Encodings accepted by the client of the current request, set by the middleware
+_accepted_encodings: contextvars.ContextVar[dict | None] = contextvars.ContextVar(
+    "accepted_encodings", default=None)
+
+
+def _available(encoding: str) -> bool:
+    if encoding == "br":
+        return brotli is not None
+    if encoding == "zstd":
+        return zstandard is not None
+    return encoding == "gzip"
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """
+    Compress a response body.
+
+    Parameters
+    ----------
+    body: bytes
+        The body to compress.
+    encoding: str
+        The content coding: 'gzip', 'br' or 'zstd'.
+
+    Returns
+    -------
+    bytes
+        The compressed body.
+    """
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=5, mtime=0)
+    if encoding == "br":
+        return brotli.compress(body, quality=4)
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=3).compress(body)
+    raise ValueError(f"Unknown content coding ({encoding})")
+
+
+def parse_accept_encoding(header: str | None) -> dict[str, float]:
+    """
+    Parse an Accept-Encoding header into the quality value of each coding.
+
+    Parameters
+    ----------
+    header: str|None
+        The value of the header, e.g. 'gzip, deflate, br;q=0.5'.
+
+    Returns
+    -------
+    dict
+        The codings (lower case) and their quality value.
+    """
+    accepted = {}
+    for item in (header or "").split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding] = quality
+    return accepted
+
+
+def negotiate(accepted: dict[str, float] | None, encodings=None) -> str | None:
+    """
+    Choose the content coding of a response.
+
+    Parameters
+    ----------
+    accepted: dict|None
+        The quality value of the codings accepted by the client (see
+        `parse_accept_encoding`). Defaults to the ones of the current request.
+    encodings: iterable|None
+        The codings that can be used, by order of preference. Defaults to the
+        configured ones.
+
+    Returns
+    -------
+    str|None
+        The coding with the highest quality value (the preferred one on ties), or
+        None if the body must not be compressed.
+    """
+    if accepted is None:
+        accepted = _accepted_encodings.get()
+    if not accepted:
+        return None
+    if encodings is None:
+        encodings = response_encodings
+
+    best, best_quality = None, 0.0
+    for encoding in encodings:
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+@contextlib.contextmanager
+def accepted_encodings(accepted: dict[str, float] | None):
+    """
+    Set the codings accepted by the client of the current request (None for
+    uncompressed responses), which are used to choose among the precompressed
+    variants of the cached responses.
+
+    Parameters
+    ----------
+    accepted: dict|None
+        The quality value of the accepted codings (see `parse_accept_encoding`).
+    """
+    token = _accepted_encodings.set(accepted)
+    try:
+        yield
+    finally:
+        _accepted_encodings.reset(token)
+
+
+def precompress(body: bytes) -> tuple[tuple[str, bytes], ...]:
+    """
+    Compress a body with each of the configured codings, so that the cached
+    responses are not compressed again on every hit. Bodies smaller than the
+    minimum size are not compressed.
+
+    Parameters
+    ----------
+    body: bytes
+        The body to compress.
+
+    Returns
+    -------
+    tuple
+        The (coding, compressed body) variants.
+    """
+    if minimum_size < 0 or len(body) < minimum_size:
+        return ()
+    return tuple((encoding, compress(body, encoding))
+                 for encoding in response_encodings)
+
+
+def _is_compressible(headers: list[tuple[bytes, bytes]]) -> bool:
+    content_type = ""
+    for name, value in headers:
+        name = name.lower()
+        if name == b"content-encoding":
+            return False
+        if name == b"content-type":
+            content_type = value.decode("latin-1").lower()
+    return content_type.startswith(_COMPRESSIBLE_TYPES)
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing the responses with the coding negotiated from the
+    Accept-Encoding header of the request (gzip, and brotli or zstd when the
+    packages are installed). Responses smaller than `minimum_size` bytes, already
+    encoded (e.g. precompressed cached responses) or streamed are sent as is.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.minimum_size < 0:
+            await self.app(scope, receive, send)
+            return
+
+        accepted = None
+        for name, value in scope.get("headers", []):
+            if name == b"accept-encoding":
+                accepted = parse_accept_encoding(value.decode("latin-1"))
+        with accepted_encodings(accepted):
+            await self.app(scope, receive, _CompressingSender(
+                send, negotiate(accepted), self.minimum_size).send)
+
+
+class _CompressingSender:
+
+    def __init__(self, send, encoding: str | None, minimum_size: int):
+        self._send = send
+        self._encoding = encoding
+        self._minimum_size = minimum_size
+        self._start = None
+        self._passthrough = encoding is None
+
+    async def send(self, message):
+        if self._passthrough:
+            await self._send(message)
+            return
+
+        if message["type"] == "http.response.start":
+            self._start = message
+            if message["status"] < 200 or message["status"] in (204, 304) or \
+                    not _is_compressible(message.get("headers", [])):
+                self._passthrough = True
+                await self._send(message)
+            return
+
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        if message.get("more_body", False) or len(body) < self._minimum_size:
+            # Streamed or small responses are sent as is
+            self._passthrough = True
+            await self._send(self._start)
+            await self._send(message)
+            return
+
+        body = compress(body, self._encoding)
+        headers = [(k, v) for k, v in self._start.get("headers", [])
+                   if k.lower() != b"content-length"]
+        headers += [(b"content-encoding", self._encoding.encode()),
+                    (b"vary", b"Accept-Encoding"),
+                    (b"content-length", str(len(body)).encode())]
+        await self._send({**self._start, "headers": headers})
+        await self._send({**message, "body": body})
+
+
+_settings = config.Settings()
+minimum_size = _settings.compression_minimum_size
+response_encodings = []
+for _encoding in _settings.compression_encodings.split(","):
+    _encoding = _encoding.strip().lower()
+    if not _encoding:
+        continue
+    if _available(_encoding):
+        response_encodings.append(_encoding)
+    else:
+        logger.debug(f"Content coding {_encoding} is not available; skipping it.")
@@ -0,0 +1,173 @@
+import hashlib
+import os
+from datetime import datetime
+
+from fastapi import Depends, HTTPException, Request
+from typing_extensions import Annotated
+
+from atmoswing_api import config
+from atmoswing_api.app.utils import executors, utils
+from atmoswing_api.app.utils.catalog import forecast_catalog
+
+# Default number of past forecasts of the history routes
+HISTORY_NUMBER = 5
+
+_settings = config.Settings()
+
+
+def _get_files(region_path: str, forecast_date: datetime) -> list[tuple]:
+    """(path, mtime, size) of the files of a forecast."""
+    entries = forecast_catalog.get_entries(region_path, forecast_date)
+    if entries is None:
+        # Not cataloged: the files are listed from the file system
+        files = []
+        for path in utils.list_files(region_path, forecast_date.strftime("%Y-%m-%dT%H")):
+            st = os.stat(path)
+            files.append((path, st.st_mtime, st.st_size))
+        return files
+
+    return [(e.path, e.mtime, e.size) for e in entries]
+
+
+def _get_history_files(region_path: str, forecast_date: datetime, method: str,
+                       configuration: str, number: int) -> list[tuple]:
+    """(path, mtime, size) of the files of the previous forecasts of a method."""
+    previous = forecast_catalog.get_previous_forecasts(
+        region_path, forecast_date, method, configuration, number)
+    return [(e.path, e.mtime, e.size) for _, e in previous or []]
+
+
+def get_validators(data_dir: str, route_path: str, path_params: dict,
+                   query: list[tuple[str, str]]) -> tuple[str, str] | None:
+    """
+    Compute the ETag and Cache-Control headers of a request, from the fingerprints
+    (path, mtime, size) of the forecast files it depends on and from its parameters,
+    without reading any of these files.
+
+    Parameters
+    ----------
+    data_dir: str
+        The base directory where the region directories are located.
+    route_path: str
+        The path template of the route.
+    path_params: dict
+        The path parameters of the request.
+    query: list
+        The sorted (name, value) query parameters of the request.
+
+    Returns
+    -------
+    tuple|None
+        The ETag and Cache-Control values, or None if the request does not match
+        existing forecasts (the route then reports the error).
+    """
+    region = path_params.get("region")
+    forecast_date = path_params.get("forecast_date")
+    parts = [route_path, repr(sorted(path_params.items())), repr(query)]
+    max_age = _settings.cache_control_max_age_latest
+    immutable = False
+
+    try:
+        if region is None:
+            parts.append(repr(sorted(os.listdir(data_dir))))
+        else:
+            region_path = utils.check_region_path(data_dir, region)
+            last_forecast_date = utils.convert_to_datetime(
+                utils.get_last_forecast_date(data_dir, region))
+            if forecast_date is None or forecast_date == "latest":
+                dt = last_forecast_date
+            else:
+                dt = utils.convert_to_datetime(forecast_date)
+                # Past forecasts are not rewritten anymore
+                if dt < last_forecast_date:
+                    max_age = _settings.cache_control_max_age
+                    immutable = True
+            files = _get_files(region_path, dt)
+            if route_path.endswith("-history"):
+                number = int(dict(query).get("number", HISTORY_NUMBER))
+                files += _get_history_files(
+                    region_path, dt, path_params.get("method"),
+                    path_params.get("configuration"), number)
+            parts.append(dt.isoformat())
+            parts.append(repr(files))
+    except (OSError, ValueError):
+        return None
+
+    digest = hashlib.blake2b("\n".join(parts).encode(), digest_size=8).hexdigest()
+    cache_control = f"public, max-age={max_age}"
+    if immutable:
+        cache_control += ", immutable"
+
+    return f'W/"{digest}"', cache_control
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Weak comparison of an ETag with the value of an If-None-Match header."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    etag = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == etag
+               for tag in if_none_match.split(","))
+
+
+def conditional_get(get_settings):
+    """
+    Create a router dependency computing the ETag of the requests and answering
+    304 Not Modified when it matches the If-None-Match header, before the route
+    reads any forecast file. The ETag and Cache-Control headers are added to the
+    responses by `ConditionalHeadersMiddleware`.
+
+    Parameters
+    ----------
+    get_settings: callable
+        The settings dependency of the router.
+    """
+    async def check_not_modified(
+            request: Request,
+            settings: Annotated[config.Settings, Depends(get_settings)]):
+        route = request.scope.get("route")
+        route_path = route.path if route is not None else request.url.path
+        validators = await executors.run_io(
+            get_validators, settings.data_dir, route_path, dict(request.path_params),
+            sorted(request.query_params.multi_items()))
+        if validators is None:
+            return
+        etag, cache_control = validators
+        headers = {"ETag": etag, "Cache-Control": cache_control}
+        request.state.response_headers = headers
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            raise HTTPException(status_code=304, headers=headers)
+
+    return check_not_modified
+
+
+class ConditionalHeadersMiddleware:
+    """
+    ASGI middleware adding the ETag and Cache-Control headers computed by the
+    `conditional_get` dependency to the successful responses.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start" and \
+                    message["status"] in (200, 304):
+                headers = scope.get("state", {}).get("response_headers")
+                if headers:
+                    names = {name.lower().encode() for name in headers}
+                    raw = [(k, v) for k, v in message.get("headers", [])
+                           if k.lower() not in names]
+                    raw.extend((k.lower().encode(), v.encode())
+                               for k, v in headers.items())
+                    message = {**message, "headers": raw}
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
@@ -0,0 +1,279 @@
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import xarray as xr
+
+from atmoswing_api import config
+
+# Lock serializing the HDF5 calls of the process (opening, reading, writing and
+# closing files, through xarray, h5netcdf or h5py), which are not thread-safe. All
+# the modules accessing HDF5 files take it. It is reentrant because xarray acquires
+# it again when reading the metadata of the files it opens.
+HDF5_LOCK = threading.RLock()
+
+
+class _PoolEntry:
+    """An open dataset together with the bookkeeping needed by the pool."""
+
+    __slots__ = ("file_path", "fingerprint", "dataset", "nbytes", "borrowers",
+                 "retired")
+
+    def __init__(self, file_path: str, fingerprint: tuple, dataset: xr.Dataset):
+        self.file_path = file_path
+        self.fingerprint = fingerprint
+        self.dataset = dataset
+        self.nbytes = int(dataset.nbytes)
+        self.borrowers = 0
+        self.retired = False
+
+
+def file_fingerprint(file_path: str) -> tuple[int, int, int] | None:
+    """
+    Get the identity of a file on disk as (mtime_ns, inode, size).
+
+    Parameters
+    ----------
+    file_path: str
+        The path to the file.
+
+    Returns
+    -------
+    tuple|None
+        The fingerprint of the file, or None if the file cannot be stat'ed.
+    """
+    try:
+        st = os.stat(file_path)
+    except OSError:
+        return None
+
+    return st.st_mtime_ns, st.st_ino, st.st_size
+
+
+def source_fingerprint(file_path: str) -> tuple[int, int] | None:
+    """
+    Get the identity of a forecast file as (mtime_ns, size), which is stored with
+    the data derived from it (sidecars, history stores, bundles and array mirrors)
+    to detect when it is outdated. Unlike `file_fingerprint`, it does not change
+    when the file is copied with its modification time.
+
+    Parameters
+    ----------
+    file_path: str
+        The path to the forecast file.
+
+    Returns
+    -------
+    tuple|None
+        The fingerprint of the file, or None if the file cannot be stat'ed.
+    """
+    fingerprint = file_fingerprint(file_path)
+    if fingerprint is None:
+        return None
+    mtime_ns, _, size = fingerprint
+    return mtime_ns, size
+
+
+def _open(file_path: str) -> xr.Dataset:
+    with HDF5_LOCK:
+        return xr.open_dataset(file_path, engine="h5netcdf", decode_times=False,
+                               lock=HDF5_LOCK)
+
+
+def _close(dataset: xr.Dataset):
+    with HDF5_LOCK:
+        dataset.close()
+
+
+class DatasetPool:
+    """
+    Bounded, thread-safe LRU pool of open NetCDF datasets.
+
+    Datasets are opened with `decode_times=False`: time variables hold the raw
+    numbers stored in the file, and only the slices that are needed are converted
+    (see `utils.decode_dates`), instead of decoding the whole `analog_dates` array.
+
+    Datasets are keyed by file path and are reopened when the file's mtime, inode
+    or size changes (e.g. when AtmoSwing rewrites a forecast). The pool is bounded
+    both by the number of open handles and by the in-memory size of the datasets
+    (as reported by `xarray.Dataset.nbytes`, which is what a fully loaded dataset
+    would use). Entries that are evicted while borrowed are closed once the last
+    borrower returns them. A file is opened by a single thread at a time: the other
+    threads requesting it wait for the opened dataset.
+    """
+
+    def __init__(self, max_handles: int = 64, max_bytes: int = 512 * 1024 ** 2):
+        self.max_handles = max_handles
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, _PoolEntry] = OrderedDict()
+        self._lock = threading.Lock()
+        # file path -> event set when the thread opening it is done
+        self._opening: dict[str, threading.Event] = {}
+        self._nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @contextmanager
+    def open_dataset(self, file_path: str):
+        """
+        Borrow the dataset for a given file from the pool, opening it if needed.
+
+        Files that cannot be fingerprinted are opened and closed directly without
+        being pooled.
+
+        Parameters
+        ----------
+        file_path: str
+            The path to the NetCDF file.
+
+        Yields
+        ------
+        xarray.Dataset
+            The opened dataset. It must not be closed by the caller.
+        """
+        fingerprint = file_fingerprint(file_path)
+        if fingerprint is None or self.max_handles <= 0:
+            ds = _open(file_path)
+            try:
+                yield ds
+            finally:
+                _close(ds)
+            return
+
+        entry = self._acquire(file_path, fingerprint)
+        try:
+            yield entry.dataset
+        finally:
+            self._release(entry)
+
+    def invalidate(self, file_path: str):
+        """
+        Drop the dataset of a given file from the pool.
+
+        Parameters
+        ----------
+        file_path: str
+            The path to the NetCDF file.
+        """
+        with self._lock:
+            entry = self._entries.get(file_path)
+            if entry is not None:
+                self._retire(entry)
+                self.invalidations += 1
+
+    def clear(self):
+        """Drop all datasets from the pool."""
+        with self._lock:
+            for entry in list(self._entries.values()):
+                self._retire(entry)
+
+    def stats(self) -> dict:
+        """
+        Get the pool counters.
+
+        Returns
+        -------
+        dict
+            The number of open handles, their size and the hit, miss, eviction and
+            invalidation counters.
+        """
+        with self._lock:
+            return {
+                "handles": len(self._entries),
+                "bytes": self._nbytes,
+                "max_handles": self.max_handles,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def _acquire(self, file_path: str, fingerprint: tuple) -> _PoolEntry:
+        while True:
+            with self._lock:
+                entry = self._entries.get(file_path)
+                if entry is not None and entry.fingerprint != fingerprint:
+                    self._retire(entry)
+                    self.invalidations += 1
+                    entry = None
+                if entry is not None:
+                    self._entries.move_to_end(file_path)
+                    entry.borrowers += 1
+                    self.hits += 1
+                    return entry
+                opening = self._opening.get(file_path)
+                if opening is None:
+                    opening = self._opening[file_path] = threading.Event()
+                    self.misses += 1
+                    break
+            # Another thread is opening the same file: use its dataset.
+            opening.wait()
+
+        # Open outside the pool lock so that slow opens do not block other files.
+        try:
+            new_entry = _PoolEntry(file_path, fingerprint, _open(file_path))
+        except BaseException:
+            with self._lock:
+                del self._opening[file_path]
+            opening.set()
+            raise
+
+        with self._lock:
+            entry = self._entries.get(file_path)
+            if entry is not None:
+                self._retire(entry)
+            new_entry.borrowers += 1
+            self._entries[file_path] = new_entry
+            self._nbytes += new_entry.nbytes
+            self._evict()
+            del self._opening[file_path]
+        opening.set()
+        return new_entry
+
+    def _release(self, entry: _PoolEntry):
+        with self._lock:
+            entry.borrowers -= 1
+            if entry.retired and entry.borrowers == 0:
+                _close(entry.dataset)
+
+    def _evict(self):
+        # Always keep the most recently used entry, even if it exceeds the budget.
+        while len(self._entries) > 1 and (len(self._entries) > self.max_handles or
+                                          self._nbytes > self.max_bytes):
+            _, entry = next(iter(self._entries.items()))
+            self._retire(entry)
+            self.evictions += 1
+
+    def _retire(self, entry: _PoolEntry):
+        if self._entries.get(entry.file_path) is entry:
+            del self._entries[entry.file_path]
+            self._nbytes -= entry.nbytes
+        entry.retired = True
+        if entry.borrowers == 0:
+            _close(entry.dataset)
+
+
+_settings = config.Settings()
+pool = DatasetPool(max_handles=_settings.dataset_pool_max_handles,
+                   max_bytes=_settings.dataset_pool_max_bytes)
+
+
+def open_dataset(file_path: str):
+    """
+    Borrow the dataset for a given file from the process-wide pool.
+
+    Parameters
+    ----------
+    file_path: str
+        The path to the NetCDF file.
+
+    Returns
+    -------
+    contextmanager
+        A context manager yielding the opened dataset.
+    """
+    return pool.open_dataset(file_path)
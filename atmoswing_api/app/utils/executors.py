@@ -0,0 +1,166 @@
+import asyncio
+import functools
+import multiprocessing
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from atmoswing_api import config
+from atmoswing_api.app.utils.catalog import forecast_catalog
+
+
+class NamedExecutor:
+    """
+    Bounded pool of threads or processes for a class of workload, with counters
+    to monitor its queue depth.
+
+    The pool is created on first use. Process pools use the 'spawn' start method,
+    as forking a process holding open HDF5 files and threads is not safe; the
+    submitted functions and their arguments must therefore be picklable. The
+    optional `initializer` is called at the start of each worker.
+    """
+
+    def __init__(self, name: str, kind: str = "thread", max_workers: int = 8,
+                 initializer=None):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown executor kind ({kind})")
+        self.name = name
+        self.kind = kind
+        self.max_workers = max_workers
+        self.initializer = initializer
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._executor: Executor | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                if self.kind == "process":
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                        initializer=self.initializer)
+                else:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix=f"atmoswing-{self.name}",
+                        initializer=self.initializer)
+            return self._executor
+
+    async def run(self, func, *args, **kwargs):
+        """
+        Run a function in the pool and await its result.
+
+        Parameters
+        ----------
+        func: callable
+            The function to run.
+        args, kwargs:
+            The arguments of the function.
+
+        Returns
+        -------
+        object
+            The result of the function.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self.submitted += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            result = await loop.run_in_executor(
+                self.executor, functools.partial(func, *args, **kwargs))
+        except BaseException:
+            with self._lock:
+                self.failed += 1
+            raise
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+        with self._lock:
+            self.completed += 1
+
+        return result
+
+    def shutdown(self, wait: bool = True):
+        """Shut the pool down; it is created again on next use."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    def stats(self) -> dict:
+        """
+        Get the executor counters.
+
+        Returns
+        -------
+        dict
+            The pool size, the number of running and queued tasks, the maximum
+            number of tasks in flight, and the numbers of submitted, completed and
+            failed tasks.
+        """
+        with self._lock:
+            running = min(self.in_flight, self.max_workers)
+            return {
+                "kind": self.kind,
+                "max_workers": self.max_workers,
+                "running": running,
+                "queued": self.in_flight - running,
+                "max_in_flight": self.max_in_flight,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+            }
+
+
+def init_cpu_process():
+    """
+    Initialize a process of the CPU pool. The invalidations of the parent process
+    (watcher, pub/sub) do not reach it: its dataset pool and file caches check the
+    fingerprint of the files on each access, and its catalog is refreshed on each
+    lookup instead of periodically.
+    """
+    if forecast_catalog.refresh_interval > 0:
+        forecast_catalog.refresh_interval = 0
+
+
+_settings = config.Settings()
+io_executor = NamedExecutor("io", "thread", _settings.executor_io_workers)
+cpu_executor = NamedExecutor("cpu", "process", _settings.executor_cpu_workers,
+                             initializer=init_cpu_process) \
+    if _settings.executor_cpu_workers > 0 else None
+
+
+async def run_io(func, *args, **kwargs):
+    """Run a function reading NetCDF files in the I/O thread pool."""
+    return await io_executor.run(func, *args, **kwargs)
+
+
+async def run_cpu(func, *args, **kwargs):
+    """
+    Run a CPU-bound function in the process pool (or in the I/O thread pool if the
+    process pool is disabled). The processes check that their cached data is up to
+    date (see `init_cpu_process`).
+    """
+    if cpu_executor is None:
+        return await io_executor.run(func, *args, **kwargs)
+    return await cpu_executor.run(func, *args, **kwargs)
+
+
+def stats() -> dict:
+    """Get the counters of all the executors."""
+    executors = [io_executor] + ([cpu_executor] if cpu_executor is not None else [])
+    return {e.name: e.stats() for e in executors}
+
+
+def shutdown(wait: bool = True):
+    """Shut all the executors down."""
+    io_executor.shutdown(wait=wait)
+    if cpu_executor is not None:
+        cpu_executor.shutdown(wait=wait)
@@ -0,0 +1,266 @@
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+import numpy as np
+import xarray
+
+from atmoswing_api.app.utils import utils
+from atmoswing_api.app.utils.dataset_pool import file_fingerprint
+
+
+class ForecastFileIndex:
+    """
+    Lookup tables of a forecast file, built once and reused across requests.
+
+    Holds the cumulative row offsets of the ragged `analogs_nb` blocks, the target
+    dates as int64 seconds (for binary search), a station ID to column mapping and
+    the columns of the relevant stations (`predictand_station_ids` attribute).
+    """
+
+    def __init__(self, ds: xarray.Dataset):
+        analogs_nb = np.asarray(ds.analogs_nb.values, dtype=np.int64)
+        self.analogs_nb = analogs_nb
+        self.row_offsets = np.concatenate(([0], np.cumsum(analogs_nb)))
+
+        target_dates = utils.decode_dates(ds.target_dates.values,
+                                          ds.target_dates.attrs["units"])
+        self.target_seconds = target_dates.astype(np.int64)
+        self.target_dates = target_dates.tolist()
+
+        self.station_ids = [int(x) for x in ds.station_ids.values]
+        self.station_columns = {sid: i for i, sid in enumerate(self.station_ids)}
+
+        relevant_station_ids = ds.attrs.get("predictand_station_ids", "")
+        self.relevant_station_idx = [
+            self.station_columns[int(x)] for x in str(relevant_station_ids).split(",")
+            if x.strip()]
+
+        self.reference_axis = ds.reference_axis.values.tolist() \
+            if "reference_axis" in ds.variables else []
+
+    @property
+    def lead_times_nb(self) -> int:
+        return len(self.analogs_nb)
+
+    def get_rows(self, lead_time_idx: int) -> tuple[int, int]:
+        """
+        Get the start and end rows of the analogs for a given lead time index.
+
+        Parameters
+        ----------
+        lead_time_idx: int
+            The index of the lead time (target date) in the file.
+
+        Returns
+        -------
+        start_idx: int
+            The start index of the analogs in the dataset.
+        end_idx: int
+            The end index of the analogs in the dataset.
+        """
+        return int(self.row_offsets[lead_time_idx]), \
+            int(self.row_offsets[lead_time_idx + 1])
+
+    def get_target_date_index(
+            self,
+            target_date: str | datetime
+    ) -> tuple[int, datetime] | None:
+        """
+        Finds the index of the target date and returns it along with the found date.
+        If the target date is not an exact match, the previous target date is used.
+
+        Parameters
+        ----------
+        target_date: str or datetime
+            The target date to find, can be a string or a datetime object.
+
+        Returns
+        -------
+        target_date_idx: int
+            The index of the target date in the dataset.
+        target_date_found: datetime
+            The date found in the dataset that matches the target date.
+        None is returned if the target date is outside the forecast period.
+        """
+        target_date = utils.convert_to_datetime(target_date)
+        seconds = np.datetime64(target_date, 's').astype(np.int64)
+        idx = int(np.searchsorted(self.target_seconds, seconds, side='right')) - 1
+        if idx < 0:
+            return None
+        if self.target_seconds[idx] != seconds and idx == len(self.target_seconds) - 1:
+            return None
+
+        return idx, self.target_dates[idx]
+
+    def get_row_indices(
+            self,
+            target_date: str | datetime
+    ) -> tuple[int, int, datetime] | None:
+        """
+        Get the start and end rows of the analogs based on the target date.
+
+        Parameters
+        ----------
+        target_date: str or datetime
+            The target date to find, can be a string or a datetime object.
+
+        Returns
+        -------
+        start_idx: int
+            The start index of the analogs in the dataset.
+        end_idx: int
+            The end index of the analogs in the dataset.
+        target_date: datetime
+            The date found in the dataset that matches the target date.
+        None is returned if the target date is outside the forecast period.
+        """
+        result = self.get_target_date_index(target_date)
+        if result is None:
+            return None
+
+        target_date_idx, target_date = result
+        start_idx, end_idx = self.get_rows(target_date_idx)
+
+        return start_idx, end_idx, target_date
+
+    def get_entity_index(self, entity: int | str) -> int:
+        """
+        Get the column of the entity based on the entity ID.
+
+        Parameters
+        ----------
+        entity: int or str
+            The entity ID to find.
+
+        Returns
+        -------
+        entity_idx: int
+            The index of the entity in the dataset.
+        """
+        try:
+            return self.station_columns[int(entity)]
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"Entity not found: {entity}")
+
+    def get_entity_indices(
+            self,
+            entities: list[int | str] | None
+    ) -> tuple[np.ndarray, list[int]]:
+        """
+        Get the columns of several entities based on their IDs.
+
+        Parameters
+        ----------
+        entities: list or None
+            The entity IDs to find. None selects all the entities of the file.
+
+        Returns
+        -------
+        entities_idx: ndarray
+            The indices of the entities in the dataset.
+        entity_ids: list
+            The IDs of the entities, in the same order.
+        """
+        if entities is None:
+            return np.arange(len(self.station_ids)), list(self.station_ids)
+
+        entities_idx = [self.get_entity_index(entity) for entity in entities]
+        return np.asarray(entities_idx, dtype=np.int64), \
+            [self.station_ids[idx] for idx in entities_idx]
+
+    def get_reference_index(self, normalize: int | float) -> int:
+        """
+        Get the index of a reference value (e.g. return period) on the reference axis.
+
+        Parameters
+        ----------
+        normalize: int or float
+            The value on the reference axis.
+
+        Returns
+        -------
+        ref_idx: int
+            The index on the reference axis.
+        """
+        try:
+            return self.reference_axis.index(normalize)
+        except ValueError:
+            raise ValueError(f"normalize must be in {self.reference_axis}")
+
+
+class ForecastIndexCache:
+    """Thread-safe LRU cache of forecast file indexes keyed by (path, mtime)."""
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[tuple, ForecastFileIndex]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, file_path: str, ds: xarray.Dataset) -> ForecastFileIndex:
+        """
+        Get the index of a forecast file, building it from the dataset if needed.
+
+        Parameters
+        ----------
+        file_path: str
+            The path to the forecast file.
+        ds: xarray.Dataset
+            The opened dataset of the forecast file.
+
+        Returns
+        -------
+        ForecastFileIndex
+            The index of the forecast file.
+        """
+        fingerprint = file_fingerprint(file_path)
+        if fingerprint is None:
+            return ForecastFileIndex(ds)
+
+        with self._lock:
+            cached = self._entries.get(file_path)
+            if cached is not None and cached[0] == fingerprint:
+                self._entries.move_to_end(file_path)
+                return cached[1]
+
+        index = ForecastFileIndex(ds)
+
+        with self._lock:
+            self._entries[file_path] = (fingerprint, index)
+            self._entries.move_to_end(file_path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        return index
+
+    def invalidate(self, file_path: str):
+        """Drop the index of a given file."""
+        with self._lock:
+            self._entries.pop(file_path, None)
+
+    def clear(self):
+        """Drop all indexes."""
+        with self._lock:
+            self._entries.clear()
+
+
+index_cache = ForecastIndexCache()
+
+
+def get_index(file_path: str, ds: xarray.Dataset) -> ForecastFileIndex:
+    """
+    Get the cached index of a forecast file.
+
+    Parameters
+    ----------
+    file_path: str
+        The path to the forecast file.
+    ds: xarray.Dataset
+        The opened dataset of the forecast file.
+
+    Returns
+    -------
+    ForecastFileIndex
+        The index of the forecast file.
+    """
+    return index_cache.get(file_path, ds)
@@ -0,0 +1,297 @@
+import os
+from datetime import datetime
+
+import h5py
+import numpy as np
+
+from atmoswing_api.app.utils import dataset_pool, forecast_index, percentile_sidecar
+from atmoswing_api.app.utils.catalog import parse_forecast_filename
+from atmoswing_api.app.utils.logger import get_logger
+
+logger = get_logger()
+
+HISTORY_DIR = ".history"
+STORE_VERSION = 2
+
+
+def get_store_path(data_dir: str, region: str, method: str, configuration: str) -> str:
+    """
+    Get the path of the percentile history store of a method and configuration:
+    data_dir/.history/region/method.configuration, holding one file per run.
+
+    Parameters
+    ----------
+    data_dir: str
+        The base directory where the region directories are located.
+    region: str
+        The region name.
+    method: str
+        The method of the forecasts.
+    configuration: str
+        The configuration of the forecasts.
+
+    Returns
+    -------
+    str
+        The path to the store directory.
+    """
+    return os.path.join(data_dir, HISTORY_DIR, region, f"{method}.{configuration}")
+
+
+def get_run_path(store_path: str, forecast_date: datetime) -> str:
+    """
+    Get the path of the file of a run in a history store:
+    store_path/YYYY-MM-DD_HH.h5
+
+    Parameters
+    ----------
+    store_path: str
+        The path to the store directory.
+    forecast_date: datetime
+        The forecast date of the run.
+
+    Returns
+    -------
+    str
+        The path to the run file.
+    """
+    return os.path.join(store_path, f"{forecast_date:%Y-%m-%d_%H}.h5")
+
+
+def _parse_run_filename(name: str) -> datetime | None:
+    if not name.endswith(".h5"):
+        return None
+    try:
+        return datetime.strptime(name[:-3], "%Y-%m-%d_%H")
+    except ValueError:
+        return None
+
+
+def _write_run(run_path: str, fingerprint: tuple, station_ids: list[int],
+               target_seconds: np.ndarray, grid: np.ndarray):
+    # The run files are written once and never modified: the readers do not take
+    # any lock, so the file is written aside and moved into place once complete.
+    tmp_path = f"{run_path}.{os.getpid()}.tmp"
+    try:
+        # Opened like the readers of the same process (see read_entity_history)
+        with dataset_pool.HDF5_LOCK, h5py.File(tmp_path, "w", locking=False) as h5:
+            h5.attrs["version"] = STORE_VERSION
+            h5.attrs["source_fingerprint"] = np.asarray(fingerprint, dtype=np.int64)
+            h5.create_dataset("station_ids",
+                              data=np.asarray(station_ids, dtype=np.int64))
+            h5.create_dataset("percentiles", data=percentile_sidecar.GRID_PERCENTILES)
+            h5.create_dataset("target_dates",
+                              data=np.asarray(target_seconds, dtype=np.int64))
+            # One chunk per entity: reading the history of an entity reads a single
+            # chunk per run
+            h5.create_dataset("values", data=grid.astype(np.float32),
+                              chunks=(1,) + grid.shape[1:],
+                              compression="gzip", compression_opts=4, shuffle=True)
+        os.replace(tmp_path, run_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _stored_fingerprint(run_path: str) -> tuple | None:
+    try:
+        with dataset_pool.HDF5_LOCK, h5py.File(run_path, "r", locking=False) as h5:
+            if h5.attrs.get("version") != STORE_VERSION:
+                return None
+            return tuple(int(v) for v in h5.attrs["source_fingerprint"])
+    except (OSError, KeyError) as e:
+        logger.warning("Failed to read the history run %s: %s", run_path, e)
+        return None
+
+
+def append_forecast(data_dir: str, region: str, file_path: str) -> bool:
+    """
+    Add the percentiles 0-100 of all entities and lead times of a forecast file
+    to the history store of its method and configuration, as a new run file. The
+    other runs are not touched; a run that is already stored is only rewritten
+    when its file has changed.
+
+    Parameters
+    ----------
+    data_dir: str
+        The base directory where the region directories are located.
+    region: str
+        The region name.
+    file_path: str
+        The path to the forecast file (.nc).
+
+    Returns
+    -------
+    bool
+        True if the run was written.
+    """
+    parsed = parse_forecast_filename(os.path.basename(file_path))
+    if parsed is None:
+        raise ValueError(f"Not a forecast file: {file_path}")
+    forecast_date, method, configuration = parsed
+    fingerprint = dataset_pool.source_fingerprint(file_path)
+    if fingerprint is None:
+        raise FileNotFoundError(f"File not found: {file_path}")
+
+    store_path = get_store_path(data_dir, region, method, configuration)
+    run_path = get_run_path(store_path, forecast_date)
+    if os.path.exists(run_path) and _stored_fingerprint(run_path) == fingerprint:
+        return False
+    os.makedirs(store_path, exist_ok=True)
+
+    grid = percentile_sidecar.sidecar_cache.get(file_path)
+    if grid is None:
+        _, grid = percentile_sidecar.compute_grid(file_path)
+    with dataset_pool.open_dataset(file_path) as ds:
+        index = forecast_index.get_index(file_path, ds)
+        station_ids = list(index.station_ids)
+        target_seconds = index.target_seconds
+
+    # Several workers may ingest the same run (see the watcher warmup): they write
+    # the same content, and the last replacement wins
+    _write_run(run_path, fingerprint, station_ids, target_seconds, grid)
+
+    return True
+
+
+def read_entity_history(
+        data_dir: str, region: str, method: str, configuration: str, entity: int,
+        forecasts: list[tuple[datetime, str]], percentiles: list[int]
+) -> dict[datetime, tuple[list[datetime], np.ndarray]]:
+    """
+    Read the percentile series of an entity for several runs from the history
+    store, reading the chunk of the entity in each run file. Runs that are not stored, or whose forecast file has
+    changed since it was stored, are not returned and must be read from the files.
+
+    Parameters
+    ----------
+    data_dir: str
+        The base directory where the region directories are located.
+    region: str
+        The region name.
+    method: str
+        The method of the forecasts.
+    configuration: str
+        The configuration of the forecasts.
+    entity: int
+        The entity ID.
+    forecasts: list
+        The forecast datetimes and file paths of the runs to read.
+    percentiles: list
+        The percentiles to read (0-100).
+
+    Returns
+    -------
+    dict
+        The target dates and the percentile values (percentiles x lead times) of
+        the stored runs, keyed by forecast datetime.
+    """
+    percentiles = np.asarray(percentiles)
+    if not forecasts or percentiles.size == 0 or \
+            np.any(percentiles != np.round(percentiles)) or \
+            percentiles.min() < 0 or percentiles.max() > 100:
+        return {}
+
+    store_path = get_store_path(data_dir, region, method, configuration)
+    if not os.path.isdir(store_path):
+        return {}
+
+    history = {}
+    pc_idx = percentiles.astype(np.int64)
+    for dt, file_path in forecasts:
+        run_path = get_run_path(store_path, dt)
+        if not os.path.exists(run_path):
+            continue
+        try:
+            # The run files are replaced instead of modified: no file lock is
+            # needed
+            with dataset_pool.HDF5_LOCK, \
+                    h5py.File(run_path, "r", locking=False) as h5:
+                if h5.attrs.get("version") != STORE_VERSION or \
+                        tuple(int(v) for v in h5.attrs["source_fingerprint"]) != \
+                        dataset_pool.source_fingerprint(file_path):
+                    continue
+                station_ids = h5["station_ids"][:].tolist()
+                if int(entity) not in station_ids:
+                    continue
+                values = h5["values"][station_ids.index(int(entity))]
+                target_dates = h5["target_dates"][:]
+        except (OSError, KeyError, ValueError) as e:
+            logger.warning("Failed to read the history run %s: %s", run_path, e)
+            continue
+
+        history[dt] = (target_dates.astype('datetime64[s]').tolist(),
+                       values[:, pc_idx].astype(np.float64).T)
+
+    return history
+
+
+def prune_store(store_path: str, before: datetime) -> int:
+    """
+    Remove the runs older than a given date from a history store. The store
+    directory is removed when no run is left.
+
+    Parameters
+    ----------
+    store_path: str
+        The path to the store directory.
+    before: datetime
+        The forecast date of the oldest run to keep.
+
+    Returns
+    -------
+    int
+        The number of runs removed.
+    """
+    removed = 0
+    for name in os.listdir(store_path):
+        forecast_date = _parse_run_filename(name)
+        if forecast_date is not None and forecast_date < before:
+            os.remove(os.path.join(store_path, name))
+            removed += 1
+
+    if not os.listdir(store_path):
+        os.rmdir(store_path)
+
+    return removed
+
+
+def prune_history(data_dir: str, before: datetime) -> int:
+    """
+    Remove the runs older than a given date from all the history stores of the
+    data directory (e.g. when the forecast files are removed). The stores of
+    previous versions (single .h5 files) are removed.
+
+    Parameters
+    ----------
+    data_dir: str
+        The base directory where the region directories are located.
+    before: datetime
+        The forecast date of the oldest run to keep.
+
+    Returns
+    -------
+    int
+        The number of runs removed.
+    """
+    history_dir = os.path.join(data_dir, HISTORY_DIR)
+    if not os.path.isdir(history_dir):
+        return 0
+
+    removed = 0
+    for region in sorted(os.listdir(history_dir)):
+        region_dir = os.path.join(history_dir, region)
+        if not os.path.isdir(region_dir):
+            continue
+        for name in sorted(os.listdir(region_dir)):
+            store_path = os.path.join(region_dir, name)
+            try:
+                if os.path.isdir(store_path):
+                    removed += prune_store(store_path, before)
+                elif name.endswith((".h5", ".h5.lock")):
+                    os.remove(store_path)
+            except OSError as e:
+                logger.warning("Failed to prune the history store %s: %s",
+                               store_path, e)
+
+    return removed
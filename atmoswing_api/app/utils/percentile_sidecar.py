@@ -0,0 +1,229 @@
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from atmoswing_api import config
+from atmoswing_api.app.utils import dataset_pool, utils
+
+SIDECAR_SUFFIX = ".pct.npz"
+SIDECAR_VERSION = 1
+# The sidecar holds the percentiles 0, 1, ..., 100
+GRID_PERCENTILES = np.arange(101)
+
+
+def get_sidecar_path(file_path: str) -> str:
+    """
+    Get the path of the percentile sidecar of a forecast file, which is stored next
+    to it: YYYY-MM-DD_HH.method.configuration.pct.npz
+
+    Parameters
+    ----------
+    file_path: str
+        The path to the forecast file (.nc).
+
+    Returns
+    -------
+    str
+        The path to the sidecar file.
+    """
+    base = file_path[:-3] if file_path.endswith(".nc") else file_path
+    return base + SIDECAR_SUFFIX
+
+
+def compute_grid(file_path: str) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Compute the percentiles 0-100 of the analog values of a forecast file for all
+    entities and lead times.
+
+    Parameters
+    ----------
+    file_path: str
+        The path to the forecast file (.nc).
+
+    Returns
+    -------
+    analogs_nb: ndarray
+        The number of analogs per lead time.
+    grid: ndarray
+        The percentiles with shape (entities, lead times, 101).
+    """
+    with dataset_pool.open_dataset(file_path) as ds:
+        analogs_nb = np.asarray(ds.analogs_nb.values, dtype=np.int64)
+        analog_values = ds.analog_values_raw.astype(float).values
+        grid = utils.compute_analog_percentiles(analog_values, analogs_nb,
+                                                GRID_PERCENTILES)
+
+    return analogs_nb, grid
+
+
+def build_sidecar(file_path: str) -> str:
+    """
+    Compute the percentiles 0-100 of the analog values of a forecast file for all
+    entities and lead times, and store them in a sidecar file.
+
+    Parameters
+    ----------
+    file_path: str
+        The path to the forecast file (.nc).
+
+    Returns
+    -------
+    str
+        The path to the sidecar file.
+    """
+    fingerprint = dataset_pool.source_fingerprint(file_path)
+    if fingerprint is None:
+        raise FileNotFoundError(f"File not found: {file_path}")
+
+    analogs_nb, grid = compute_grid(file_path)
+
+    sidecar_path = get_sidecar_path(file_path)
+    tmp_path = f"{sidecar_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            np.savez_compressed(
+                f, percentiles=grid, analogs_nb=analogs_nb,
+                source_fingerprint=np.asarray(fingerprint, dtype=np.int64),
+                version=np.asarray(SIDECAR_VERSION))
+        os.replace(tmp_path, sidecar_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    return sidecar_path
+
+
+def is_sidecar_up_to_date(file_path: str) -> bool:
+    """
+    Check if the sidecar of a forecast file exists and matches the current file.
+
+    Parameters
+    ----------
+    file_path: str
+        The path to the forecast file (.nc).
+
+    Returns
+    -------
+    bool
+        True if the sidecar can be used.
+    """
+    fingerprint = dataset_pool.source_fingerprint(file_path)
+    return _load_sidecar(file_path, fingerprint) is not None
+
+
+def _load_sidecar(file_path: str, fingerprint: tuple | None) -> np.ndarray | None:
+    if fingerprint is None:
+        return None
+    try:
+        with np.load(get_sidecar_path(file_path)) as data:
+            if int(data["version"]) != SIDECAR_VERSION:
+                return None
+            if tuple(data["source_fingerprint"].tolist()) != fingerprint:
+                return None
+            return data["percentiles"]
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+class SidecarCache:
+    """
+    Thread-safe LRU cache of the loaded percentile grids, bounded in bytes.
+    Grids are checked against the (mtime, size) of their forecast file, so that
+    stale sidecars are never used.
+    """
+
+    def __init__(self, max_bytes: int = 128 * 1024 ** 2):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._entries: OrderedDict[str, tuple[tuple, np.ndarray]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, file_path: str) -> np.ndarray | None:
+        """
+        Get the percentile grid of a forecast file.
+
+        Parameters
+        ----------
+        file_path: str
+            The path to the forecast file (.nc).
+
+        Returns
+        -------
+        ndarray|None
+            The percentiles 0-100 with shape (entities, lead times, 101), or None
+            if there is no up-to-date sidecar.
+        """
+        fingerprint = dataset_pool.source_fingerprint(file_path)
+        if fingerprint is None:
+            return None
+
+        with self._lock:
+            cached = self._entries.get(file_path)
+            if cached is not None and cached[0] == fingerprint:
+                self._entries.move_to_end(file_path)
+                return cached[1]
+
+        grid = _load_sidecar(file_path, fingerprint)
+        if grid is None or grid.nbytes > self.max_bytes:
+            return grid
+
+        with self._lock:
+            self._pop(file_path)
+            self._entries[file_path] = (fingerprint, grid)
+            self.nbytes += grid.nbytes
+            while self.nbytes > self.max_bytes:
+                self._pop(next(iter(self._entries)))
+
+        return grid
+
+    def invalidate(self, file_path: str):
+        """Drop the grid of a given file."""
+        with self._lock:
+            self._pop(file_path)
+
+    def clear(self):
+        """Drop all grids."""
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def _pop(self, file_path: str):
+        entry = self._entries.pop(file_path, None)
+        if entry is not None:
+            self.nbytes -= entry[1].nbytes
+
+
+sidecar_cache = SidecarCache(
+    max_bytes=config.Settings().percentile_sidecar_cache_bytes)
+
+
+def get_percentiles(file_path: str, percentiles: list[int]) -> np.ndarray | None:
+    """
+    Get percentiles of the analog values from the sidecar of a forecast file.
+
+    Parameters
+    ----------
+    file_path: str
+        The path to the forecast file (.nc).
+    percentiles: list
+        The percentiles to get (0-100).
+
+    Returns
+    -------
+    ndarray|None
+        The percentile values with shape (entities, lead times, percentiles), or
+        None if there is no up-to-date sidecar or if some percentiles are not
+        integers (which must then be computed from the analog values).
+    """
+    percentiles = np.asarray(percentiles)
+    if percentiles.size and (np.any(percentiles != np.round(percentiles)) or
+                             percentiles.min() < 0 or percentiles.max() > 100):
+        return None
+
+    grid = sidecar_cache.get(file_path)
+    if grid is None:
+        return None
+
+    return grid[:, :, percentiles.astype(np.int64)]
@@ -0,0 +1,249 @@
+import os
+
+import h5py
+import numpy as np
+
+from atmoswing_api.app.utils import dataset_pool
+from atmoswing_api.app.utils.bundle import copy_attributes, copy_variables
+
+# Variables indexed by (entity, analog), sliced per entity and per lead time
+ENTITY_ANALOG_VARIABLES = ("analog_values_raw", "analog_values_norm")
+# Variables indexed by analog, sliced per lead time
+ANALOG_VARIABLES = ("analog_dates", "analog_criteria")
+# Variables indexed by (entity, reference axis), sliced per entity
+ENTITY_VARIABLES = ("reference_values",)
+# Format of the rewritten files: the chunk indices of HDF5 1.10 are much smaller
+# than the B-trees of the earlier versions (readable with netCDF 4.6 and above)
+FILE_FORMAT = ("v110", "v110")
+
+
+def get_layouts(h5: h5py.File, entities_per_chunk: int = 8,
+                lead_times_per_chunk: int = 4,
+                compression_level: int = 4) -> dict[str, dict]:
+    """
+    Get the storage options of the analog variables of a forecast file for the
+    access patterns of the API: a chunk holds the analogs of a few lead times for
+    a few entities, so that the series of an entity and the map of a lead time
+    only decompress the chunks of this entity or lead time, instead of the whole
+    variable. Contiguous variables are left as they are, as their slices are
+    already read directly.
+
+    Parameters
+    ----------
+    h5: h5py.File
+        The opened forecast file.
+    entities_per_chunk: int
+        The number of entities per chunk.
+    lead_times_per_chunk: int
+        The number of lead times per chunk (on the largest number of analogs).
+    compression_level: int
+        The gzip compression level.
+
+    Returns
+    -------
+    dict
+        The chunks, compression, compression_opts and shuffle options, by
+        variable name.
+    """
+    analogs_nb = h5["analogs_nb"][()]
+    if analogs_nb.size == 0 or int(analogs_nb.max()) <= 0:
+        return {}
+    analog_columns = lead_times_per_chunk * int(analogs_nb.max())
+
+    layouts = {}
+    for name in ENTITY_ANALOG_VARIABLES + ANALOG_VARIABLES + ENTITY_VARIABLES:
+        if name not in h5 or h5[name].chunks is None or 0 in h5[name].shape:
+            continue
+        shape = h5[name].shape
+        if name in ENTITY_ANALOG_VARIABLES:
+            chunks = (min(shape[0], entities_per_chunk), min(shape[1], analog_columns))
+        elif name in ANALOG_VARIABLES:
+            chunks = (min(shape[0], analog_columns),)
+        else:
+            chunks = (min(shape[0], entities_per_chunk), shape[1])
+        layouts[name] = dict(chunks=chunks, compression="gzip",
+                             compression_opts=compression_level, shuffle=False)
+
+    return layouts
+
+
+def is_rechunked(h5: h5py.File, layouts: dict[str, dict]) -> bool:
+    """
+    Check whether the variables of a forecast file already have the given storage
+    options.
+
+    Parameters
+    ----------
+    h5: h5py.File
+        The opened forecast file.
+    layouts: dict
+        The storage options by variable name (see `get_layouts`).
+
+    Returns
+    -------
+    bool
+        True if no variable needs to be rewritten.
+    """
+    return all(h5[name].chunks == layout["chunks"] and
+               h5[name].compression == layout["compression"] and
+               h5[name].compression_opts == layout["compression_opts"] and
+               h5[name].shuffle == layout["shuffle"]
+               for name, layout in layouts.items())
+
+
+def rechunk_file(file_path: str, output_path: str | None = None,
+                 **layout_options) -> bool:
+    """
+    Rewrite a forecast file with the storage options of `get_layouts`. The values,
+    attributes and dimensions are unchanged, and so is the modification time of
+    the file.
+
+    Parameters
+    ----------
+    file_path: str
+        The path to the forecast file (.nc).
+    output_path: str|None
+        The path of the rewritten file. Defaults to the forecast file, which is
+        replaced.
+    layout_options
+        The options of `get_layouts`.
+
+    Returns
+    -------
+    bool
+        True if the file was written, False if it already had these options.
+    """
+    output_path = output_path or file_path
+    tmp_path = f"{output_path}.tmp"
+    st = os.stat(file_path)
+    try:
+        # Run by the ingest script: holding the lock during the copy does not delay
+        # requests
+        with dataset_pool.HDF5_LOCK, h5py.File(file_path, "r") as src:
+            layouts = get_layouts(src, **layout_options)
+            if output_path == file_path and is_rechunked(src, layouts):
+                return False
+            os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+            with h5py.File(tmp_path, "w", libver=FILE_FORMAT) as dst:
+                copy_attributes(src, dst)
+                copy_variables(src, dst, list(src), layouts)
+        # The age of the forecasts is given by the modification time of their files
+        os.utime(tmp_path, ns=(st.st_atime_ns, st.st_mtime_ns))
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    return True
+
+
+def _chunk_sizes(dataset: h5py.Dataset) -> np.ndarray:
+    """The stored size of the chunks of a dataset, on the grid of its chunks."""
+    grid = tuple(-(-n // c) for n, c in zip(dataset.shape, dataset.chunks))
+    sizes = np.zeros(grid, dtype=np.int64)
+    for i in range(dataset.id.get_num_chunks()):
+        info = dataset.id.get_chunk_info(i)
+        position = tuple(o // c for o, c in zip(info.chunk_offset, dataset.chunks))
+        sizes[position] = info.size
+    return sizes
+
+
+def _selection_bytes(dataset: h5py.Dataset, sizes: np.ndarray | None,
+                     selection: tuple[slice, ...]) -> tuple[int, int]:
+    """Bytes read from the file and decompressed to read a selection."""
+    if dataset.chunks is None:
+        # Contiguous storage: only the selected values are read
+        count = np.prod([len(range(*s.indices(n)))
+                         for s, n in zip(selection, dataset.shape)])
+        return int(count) * dataset.dtype.itemsize, 0
+
+    grid = tuple(slice(s.indices(n)[0] // c, (s.indices(n)[1] - 1) // c + 1)
+                 for s, n, c in zip(selection, dataset.shape, dataset.chunks))
+    touched = sizes[grid]
+    chunk_bytes = int(np.prod(dataset.chunks)) * dataset.dtype.itemsize
+    decoded = touched.size * chunk_bytes if dataset.compression else 0
+    return int(touched.sum()), decoded
+
+
+def get_access_patterns(h5: h5py.File) -> dict[str, list[list[tuple[str, tuple]]]]:
+    """
+    Get the reads of the endpoints of the API on a forecast file: for each
+    endpoint, the requests it can receive (one per entity and/or lead time), each
+    being a list of (variable, selection).
+
+    Parameters
+    ----------
+    h5: h5py.File
+        The opened forecast file.
+
+    Returns
+    -------
+    dict
+        The requests by endpoint.
+    """
+    entities_nb = h5["analog_values_raw"].shape[0]
+    analogs_nb = h5["analogs_nb"][()].astype(int)
+    ends = np.cumsum(analogs_nb)
+    lead_times = [slice(int(end - nb), int(end)) for end, nb in zip(ends, analogs_nb)]
+    entities = [slice(i, i + 1) for i in range(entities_nb)]
+    everything = slice(None)
+    first = slice(0, 1)
+
+    return {
+        "{entity}/{lead_time}/analog-values": [
+            [("analog_values_raw", (e, lt))] for e in entities for lt in lead_times],
+        "{entity}/{lead_time}/analogs": [
+            [("analog_values_raw", (e, lt)), ("analog_dates", (lt,)),
+             ("analog_criteria", (lt,))] for e in entities for lt in lead_times],
+        "{lead_time}/analog-dates": [
+            [("analog_dates", (lt,))] for lt in lead_times],
+        "{entity}/series-values-percentiles": [
+            [("analog_values_raw", (e, everything))] for e in entities],
+        "{entity}/reference-values": [
+            [("reference_values", (e, everything))] for e in entities],
+        "{lead_time}/entities-analog-values-percentiles": [
+            [("analog_values_raw", (everything, lt))] for lt in lead_times],
+        "{lead_time}/entities-values-percentile": [
+            [("analog_values_raw", (everything, lt)),
+             ("reference_values", (everything, first))] for lt in lead_times],
+        "entities-series-values-percentiles": [
+            [("analog_values_raw", (everything, everything))]],
+    }
+
+
+def measure_file(file_path: str) -> dict[str, tuple[float, float]]:
+    """
+    Measure the bytes read by the endpoints of the API on a forecast file, from
+    the chunk index of its variables (the data is not read).
+
+    Parameters
+    ----------
+    file_path: str
+        The path to the forecast file (.nc).
+
+    Returns
+    -------
+    dict
+        The mean number of bytes read from the file and decompressed per request,
+        by endpoint.
+    """
+    results = {}
+    with dataset_pool.HDF5_LOCK, h5py.File(file_path, "r") as h5:
+        sizes = {}
+        for endpoint, requests in get_access_patterns(h5).items():
+            read = decoded = 0
+            for request in requests:
+                for name, selection in request:
+                    if name not in h5:
+                        continue
+                    dataset = h5[name]
+                    if name not in sizes:
+                        sizes[name] = _chunk_sizes(dataset) if dataset.chunks else None
+                    request_read, request_decoded = _selection_bytes(
+                        dataset, sizes[name], selection)
+                    read += request_read
+                    decoded += request_decoded
+            results[endpoint] = (read / max(len(requests), 1),
+                                 decoded / max(len(requests), 1))
+
+    return results
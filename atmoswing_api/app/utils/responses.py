@@ -0,0 +1,199 @@
+import functools
+import typing
+from datetime import datetime
+
+import numpy as np
+from fastapi.responses import Response
+from pydantic import AfterValidator, BaseModel
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from atmoswing_api import config
+from atmoswing_api.app.utils.logger import get_logger
+
+logger = get_logger()
+
+# Field kinds of a serialization plan
+_RAW = 0
+_ROUND = 1
+_DATETIME = 2
+_MODEL = 3
+
+
+class FastJSONResponse(Response):
+    """JSON response serialized with orjson (NumPy arrays and scalars included)."""
+
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY |
+                            orjson.OPT_NON_STR_KEYS)
+
+
+def _unwrap(annotation) -> tuple[typing.Any, list]:
+    """Strip Optional and Annotated from a type, returning it with its metadata."""
+    metadata = []
+    while True:
+        origin = typing.get_origin(annotation)
+        if origin is typing.Annotated:
+            metadata.extend(annotation.__metadata__)
+            annotation = typing.get_args(annotation)[0]
+        elif origin is typing.Union:
+            args = [a for a in typing.get_args(annotation) if a is not type(None)]
+            if len(args) != 1:
+                return annotation, metadata
+            annotation = args[0]
+        else:
+            return annotation, metadata
+
+
+def _get_ndigits(metadata: list) -> int | None:
+    for item in metadata:
+        if isinstance(item, AfterValidator):
+            ndigits = getattr(item.func, "ndigits", None)
+            if ndigits is not None:
+                return ndigits
+    return None
+
+
+def _field_plan(annotation, metadata: list) -> tuple[int, typing.Any, int]:
+    annotation, inner_metadata = _unwrap(annotation)
+    metadata = metadata + inner_metadata
+    depth = 0
+    while typing.get_origin(annotation) in (list, typing.List):
+        depth += 1
+        annotation, metadata = _unwrap(typing.get_args(annotation)[0])
+
+    ndigits = _get_ndigits(metadata)
+    if ndigits is not None:
+        return _ROUND, ndigits, depth
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return _MODEL, get_plan(annotation), depth
+    if annotation is datetime:
+        return _DATETIME, None, depth
+    return _RAW, None, depth
+
+
+@functools.lru_cache(maxsize=None)
+def get_plan(model: type[BaseModel]) -> tuple:
+    """
+    Get the serialization plan of a response model: for each field, whether it
+    is kept as is, rounded (`round_to` validator), parsed as a datetime or
+    serialized as a nested model, and at which list depth.
+
+    Parameters
+    ----------
+    model: type
+        The Pydantic response model.
+
+    Returns
+    -------
+    tuple
+        The (name, kind, argument, depth) of each field.
+    """
+    return tuple((name, *_field_plan(field.annotation, list(field.metadata)))
+                 for name, field in model.model_fields.items())
+
+
+def _round(value, ndigits: int):
+    try:
+        return np.round(np.asarray(value, dtype=np.float64), ndigits).tolist()
+    except (TypeError, ValueError):
+        # Ragged lists or missing values
+        if isinstance(value, (list, tuple, np.ndarray)):
+            return [_round(v, ndigits) for v in value]
+        return None if value is None else round(float(value), ndigits)
+
+
+def _to_datetime(value):
+    # Cached results hold dates as ISO strings
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return value
+    return value
+
+
+def _map(func, value, depth: int):
+    if depth == 0 or value is None:
+        return func(value)
+    return [_map(func, v, depth - 1) for v in value]
+
+
+def build_payload(model: type[BaseModel], data) -> dict:
+    """
+    Build the content of a response from the result of a service, as the response
+    model would serialize it (with `response_model_exclude_none=True`), without
+    validating every value. Floats annotated with `round_to` are rounded with
+    NumPy on whole lists at once.
+
+    Parameters
+    ----------
+    model: type
+        The Pydantic response model.
+    data: dict
+        The result of the service.
+
+    Returns
+    -------
+    dict
+        The content of the response, ready to be serialized to JSON.
+    """
+    return _build(get_plan(model), data)
+
+
+def _build(plan: tuple, data) -> dict:
+    if isinstance(data, BaseModel):
+        data = data.__dict__
+    payload = {}
+    for name, kind, arg, depth in plan:
+        value = data.get(name)
+        if value is None:
+            continue
+        if kind == _ROUND:
+            value = _round(value, arg)
+        elif kind == _DATETIME:
+            value = _map(_to_datetime, value, depth)
+        elif kind == _MODEL:
+            value = _map(functools.partial(_build, arg), value, depth)
+        payload[name] = value
+
+    return payload
+
+
+def fast_json_response(model: type[BaseModel]):
+    """
+    Decorator returning the result of a route as a FastJSONResponse built from the
+    response model, which bypasses the validation of the response by FastAPI. The
+    `response_model` of the route is still used for the OpenAPI schema. It is to be
+    placed below `redis_cache`, so that the serialized responses are cached.
+
+    Parameters
+    ----------
+    model: type
+        The Pydantic response model of the route.
+    """
+    def decorator(func):
+        if not _enabled:
+            return func
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            result = await func(*args, **kwargs)
+            if isinstance(result, Response):
+                return result
+            return FastJSONResponse(build_payload(model, result))
+
+        return wrapper
+
+    return decorator
+
+
+_enabled = config.Settings().fast_json_responses
+if _enabled and orjson is None:
+    logger.warning("orjson is not installed; fast JSON responses are disabled.")
+    _enabled = False
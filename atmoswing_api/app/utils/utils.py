@@ -2,11 +2,17 @@ import re
 import os
 import glob
 import hashlib
-import xarray
+import threading
+import h5py
 import numpy as np
+from collections import OrderedDict
 from pathlib import Path
 from datetime import datetime, date, timedelta
 
+from atmoswing_api.app.utils.catalog import forecast_catalog
+from atmoswing_api.app.utils.dataset_pool import HDF5_LOCK, file_fingerprint
+
+
 def check_region_path(data_dir: str, region: str) -> str:
     """
     Check if the region path exists and is a symlink.
@@ -180,6 +186,11 @@ def get_last_forecast_date(data_dir: str, region: str) -> str:
     """
     region_path = check_region_path(data_dir, region)
 
+    # Answer from the forecast catalog when the region is cataloged
+    last_forecast_date = forecast_catalog.get_last_forecast_date(region_path)
+    if last_forecast_date is not None:
+        return last_forecast_date
+
     def get_latest_subdir(path):
         subdirs = sorted(os.listdir(path), reverse=True)
         if not subdirs:
@@ -211,9 +222,11 @@ def get_last_forecast_date(data_dir: str, region: str) -> str:
     return last_forecast_date
 
 
-def list_files(region_path: str, datetime_str: str) -> list:
+def list_files(region_path: str, datetime_str: str, method='*') -> list:
     """
     List all files in the region path for a given datetime string.
+    The files are taken from the forecast catalog when the region is cataloged
+    and holds the forecast, and from the file system otherwise.
 
     Parameters
     ----------
@@ -221,13 +234,22 @@ def list_files(region_path: str, datetime_str: str) -> list:
         The path to the region directory.
     datetime_str: str
         The datetime string in the format "YYYY-MM-DDTHH" or "YYYY-MM-DD".
+    method: str
+        The method to filter the files by. Default is '*', which matches all methods.
 
     Returns
     -------
     list
         A sorted list of file paths matching the pattern for the given datetime.
     """
-    full_pattern = get_files_pattern(region_path, datetime_str)
+    entries = forecast_catalog.get_entries(region_path,
+                                           convert_to_datetime(datetime_str))
+    if entries:
+        return sorted(e.path for e in entries if method in ('*', e.method))
+
+    # Forecasts missing from the catalog are looked up on the file system, which
+    # raises a FileNotFoundError if the date directory does not exist
+    full_pattern = get_files_pattern(region_path, datetime_str, method)
 
     files = sorted(glob.glob(full_pattern))
 
@@ -269,83 +291,100 @@ def get_file_path(
     return file_path
 
 
-def get_row_indices(
-        ds: xarray.Dataset,
-        target_date : str | datetime
-) -> tuple[int, int, datetime]|None:
+# Global attributes of the forecast files, memoized per file and modification time
+_ATTRIBUTES_CACHE_SIZE = 4096
+_attributes_cache: OrderedDict[str, tuple[tuple, dict]] = OrderedDict()
+_attributes_lock = threading.Lock()
+
+
+def _decode_attribute(value):
+    if isinstance(value, np.ndarray) and value.size == 1:
+        value = value.item()
+    if isinstance(value, bytes):
+        return value.decode('utf-8', errors='surrogateescape')
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def read_global_attributes(file_path: str) -> dict:
     """
-    Get the start and end indices for the entity in the dataset based on the target date.
-    The target date is used to find the corresponding index in the dataset's target dates.
+    Read the global attributes of a forecast file. Only the HDF5 root attributes
+    are read: the variables are neither decoded nor indexed, which is much cheaper
+    than opening the file with xarray. Results are memoized per (path, mtime).
 
     Parameters
     ----------
-    ds: xarray.Dataset
-        The dataset containing the target dates and analogs.
-    target_date: str or datetime
-        The target date to find in the dataset, can be a string or a datetime object.
+    file_path: str
+        The path to the forecast file (.nc).
 
     Returns
     -------
-    start_idx: int
-        The start index of the entity in the dataset.
-    end_idx: int
-        The end index of the entity in the dataset.
-    target_date: datetime
-        The date found in the dataset that matches the target date.
+    dict
+        The global attributes, with text attributes decoded to str.
     """
-    # Get the start and end indices for the entity
-    result = get_target_date_index(ds, target_date)
-    if result is None:
-        return None
+    fingerprint = file_fingerprint(file_path)
+    if fingerprint is None:
+        raise FileNotFoundError(f"File not found: {file_path}")
+
+    with _attributes_lock:
+        cached = _attributes_cache.get(file_path)
+        if cached is not None and cached[0] == fingerprint:
+            _attributes_cache.move_to_end(file_path)
+            return cached[1]
+
+    with HDF5_LOCK, h5py.File(file_path, 'r') as f:
+        attrs = {name: _decode_attribute(value) for name, value in f.attrs.items()
+                 if not name.startswith('_')}
 
-    target_date_idx, target_date = result
-    analogs_nb = ds.analogs_nb.values
-    start_idx = int(np.sum(analogs_nb[:target_date_idx]))
-    end_idx = start_idx + int(analogs_nb[target_date_idx])
+    with _attributes_lock:
+        _attributes_cache[file_path] = (fingerprint, attrs)
+        _attributes_cache.move_to_end(file_path)
+        while len(_attributes_cache) > _ATTRIBUTES_CACHE_SIZE:
+            _attributes_cache.popitem(last=False)
 
-    return start_idx, end_idx, target_date
+    return attrs
 
 
-def get_target_date_index(
-        ds: xarray.Dataset,
-        target_date: str | datetime
-) -> tuple[int, datetime]|None:
+_TIME_UNITS_SECONDS = {
+    "days": 86400, "day": 86400, "d": 86400,
+    "hours": 3600, "hour": 3600, "h": 3600,
+    "minutes": 60, "minute": 60, "min": 60,
+    "seconds": 1, "second": 1, "s": 1,
+}
+
+
+def decode_dates(values, units: str) -> np.ndarray:
     """
-    Finds the index of the target date in the dataset and returns it along with the
-    found date.
+    Convert raw CF time values (as read with `decode_times=False`) to dates. The
+    conversion is vectorized, so that only the needed slice of a time variable has
+    to be read and converted.
 
     Parameters
     ----------
-    ds: xarray.Dataset
-        The dataset containing the target dates.
-    target_date: str or datetime
-        The target date to find in the dataset, can be a string or a datetime object.
+    values: array-like
+        The raw time values, e.g. Modified Julian Days.
+    units: str
+        The CF units of the values, e.g. 'days since 1858-11-17 00:00:00.0'.
 
     Returns
     -------
-    target_date_idx: int
-        The index of the target date in the dataset.
-    target_date_found: datetime|None
-        The date found in the dataset that matches the target date.
-    """
-    # Find the lead time
-    target_dates = ds.target_dates.values
-    target_date = convert_to_datetime(target_date)
-    target_date_idx = -1
-    target_date_found = None
-    for i, date in enumerate(target_dates):
-        date = np.datetime64(date).astype('datetime64[s]').item()
-        if date == target_date:
-            return i, date
-        elif date < target_date:
-            if i == len(target_dates) - 1:
-                return None
-            target_date_idx = i
-            target_date_found = date
-        elif date > target_date:
-            break
-
-    return target_date_idx, target_date_found
+    ndarray
+        The dates as datetime64[s] (use `.tolist()` to get datetime objects).
+    """
+    match = re.match(r"^\s*(\w+)\s+since\s+(\S+)(?:[\sT](\S+))?", units)
+    if match is None or match.group(1).lower() not in _TIME_UNITS_SECONDS:
+        raise ValueError(f"Unsupported time units: {units}")
+
+    factor = _TIME_UNITS_SECONDS[match.group(1).lower()]
+    reference = match.group(2)
+    if match.group(3):
+        reference = f"{reference}T{match.group(3)}"
+    reference = np.datetime64(reference.rstrip('Z'), 's')
+
+    seconds = np.rint(np.asarray(values, dtype=np.float64) * factor).astype(np.int64)
+
+    return reference + seconds.astype('timedelta64[s]')
 
 
 def compute_lead_time(forecast_date: datetime, target_date: datetime) -> int:
@@ -377,55 +416,6 @@ def compute_lead_time(forecast_date: datetime, target_date: datetime) -> int:
     return int(lead_time)
 
 
-def get_entity_index(ds: xarray.Dataset, entity: int | str) -> int:
-    """
-    Get the index of the entity in the dataset based on the entity ID.
-
-    Parameters
-    ----------
-    ds: xarray.Dataset
-        The dataset containing the entity IDs.
-    entity: int or str
-        The entity ID to find in the dataset.
-
-    Returns
-    -------
-    entity_idx: int
-        The index of the entity in the dataset.
-    """
-    # Find the entity ID
-    station_ids = ds.station_ids.values
-    indices = np.where(station_ids == entity)[0]
-    entity_idx = int(indices[0]) if indices.size > 0 else -1
-    if entity_idx == -1:
-        raise ValueError(f"Entity not found: {entity}")
-
-    return entity_idx
-
-
-def get_relevant_stations_idx(ds):
-    """
-    Get the indices of the relevant stations in the dataset based on the
-    `predictand_station_ids` attribute.
-
-    Parameters
-    ----------
-    ds: xarray.Dataset
-        The forecast dataset.
-
-    Returns
-    -------
-    station_idx: list
-        A list of indices corresponding to the relevant stations in the dataset.
-    """
-    relevant_station_ids = ds.predictand_station_ids
-    relevant_station_ids = [int(x) for x in relevant_station_ids.split(",")]
-    all_station_ids = ds.station_ids.values.tolist()
-    station_idx = [all_station_ids.index(x) for x in relevant_station_ids]
-
-    return station_idx
-
-
 def build_cumulative_frequency(size: int) -> np.ndarray:
     """
     Constructs a cumulative frequency distribution.
@@ -455,6 +445,67 @@ def build_cumulative_frequency(size: int) -> np.ndarray:
     return f
 
 
+def compute_analog_percentiles(
+        analog_values: np.ndarray,
+        analogs_nb: np.ndarray | list[int],
+        percentiles: list[int] | np.ndarray
+) -> np.ndarray:
+    """
+    Computes the percentiles of the analog values for all entities and lead times at
+    once. The analogs of the different lead times are stored one after the other
+    (ragged blocks of `analogs_nb` values). The percentiles are interpolated on the
+    sorted values using the cumulative frequency of `build_cumulative_frequency`.
+
+    Parameters
+    ----------
+    analog_values: ndarray
+        The analog values with shape (entities, analogs_tot), or (analogs_tot,) for
+        a single entity.
+    analogs_nb: ndarray or list
+        The number of analogs per lead time.
+    percentiles: list or ndarray
+        The percentiles to compute (0-100).
+
+    Returns
+    -------
+    values: ndarray
+        The percentile values with shape (entities, lead times, percentiles).
+        Lead times without analogs are filled with NaNs.
+    """
+    analog_values = np.asarray(analog_values, dtype=float)
+    if analog_values.ndim == 1:
+        analog_values = analog_values[np.newaxis, :]
+    analogs_nb = np.asarray(analogs_nb, dtype=np.int64)
+    quantiles = np.asarray(percentiles, dtype=float) / 100
+
+    values = np.full((analog_values.shape[0], len(analogs_nb), len(quantiles)), np.nan)
+    offsets = np.concatenate(([0], np.cumsum(analogs_nb)))
+
+    # Process the lead times sharing the same number of analogs as a single block
+    for size in np.unique(analogs_nb):
+        if size <= 0:
+            continue
+        lead_time_idx = np.flatnonzero(analogs_nb == size)
+        columns = offsets[lead_time_idx, np.newaxis] + np.arange(size)
+        values_sorted = np.sort(analog_values[:, columns], axis=2)
+
+        if size == 1:
+            values[:, lead_time_idx, :] = values_sorted
+            continue
+
+        # Fractional positions of the percentiles in the sorted values
+        frequencies = build_cumulative_frequency(int(size))
+        positions = np.interp(quantiles, frequencies, np.arange(size, dtype=float))
+        idx_low = np.minimum(np.floor(positions).astype(np.int64), size - 2)
+        weights = positions - idx_low
+
+        values_low = values_sorted[:, :, idx_low]
+        values_high = values_sorted[:, :, idx_low + 1]
+        values[:, lead_time_idx, :] = values_low + weights * (values_high - values_low)
+
+    return values
+
+
 def sanitize_unicode_surrogates(obj):
     """
     Recursively remove surrogate unicode characters from all strings in a dict/list.
@@ -0,0 +1,341 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Awaitable, Callable, NamedTuple
+
+from atmoswing_api import cache, config
+from atmoswing_api.app.utils import dataset_pool, forecast_index, percentile_sidecar, \
+    history_store, array_mirror
+from atmoswing_api.app.utils.catalog import RegionCatalog, forecast_catalog, \
+    parse_forecast_filename
+
+logger = logging.getLogger(__name__)
+
+
+class ForecastEvent(NamedTuple):
+    """A change of a forecast file."""
+    kind: str  # 'created', 'modified' or 'deleted'
+    path: str
+    region: str
+    forecast_date: str  # YYYY-MM-DDTHH
+
+
+def list_regions(data_dir: str) -> dict[str, str]:
+    """
+    List the regions of the data directory.
+
+    Parameters
+    ----------
+    data_dir: str
+        The base directory where the region directories are located.
+
+    Returns
+    -------
+    dict
+        The resolved path of each region directory, keyed by region name.
+    """
+    try:
+        names = os.listdir(data_dir)
+    except OSError:
+        return {}
+
+    return {name: str(Path(data_dir, name).resolve()) for name in sorted(names)
+            if not name.startswith('.') and os.path.isdir(os.path.join(data_dir, name))}
+
+
+def _snapshot(catalog: RegionCatalog) -> dict[str, tuple[str, float, int]]:
+    catalog.dirty = True
+    catalog.refresh()
+    return {entry.path: (date.strftime("%Y-%m-%dT%H"), entry.mtime, entry.size)
+            for date, entries in catalog.forecasts.items() for entry in entries}
+
+
+def _diff_snapshots(region: str, old: dict, new: dict) -> list[ForecastEvent]:
+    events = []
+    for path, (forecast_date, mtime, size) in new.items():
+        previous = old.get(path)
+        if previous is None:
+            events.append(ForecastEvent('created', path, region, forecast_date))
+        elif previous[1:] != (mtime, size):
+            events.append(ForecastEvent('modified', path, region, forecast_date))
+    for path, (forecast_date, _, _) in old.items():
+        if path not in new:
+            events.append(ForecastEvent('deleted', path, region, forecast_date))
+
+    return events
+
+
+class ForecastWatcher:
+    """
+    Watch the data directory for new, rewritten or deleted forecast files and
+    notify the registered listeners.
+
+    Changes are detected with inotify (through watchfiles) when available, or by
+    polling the directory tree otherwise (e.g. on network file systems, where
+    inotify events are not delivered). Polling relies on the directory mtimes, as
+    the forecast catalog does, so that only the changed days are listed again.
+    """
+
+    def __init__(self, data_dir: str, force_polling: bool = False,
+                 poll_interval: float = 30.0):
+        self.data_dir = data_dir
+        self.force_polling = force_polling
+        self.poll_interval = poll_interval
+        self.listeners: list[Callable[[list[ForecastEvent]], Awaitable[None]]] = []
+        self.events = 0
+        self._regions: dict[str, str] = {}
+        self._catalogs: dict[str, RegionCatalog] = {}
+        self._snapshots: dict[str, dict] = {}
+        self._task: asyncio.Task | None = None
+        self._stop_event: asyncio.Event | None = None
+
+    def add_listener(self, listener: Callable[[list[ForecastEvent]], Awaitable[None]]):
+        """
+        Register a coroutine function called with each batch of events.
+
+        Parameters
+        ----------
+        listener: callable
+            The coroutine function to call.
+        """
+        self.listeners.append(listener)
+
+    def start(self):
+        """Start watching in a background task of the running event loop."""
+        if self._task is not None and not self._task.done():
+            return
+        self._stop_event = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop watching and wait for the background task to finish."""
+        if self._task is None:
+            return
+        self._stop_event.set()
+        try:
+            await asyncio.wait_for(self._task, timeout=5)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            self._task.cancel()
+        self._task = None
+
+    def poll(self) -> list[ForecastEvent]:
+        """
+        Compare the forecast files on disk with the previous poll.
+
+        Returns
+        -------
+        list
+            The changes since the previous poll (none on the first poll).
+        """
+        events = []
+        self._regions = list_regions(self.data_dir)
+        for region, region_path in self._regions.items():
+            catalog = self._catalogs.get(region_path)
+            if catalog is None:
+                catalog = self._catalogs[region_path] = RegionCatalog(region_path)
+            snapshot = _snapshot(catalog)
+            previous = self._snapshots.get(region_path)
+            if previous is not None:
+                events.extend(_diff_snapshots(region, previous, snapshot))
+            self._snapshots[region_path] = snapshot
+
+        return events
+
+    def to_event(self, kind: str, path: str) -> ForecastEvent | None:
+        """
+        Build the event of a change notified for a path.
+
+        Parameters
+        ----------
+        kind: str
+            The kind of change ('created', 'modified' or 'deleted').
+        path: str
+            The path of the changed file.
+
+        Returns
+        -------
+        ForecastEvent|None
+            The event, or None if the path is not a forecast file of a region.
+        """
+        parsed = parse_forecast_filename(os.path.basename(path))
+        if parsed is None:
+            return None
+        for region, region_path in self._regions.items():
+            if path.startswith(region_path + os.sep):
+                return ForecastEvent(kind, path, region,
+                                     parsed[0].strftime("%Y-%m-%dT%H"))
+        return None
+
+    async def _notify(self, events: list[ForecastEvent]):
+        if not events:
+            return
+        self.events += len(events)
+        for event in events:
+            logger.info("Forecast %s: %s", event.kind, event.path)
+        for listener in self.listeners:
+            try:
+                await listener(events)
+            except Exception:
+                logger.exception("Forecast change listener failed")
+
+    async def _run(self):
+        try:
+            if not self.force_polling:
+                try:
+                    await self._watch()
+                    return
+                except ImportError:
+                    logger.info("watchfiles not available; polling %s", self.data_dir)
+            await self._poll_loop()
+        except Exception:
+            logger.exception("Forecast watcher stopped unexpectedly")
+
+    async def _poll_loop(self):
+        await asyncio.to_thread(self.poll)
+        while not self._stop_event.is_set():
+            try:
+                await asyncio.wait_for(self._stop_event.wait(), self.poll_interval)
+                break
+            except asyncio.TimeoutError:
+                pass
+            await self._notify(await asyncio.to_thread(self.poll))
+
+    async def _watch(self):
+        from watchfiles import Change, awatch
+
+        kinds = {Change.added: 'created', Change.modified: 'modified',
+                 Change.deleted: 'deleted'}
+        self._regions = list_regions(self.data_dir)
+        paths = list(self._regions.values())
+        if not paths:
+            logger.warning("No regions to watch in %s", self.data_dir)
+            return
+
+        # Regions are often mounted or symlinked, so watch their resolved paths
+        async for changes in awatch(*paths, stop_event=self._stop_event,
+                                    watch_filter=lambda _, p: p.endswith('.nc'),
+                                    debounce=2000):
+            events = {}
+            for change, path in changes:
+                event = self.to_event(kinds[change], path)
+                if event is not None:
+                    events[path] = event
+            await self._notify(list(events.values()))
+
+
+def _remove_prebuilt_results(data_dir: str, region: str, forecast_date: str) -> int:
+    prebuilt_dir = Path(data_dir) / '.prebuilt_cache'
+    if not prebuilt_dir.exists():
+        return 0
+    removed = 0
+    safe_forecast = forecast_date.replace(':', '-')
+    for path in prebuilt_dir.glob(f"*_{region}_{safe_forecast}_*.json"):
+        try:
+            path.unlink()
+            removed += 1
+        except OSError:
+            continue
+
+    return removed
+
+
+def _make_warmup_name(region: str, forecast_date: str,
+                      events: list[ForecastEvent]) -> str:
+    # The workers watching the directory see the same files: the name identifies
+    # this version of the forecast, so that a later change is warmed up again
+    files = sorted((event.path, event.kind, dataset_pool.source_fingerprint(event.path))
+                   for event in events)
+    digest = hashlib.sha1(json.dumps(files).encode()).hexdigest()[:16]
+    return f"{region}:{forecast_date}:{digest}"
+
+
+async def _warmup_forecast(data_dir: str, region: str, forecast_date: str,
+                           events: list[ForecastEvent]):
+    files = [event.path for event in events if event.kind != 'deleted']
+
+    # Precompute the percentiles of the new files before they are requested, and
+    # add them to the history
+    for file_path in files:
+        try:
+            await asyncio.to_thread(percentile_sidecar.build_sidecar, file_path)
+            await asyncio.to_thread(history_store.append_forecast, data_dir, region,
+                                    file_path)
+        except Exception as e:
+            logger.warning("Failed to build the percentiles of %s: %s", file_path, e)
+
+    # Mirror the arrays of the latest forecasts, which receive most requests
+    keep = _settings.array_mirror_latest_forecasts
+    if keep > 0:
+        for file_path in files:
+            try:
+                await asyncio.to_thread(array_mirror.build_mirror, file_path)
+            except Exception as e:
+                logger.warning("Failed to build the array mirror of %s: %s",
+                               file_path, e)
+        await asyncio.to_thread(array_mirror.prune_mirrors,
+                                str(Path(data_dir, region).resolve()), keep)
+
+    from atmoswing_api.scripts.warmup_cache import warmup_forecast
+    await asyncio.to_thread(warmup_forecast, str(Path(data_dir).resolve()), region,
+                            forecast_date)
+
+
+def make_invalidation_listener(data_dir: str, warmup: bool = False):
+    """
+    Create a listener evicting the cached data of the changed forecasts: open
+    datasets, file indexes, array mirrors, catalog, Redis entries and prebuilt JSON
+    results.
+
+    Parameters
+    ----------
+    data_dir: str
+        The base directory where the region directories are located.
+    warmup: bool
+        Whether to rebuild the percentile sidecars, the history stores, the array
+        mirrors (see `array_mirror_latest_forecasts`) and the prebuilt JSON results
+        of the changed forecasts, once their cached data is evicted. When several
+        workers watch the directory, a single one rebuilds them.
+
+    Returns
+    -------
+    callable
+        The coroutine function to register on the watcher.
+    """
+    async def invalidate(events: list[ForecastEvent]):
+        forecasts = {}
+        for event in events:
+            dataset_pool.pool.invalidate(event.path)
+            forecast_index.index_cache.invalidate(event.path)
+            percentile_sidecar.sidecar_cache.invalidate(event.path)
+            array_mirror.mirror_cache.invalidate(event.path)
+            forecasts.setdefault((event.region, event.forecast_date), []).append(event)
+
+        for region in sorted({region for region, _ in forecasts}):
+            forecast_catalog.invalidate(str(Path(data_dir, region).resolve()))
+        for region, forecast_date in sorted(forecasts):
+            deleted = await cache.invalidate_forecast(region, forecast_date)
+            removed = await asyncio.to_thread(_remove_prebuilt_results, data_dir,
+                                              region, forecast_date)
+            logger.info("Invalidated %s %s: %d cache entries, %d prebuilt results",
+                        region, forecast_date, deleted, removed)
+
+        if not warmup:
+            return
+        for (region, forecast_date), forecast_events in sorted(forecasts.items()):
+            name = _make_warmup_name(region, forecast_date, forecast_events)
+            if not await cache.claim_warmup(name, _settings.watcher_warmup_claim_ttl):
+                logger.info("Warmup of %s %s left to another worker", region,
+                            forecast_date)
+                continue
+            await _warmup_forecast(data_dir, region, forecast_date, forecast_events)
+
+    return invalidate
+
+
+_settings = config.Settings()
+forecast_watcher = ForecastWatcher(_settings.data_dir,
+                                   force_polling=_settings.watcher_force_polling,
+                                   poll_interval=_settings.watcher_poll_interval)
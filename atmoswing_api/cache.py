@@ -3,29 +3,322 @@ from redis import asyncio as aioredis
 from redis.exceptions import RedisError
 import asyncio
 import json
-import hashlib
 import functools
+import hashlib
+import inspect
 import os
+import types
+import typing
+import threading
 import time
+import zlib
+from collections import OrderedDict
+from typing import NamedTuple
+from datetime import date, datetime
+
+import numpy as np
+from fastapi import params
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 from atmoswing_api import config
+from atmoswing_api.app.utils import compression, utils
 from atmoswing_api.app.utils.logger import get_logger
 
 logger = get_logger()
-debug_mode = config.Settings().debug
+_settings = config.Settings()
+debug_mode = _settings.debug
 logger.setLevel(logging.DEBUG if debug_mode else logging.INFO)
 
 # Create an asyncio Redis client (don't await at import time)
 redis_client = aioredis.Redis(
     host=os.getenv("REDIS_HOST", "localhost"),
     port=int(os.getenv("REDIS_PORT", 6379)),
-    decode_responses=True
+    decode_responses=False
 )
 # Assume available until a runtime error occurs; runtime operations will detect unavailability
 redis_available = True
 # When Redis becomes unavailable, set a retry timestamp instead of disabling forever
 _redis_retry_at = 0.0
 _redis_cooldown = 5.0  # seconds to wait before retrying
+# TTL for past forecast dates when a watcher invalidates the entries on change
+_watched_ttl = None
+# Namespace of the cache keys: atmoswing:{route}:{region}:{forecast_date}:...
+_key_prefix = "atmoswing"
+
+# Computations in progress in this process, by cache key
+_inflight: dict[str, asyncio.Task] = {}
+# Maximum time (seconds) a worker waits for the computation of another worker
+_lock_timeout = _settings.cache_lock_timeout
+
+# Channel used to propagate invalidations to the in-process caches of all workers
+_invalidation_channel = "atmoswing:invalidate"
+_invalidation_task = None
+
+
+class LocalCache:
+    """
+    Size-bounded, thread-safe in-process LRU cache in front of Redis.
+
+    Entries hold the decoded results together with the size of their serialized
+    payload, which is used for the bytes budget, and the tag of the forecast they
+    belong to, so that they can be invalidated without querying Redis.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 ** 2, max_ttl: float = 300):
+        self.max_bytes = max_bytes
+        self.max_ttl = max_ttl
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        """Get a value, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, nbytes, _, value = entry
+            if expires_at <= time.monotonic():
+                self._pop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value, nbytes: int, ttl: float, tag: str | None = None):
+        """Store a value for at most `ttl` seconds (and at most `max_ttl`)."""
+        ttl = min(ttl, self.max_ttl)
+        if ttl <= 0 or nbytes > self.max_bytes:
+            return
+        with self._lock:
+            self._pop(key)
+            self._entries[key] = (time.monotonic() + ttl, nbytes, tag, value)
+            self.nbytes += nbytes
+            while self.nbytes > self.max_bytes:
+                self._pop(next(iter(self._entries)))
+
+    def invalidate_tags(self, tags) -> int:
+        """Drop the entries of the given tags. Returns the number of dropped entries."""
+        tags = set(tags)
+        with self._lock:
+            keys = [k for k, e in self._entries.items() if e[2] in tags]
+            for key in keys:
+                self._pop(key)
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self.nbytes,
+                    "hits": self.hits, "misses": self.misses}
+
+    def _pop(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.nbytes -= entry[1]
+
+
+class CachedResponse(NamedTuple):
+    """
+    A fully serialized response, cached as is so that hits are not encoded again,
+    together with its precompressed variants (content coding, compressed body).
+    """
+    body: bytes
+    media_type: str
+    etag: str
+    encoded: tuple[tuple[str, bytes], ...] = ()
+
+    @classmethod
+    def from_response(cls, response: Response) -> "CachedResponse":
+        body = bytes(response.body)
+        etag = f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+        return cls(body, response.media_type, etag, compression.precompress(body))
+
+    def to_response(self) -> Response:
+        # Send the variant matching the Accept-Encoding header of the request
+        variants = dict(self.encoded)
+        encoding = compression.negotiate(None, variants)
+        if encoding is None:
+            return Response(content=self.body, media_type=self.media_type,
+                            headers={"ETag": self.etag})
+        return Response(content=variants[encoding], media_type=self.media_type,
+                        headers={"ETag": self.etag, "Content-Encoding": encoding,
+                                 "Vary": "Accept-Encoding"})
+
+
+class CacheCodec:
+    """
+    Binary format of the cached results: a header byte followed by the body.
+
+    The header byte has its high bit set (so that it cannot be confused with the
+    JSON text stored by earlier versions), the serializer in bits 3-6 (0: JSON,
+    1: msgpack, 2: serialized response) and the compression in bits 0-2 (0: none,
+    1: zlib, 2: zstd). Bodies larger than `threshold` bytes are compressed. Entries
+    are decoded according to their own header, whatever the current settings.
+    Serialized responses are stored as their media type, ETag and precompressed
+    variants (as 'coding:length' pairs) on three lines, followed by the variants
+    and the body.
+    """
+
+    JSON, MSGPACK, RESPONSE = 0, 1, 2
+    NONE, ZLIB, ZSTD = 0, 1, 2
+    _serializers = {"json": JSON, "msgpack": MSGPACK}
+    _compressions = {"none": NONE, "zlib": ZLIB, "zstd": ZSTD}
+    _datetime_ext = 1
+
+    def __init__(self, serializer: str = "json", compression: str = "zlib",
+                 threshold: int = 4096):
+        if serializer not in self._serializers:
+            raise ValueError(f"Unknown cache serializer ({serializer})")
+        if compression not in self._compressions:
+            raise ValueError(f"Unknown cache compression ({compression})")
+        if serializer == "msgpack" and msgpack is None:
+            logger.warning("msgpack is not installed; caching as JSON")
+            serializer = "json"
+        if compression == "zstd" and zstandard is None:
+            logger.warning("zstandard is not installed; compressing with zlib")
+            compression = "zlib"
+        self.serializer = self._serializers[serializer]
+        self.compression = self._compressions[compression]
+        self.threshold = threshold
+
+    def encode(self, value) -> tuple[bytes, int]:
+        """
+        Serialize a result.
+
+        Parameters
+        ----------
+        value: object
+            The result to serialize.
+
+        Returns
+        -------
+        tuple
+            The payload and the size of the uncompressed body.
+        """
+        serializer = self.RESPONSE if isinstance(value, CachedResponse) \
+            else self.serializer
+        body = self._serialize(serializer, value)
+        compression = self.compression if len(body) > self.threshold else self.NONE
+        if compression == self.ZLIB:
+            payload = zlib.compress(body, 1)
+        elif compression == self.ZSTD:
+            payload = zstandard.ZstdCompressor(level=3).compress(body)
+        else:
+            payload = body
+        header = 0x80 | (serializer << 3) | compression
+
+        return bytes([header]) + payload, len(body)
+
+    def decode(self, payload: bytes) -> tuple[object, int]:
+        """
+        Deserialize a result.
+
+        Parameters
+        ----------
+        payload: bytes
+            The payload, as produced by `encode` (or JSON text).
+
+        Returns
+        -------
+        tuple
+            The result and the size of the uncompressed body.
+        """
+        header = payload[0]
+        if not header & 0x80:
+            return json.loads(payload), len(payload)
+        serializer, compression = (header >> 3) & 0x0F, header & 0x07
+        body = memoryview(payload)[1:]
+        if compression == self.ZLIB:
+            body = zlib.decompress(body)
+        elif compression == self.ZSTD:
+            if zstandard is None:
+                raise ValueError("zstandard is required to decode the entry")
+            body = zstandard.ZstdDecompressor().decompress(body)
+        elif compression != self.NONE:
+            raise ValueError(f"Unknown compression ({compression})")
+
+        return self._deserialize(serializer, bytes(body)), len(body)
+
+    def _serialize(self, serializer: int, value) -> bytes:
+        if serializer == self.RESPONSE:
+            variants = ",".join(f"{encoding}:{len(data)}"
+                                for encoding, data in value.encoded)
+            return b"".join([value.media_type.encode(), b"\n", value.etag.encode(),
+                             b"\n", variants.encode(), b"\n",
+                             *(data for _, data in value.encoded), value.body])
+        if serializer == self.MSGPACK:
+            return msgpack.packb(value, default=self._msgpack_default)
+        if orjson is not None:
+            return orjson.dumps(value, default=str, option=orjson.OPT_SERIALIZE_NUMPY |
+                                orjson.OPT_NON_STR_KEYS)
+        return json.dumps(value, default=str, separators=(",", ":")).encode()
+
+    def _deserialize(self, serializer: int, body: bytes):
+        if serializer == self.RESPONSE:
+            media_type, etag, variants, content = body.split(b"\n", 3)
+            encoded = []
+            offset = 0
+            for variant in filter(None, variants.decode().split(",")):
+                encoding, _, length = variant.partition(":")
+                encoded.append((encoding, content[offset:offset + int(length)]))
+                offset += int(length)
+            return CachedResponse(content[offset:], media_type.decode(),
+                                  etag.decode(), tuple(encoded))
+        if serializer == self.MSGPACK:
+            if msgpack is None:
+                raise ValueError("msgpack is required to decode the entry")
+            return msgpack.unpackb(body, ext_hook=self._msgpack_ext_hook,
+                                   strict_map_key=False)
+        if serializer == self.JSON:
+            return orjson.loads(body) if orjson is not None else json.loads(body)
+        raise ValueError(f"Unknown serializer ({serializer})")
+
+    @classmethod
+    def _msgpack_default(cls, value):
+        # Datetimes are kept as such, so that they are not parsed again on hit
+        if isinstance(value, datetime):
+            return msgpack.ExtType(cls._datetime_ext, value.isoformat().encode())
+        if isinstance(value, np.ndarray):
+            return value.tolist()
+        if isinstance(value, np.generic):
+            return value.item()
+        return str(value)
+
+    @classmethod
+    def _msgpack_ext_hook(cls, code: int, data: bytes):
+        if code == cls._datetime_ext:
+            return datetime.fromisoformat(data.decode())
+        return msgpack.ExtType(code, data)
+
+
+codec = CacheCodec(serializer=_settings.cache_serializer,
+                   compression=_settings.cache_compression,
+                   threshold=_settings.cache_compress_threshold)
+
+local_cache = LocalCache(max_bytes=_settings.cache_local_max_bytes,
+                         max_ttl=_settings.cache_local_ttl)
 
 # Log Redis connection at startup
 try:
@@ -34,29 +327,376 @@ try:
 except Exception as e:
     logger.warning(f"Redis not reachable at startup: {e}")
 
-def _make_cache_key(func, args, kwargs):
-    """Create a stable cache key including module, function name, args and kwargs.
-    Use json when possible, fall back to repr to handle non-serializable values.
+def _is_dependency(param: inspect.Parameter) -> bool:
+    if isinstance(param.default, params.Depends):
+        return True
+    if typing.get_origin(param.annotation) is typing.Annotated:
+        return any(isinstance(m, params.Depends) for m in param.annotation.__metadata__)
+    return False
+
+
+def _is_numeric(annotation) -> bool:
+    """Whether a parameter annotation accepts numbers (e.g. int, int|str, List[int])."""
+    if annotation in (int, float):
+        return True
+    origin = typing.get_origin(annotation)
+    if origin is typing.Annotated:
+        return _is_numeric(typing.get_args(annotation)[0])
+    if origin in (list, tuple, typing.Union, types.UnionType):
+        return any(_is_numeric(arg) for arg in typing.get_args(annotation))
+    return False
+
+
+def _format_datetime(value) -> str:
+    return utils.convert_to_datetime(value).strftime("%Y-%m-%dT%H")
+
+
+def _normalize_key_value(name: str, value, numeric: bool = False) -> str:
+    """
+    Canonical string of a route parameter, so that equivalent requests share keys.
+    Digit strings are only read as numbers for the `numeric` parameters: for text
+    parameters, "01" and "1" are different values.
+    """
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return str(int(value))
+    if isinstance(value, (datetime, date)):
+        return _format_datetime(value)
+    if isinstance(value, (list, tuple)):
+        # The order is kept: the responses list the values in the requested order
+        return ",".join(_normalize_key_value(name, v, numeric) for v in value)
+    if isinstance(value, str):
+        if numeric and value.lstrip("-").isdigit():
+            return str(int(value))
+        if name in ("forecast_date", "lead_time"):
+            try:
+                return _format_datetime(value)
+            except ValueError:
+                pass
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def make_cache_key(route: str, key_params: dict,
+                   numeric_params: typing.Collection[str] = ()) -> str:
+    """
+    Create a canonical cache key from the route parameters, namespaced as
+    atmoswing:{route}:{region}:{forecast_date}:{name=value:...} so that the entries
+    of a region or of a forecast can be found by prefix.
+
+    Parameters
+    ----------
+    route: str
+        The name of the route (module and function names).
+    key_params: dict
+        The route parameters identifying the response. The forecast date is
+        expected to be resolved already ('latest' being replaced by the date).
+    numeric_params: list
+        The names of the parameters accepting numbers, whose digit strings are
+        normalized as numbers (e.g. "048" and 48).
+
+    Returns
+    -------
+    str
+        The cache key.
+    """
+    key_params = dict(key_params)
+    region = _normalize_key_value("region", key_params.pop("region", None)) or "-"
+    forecast_date = _normalize_key_value(
+        "forecast_date", key_params.pop("forecast_date", None)) or "-"
+    rest = ":".join(
+        f"{name}={_normalize_key_value(name, value, name in numeric_params)}"
+        for name, value in sorted(key_params.items()))
+
+    return f"{_key_prefix}:{route}:{region}:{forecast_date}:{rest}"
+
+
+def _escape_pattern(value: str) -> str:
+    return "".join("\\" + c if c in "*?[]\\" else c for c in value)
+
+
+def _make_forecast_pattern(region: str, forecast_date) -> str:
+    """SCAN pattern matching the cache keys of a region and forecast date."""
+    region = _escape_pattern(_normalize_key_value("region", region))
+    forecast_date = _escape_pattern(_normalize_key_value("forecast_date", forecast_date))
+    return f"{_key_prefix}:*:{region}:{forecast_date}:*"
+
+
+def _make_tag(region, forecast_date) -> str:
+    """Tag of the local cache entries of a region and forecast date."""
+    return f"{_normalize_key_value('region', region)}:" \
+           f"{_normalize_key_value('forecast_date', forecast_date)}"
+
+
+async def _resolve_forecast_date(data_dir: str, region: str, forecast_date):
+    if forecast_date != 'latest':
+        return forecast_date
+    return await asyncio.to_thread(utils.get_last_forecast_date, data_dir, region)
+
+
+def enable_change_invalidation(ttl: int):
+    """
+    Use a longer TTL for the entries of the forecasts. To be enabled only when
+    the cache entries are invalidated when the forecasts change (see watcher).
+    """
+    global _watched_ttl
+    _watched_ttl = ttl
+
+
+async def invalidate_forecast(region: str, forecast_date: str) -> int:
+    """
+    Delete the cached entries of a forecast. Entries requested with 'latest' are
+    keyed by the resolved forecast date, so they are deleted as well.
+    Returns the number of deleted entries.
+    """
+    global redis_available, _redis_retry_at
+
+    tag = _make_tag(region, forecast_date)
+    local_cache.invalidate_tags([tag])
+
+    if not redis_available:
+        return 0
+
+    deleted = 0
+    try:
+        keys = []
+        async for key in redis_client.scan_iter(
+                match=_make_forecast_pattern(region, forecast_date), count=1000):
+            keys.append(key)
+            if len(keys) >= 1000:
+                deleted += await redis_client.delete(*keys)
+                keys = []
+        if keys:
+            deleted += await redis_client.delete(*keys)
+        # Let the other workers drop their in-process copies
+        await redis_client.publish(_invalidation_channel, json.dumps([tag]))
+    except RedisError:
+        _redis_retry_at = time.time() + _redis_cooldown
+        redis_available = False
+        logger.exception("Redis error during invalidation; will retry after %s", _redis_retry_at)
+
+    return deleted
+
+
+async def claim_warmup(name: str, ttl: int) -> bool:
+    """
+    Elect a single worker to warm up the caches after a change, when several
+    workers watch the data directory. The claim expires after `ttl` seconds.
+    Returns True if this worker claimed the warmup, or if Redis is unavailable
+    (each worker then warms up).
     """
+    global redis_available, _redis_retry_at
+
+    if not redis_available and time.time() < _redis_retry_at:
+        return True
+
     try:
-        key_payload = {
-            "args": args,
-            "kwargs": kwargs,
-        }
-        key_json = json.dumps(key_payload, default=str, sort_keys=True)
-    except (TypeError, ValueError):
-        key_json = repr((args, tuple(sorted(kwargs.items()))))
+        claimed = await redis_client.set(f"lock:warmup:{name}", os.getpid(), nx=True,
+                                         ex=ttl)
+        redis_available = True
+        return bool(claimed)
+    except RedisError:
+        _redis_retry_at = time.time() + _redis_cooldown
+        redis_available = False
+        logger.exception("Redis error during the warmup election; will retry after %s",
+                         _redis_retry_at)
+        return True
+
+
+async def _listen_invalidations():
+    while True:
+        try:
+            async with redis_client.pubsub(ignore_subscribe_messages=True) as pubsub:
+                await pubsub.subscribe(_invalidation_channel)
+                # Entries may have been invalidated while disconnected
+                local_cache.clear()
+                async for message in pubsub.listen():
+                    try:
+                        tags = json.loads(message["data"])
+                    except (json.JSONDecodeError, TypeError):
+                        continue
+                    dropped = local_cache.invalidate_tags(tags)
+                    logger.debug("Dropped %d local entries for %s", dropped, tags)
+        except asyncio.CancelledError:
+            raise
+        except (RedisError, OSError) as e:
+            # Without invalidation messages, local entries could be served stale
+            local_cache.clear()
+            logger.debug("Invalidation channel unavailable (%s); retrying", e)
+            await asyncio.sleep(_redis_cooldown)
+
+
+def start_invalidation_listener():
+    """
+    Subscribe to the invalidation messages of the other workers, in a background
+    task of the running event loop.
+    """
+    global _invalidation_task
+    if _invalidation_task is None or _invalidation_task.done():
+        _invalidation_task = asyncio.create_task(_listen_invalidations())
+
+
+async def stop_invalidation_listener():
+    global _invalidation_task
+    if _invalidation_task is None:
+        return
+    _invalidation_task.cancel()
+    try:
+        await _invalidation_task
+    except asyncio.CancelledError:
+        pass
+    _invalidation_task = None
+
+
+def _start_inflight(key: str, factory) -> asyncio.Task:
+    """
+    Start the coroutine created by `factory` in its own task, unless a computation
+    of the same key is already in progress in this process. Returns the task.
+    """
+    task = _inflight.get(key)
+    if task is None or task.done() or task.get_loop() is not asyncio.get_running_loop():
+        task = asyncio.ensure_future(factory())
+        _inflight[key] = task
+
+        def _done(t):
+            if _inflight.get(key) is t:
+                del _inflight[key]
+            if not t.cancelled():
+                t.exception()  # Retrieved here in case all the requests are gone
+
+        task.add_done_callback(_done)
+    else:
+        logger.debug("Joining in-flight computation for key %s", key)
+
+    return task
+
+
+async def _coalesce(key: str, factory):
+    """
+    Run the coroutine created by `factory`, unless a computation of the same key is
+    already in progress in this process, in which case its result is awaited.
+    The computation runs in its own task, so that it is not cancelled with the
+    request that started it.
+    """
+    return await asyncio.shield(_start_inflight(key, factory))
+
+
+def _make_lock_key(cache_key: str) -> str:
+    # Outside of the key namespace, so that invalidations do not drop the locks
+    return f"lock:{cache_key}"
+
+
+async def _acquire_lock(cache_key: str) -> str | None:
+    token = os.urandom(8).hex()
+    acquired = await redis_client.set(_make_lock_key(cache_key), token, nx=True,
+                                      px=int(_lock_timeout * 1000))
+    return token if acquired else None
+
+
+async def _release_lock(cache_key: str, token: str):
+    lock_key = _make_lock_key(cache_key)
+    if await redis_client.get(lock_key) == token.encode():
+        await redis_client.delete(lock_key)
+
+
+async def _wait_for_entry(cache_key: str) -> bytes | None:
+    """
+    Wait for another worker to store an entry. Returns None if the lock of the
+    computation is released (or expires) without an entry being stored.
+    """
+    delay = 0.02
+    deadline = time.monotonic() + _lock_timeout
+    while time.monotonic() < deadline:
+        await asyncio.sleep(delay)
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.get(cache_key)
+            pipe.exists(_make_lock_key(cache_key))
+            cached, locked = await pipe.execute()
+        if cached or not locked:
+            return cached
+        delay = min(delay * 2, 0.5)
+    return None
+
+
+def redis_cache(ttl=3600, key_params: list[str] | None = None,
+                stale_ttl: int | None = None):
+    """
+    Cache the results of a route in Redis (and in the process memory).
 
-    key_data = f"{func.__module__}.{func.__name__}:{key_json}"
-    return hashlib.sha256(key_data.encode()).hexdigest()
+    Entries are fresh for `ttl` seconds. They are then served stale for up to
+    `stale_ttl` seconds while a single background task (across all workers)
+    refreshes them, and dropped afterwards.
 
+    Routes returning a serialized response (e.g. a FastJSONResponse) have its body
+    cached with its media type and an ETag, and hits are returned as a raw
+    Response without being validated or encoded again.
+
+    Parameters
+    ----------
+    ttl: int
+        The time to live of the fresh entries (seconds).
+    key_params: list|None
+        The parameters identifying the response. Defaults to all the parameters of
+        the route except the injected dependencies (e.g. the settings).
+    stale_ttl: int|None
+        How long (seconds) expired entries can still be served while refreshed.
+        Defaults to the `cache_stale_ttl` setting; 0 disables it.
+    """
+    if stale_ttl is None:
+        stale_ttl = _settings.cache_stale_ttl
 
-def redis_cache(ttl=3600):
     def decorator(func):
-        @functools.wraps(func)
-        async def wrapper(*args, **kwargs):
+        signature = inspect.signature(func)
+        route = f"{func.__module__.rsplit('.', 1)[-1]}.{func.__name__}"
+        if key_params is None:
+            names = [name for name, p in signature.parameters.items()
+                     if not _is_dependency(p)]
+        else:
+            names = list(key_params)
+        hints = typing.get_type_hints(func, include_extras=True)
+        numeric_params = frozenset(name for name in names
+                                   if _is_numeric(hints.get(name)))
+
+        async def call(*args, **kwargs):
+            result = await func(*args, **kwargs)
+            # Responses are cached in their serialized form
+            if isinstance(result, Response) and result.status_code == 200 \
+                    and result.media_type and result.background is None:
+                return CachedResponse.from_response(result)
+            return result
+
+        async def lookup(*args, **kwargs):
             global redis_available, _redis_retry_at
 
+            bound = signature.bind_partial(*args, **kwargs)
+            region = bound.arguments.get("region")
+            forecast_date = bound.arguments.get("forecast_date")
+
+            # Key 'latest' by the actual forecast date, and compute that same date
+            if forecast_date is not None and region is not None:
+                settings = next((v for v in bound.arguments.values()
+                                 if isinstance(v, config.Settings)), _settings)
+                try:
+                    forecast_date = await _resolve_forecast_date(
+                        settings.data_dir, region, forecast_date)
+                except Exception:
+                    # Let the route report the error
+                    return await call(*args, **kwargs)
+                bound.arguments["forecast_date"] = forecast_date
+                args, kwargs = bound.args, bound.kwargs
+
+            cache_key = make_cache_key(
+                route, {n: bound.arguments.get(n) for n in names}, numeric_params)
+
+            # Hot entries are served from the process memory
+            cached = local_cache.get(cache_key)
+            if cached is not None:
+                logger.debug("Local cache hit for key %s", cache_key)
+                return cached
+
             # If Redis is currently marked unavailable, check whether it's time to retry.
             now = time.time()
             if not redis_available:
@@ -68,51 +708,130 @@ def redis_cache(ttl=3600):
                     except RedisError:
                         _redis_retry_at = now + _redis_cooldown
                         logger.debug("Redis still unavailable; next retry at %s", _redis_retry_at)
-                        return await func(*args, **kwargs)
+                        return await _coalesce(cache_key, lambda: call(*args, **kwargs))
                 else:
-                    return await func(*args, **kwargs)
+                    return await _coalesce(cache_key, lambda: call(*args, **kwargs))
 
-            cache_key = _make_cache_key(func, args, kwargs)
+            tag = None
+            if region is not None and forecast_date is not None:
+                tag = _make_tag(region, forecast_date)
 
             # Try to get the cached result; if Redis errors occur, schedule a retry and bypass caching
             try:
-                cached = await redis_client.get(cache_key)
+                async with redis_client.pipeline(transaction=False) as pipe:
+                    pipe.get(cache_key)
+                    pipe.pttl(cache_key)
+                    cached, remaining_ms = await pipe.execute()
             except RedisError:
                 now = time.time()
                 _redis_retry_at = now + _redis_cooldown
                 redis_available = False
                 logger.exception("Redis error during GET; will retry after %s", _redis_retry_at)
                 logger.debug("Cache failed for key %s due to Redis error", cache_key)
-                return await func(*args, **kwargs)
+                return await _coalesce(cache_key, lambda: call(*args, **kwargs))
 
-            if cached is not None:
+            # Past forecasts can be kept longer when entries are invalidated on change
+            entry_ttl = ttl
+            if _watched_ttl and forecast_date is not None:
+                entry_ttl = max(ttl, _watched_ttl)
+
+            async def refresh():
+                # Only one worker refreshes a given entry; the others serve it stale
                 try:
-                    logger.debug("Cache hit for key %s", cache_key)
-                    return json.loads(cached)
-                except (json.JSONDecodeError, TypeError):
-                    logger.warning("Cache hit for key %s but failed to decode JSON", cache_key)
-                    return cached
+                    token = await _acquire_lock(cache_key)
+                except RedisError:
+                    return
+                if token is None:
+                    return
+                try:
+                    await store(await call(*args, **kwargs))
+                    logger.debug("Cache refreshed for key %s", cache_key)
+                except Exception as e:
+                    logger.warning("Cache refresh failed for key %s: %s", cache_key, e)
+                finally:
+                    try:
+                        await _release_lock(cache_key, token)
+                    except RedisError:
+                        pass
+
+            async def compute():
+                global redis_available, _redis_retry_at
+
+                # Only one worker computes a given entry; the others wait for it
+                token = None
+                try:
+                    token = await _acquire_lock(cache_key)
+                    if token is None:
+                        logger.debug("Waiting for another worker to compute key %s", cache_key)
+                        cached = await _wait_for_entry(cache_key)
+                        if cached:
+                            try:
+                                return codec.decode(cached)[0]
+                            except (ValueError, TypeError, zlib.error):
+                                pass
+                except RedisError:
+                    _redis_retry_at = time.time() + _redis_cooldown
+                    redis_available = False
+                    logger.exception("Redis error during locking; will retry after %s", _redis_retry_at)
+
+                try:
+                    # Call the actual function
+                    result = await call(*args, **kwargs)
+                    await store(result)
+                finally:
+                    if token is not None:
+                        try:
+                            await _release_lock(cache_key, token)
+                        except RedisError:
+                            pass
+
+                return result
+
+            async def store(result):
+                global redis_available, _redis_retry_at
+
+                # Attempt to cache the result; if serialization fails or Redis errors occur, skip caching and schedule retry
+                try:
+                    payload, nbytes = codec.encode(result)
+                    await redis_client.set(cache_key, payload, ex=entry_ttl + stale_ttl)
+                    local_cache.set(cache_key, result, nbytes, entry_ttl, tag)
+                    logger.debug("Cache set for key %s (%d bytes)", cache_key, len(payload))
+                except (TypeError, ValueError):
+                    logger.debug("Result not JSON-serializable; skipping cache for key %s", cache_key)
+                    logger.warning("Cache failed for key %s due to serialization error", cache_key)
+                except RedisError:
+                    now = time.time()
+                    _redis_retry_at = now + _redis_cooldown
+                    redis_available = False
+                    logger.exception("Redis error during SETEX; will retry after %s", _redis_retry_at)
+                    logger.debug("Cache failed for key %s due to Redis error", cache_key)
+
+            if cached:
+                try:
+                    result, nbytes = codec.decode(cached)
+                except (ValueError, TypeError, zlib.error) as e:
+                    logger.warning("Cache hit for key %s but failed to decode it: %s", cache_key, e)
+                else:
+                    # Entries are kept `stale_ttl` seconds after they are due
+                    fresh_for = remaining_ms / 1000 - stale_ttl
+                    if fresh_for > 0:
+                        logger.debug("Cache hit for key %s", cache_key)
+                        # Do not keep the local copy longer than the Redis entry
+                        local_cache.set(cache_key, result, nbytes, fresh_for, tag)
+                    else:
+                        logger.debug("Stale cache hit for key %s; refreshing", cache_key)
+                        _start_inflight(f"refresh:{cache_key}", refresh)
+                    return result
             else:
                 logger.debug("Cache miss for key %s", cache_key)
 
-            # Call the actual function
-            result = await func(*args, **kwargs)
-
-            # Attempt to cache the result; if serialization fails or Redis errors occur, skip caching and schedule retry
-            try:
-                payload = json.dumps(result, default=str)
-                await redis_client.setex(cache_key, ttl, payload)
-                logger.debug("Cache set for key %s", cache_key)
-            except (TypeError, ValueError):
-                logger.debug("Result not JSON-serializable; skipping cache for key %s", cache_key)
-                logger.warning("Cache failed for key %s due to serialization error", cache_key)
-            except RedisError:
-                now = time.time()
-                _redis_retry_at = now + _redis_cooldown
-                redis_available = False
-                logger.exception("Redis error during SETEX; will retry after %s", _redis_retry_at)
-                logger.debug("Cache failed for key %s due to Redis error", cache_key)
+            return await _coalesce(cache_key, compute)
 
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            result = await lookup(*args, **kwargs)
+            if isinstance(result, CachedResponse):
+                return result.to_response()
             return result
 
         return wrapper
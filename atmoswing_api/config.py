@@ -3,5 +3,33 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 class Settings(BaseSettings):
     data_dir: str = "./data"
     debug: bool = False
+    dataset_pool_max_handles: int = 64
+    dataset_pool_max_bytes: int = 512 * 1024 ** 2
+    bundle_pool_max_handles: int = 8
+    array_mirror_max_files: int = 64
+    array_mirror_latest_forecasts: int = 0
+    catalog_refresh_interval: float = 10.0
+    watch_data_dir: bool = False
+    watcher_force_polling: bool = False
+    watcher_poll_interval: float = 30.0
+    watcher_warmup: bool = False
+    watcher_warmup_claim_ttl: int = 3600
+    cache_ttl_watched: int = 3 * 24 * 3600
+    cache_local_max_bytes: int = 64 * 1024 ** 2
+    cache_local_ttl: float = 300.0
+    cache_serializer: str = "msgpack"
+    cache_compression: str = "zstd"
+    cache_compress_threshold: int = 4096
+    cache_lock_timeout: float = 30.0
+    cache_stale_ttl: int = 600
+    executor_io_workers: int = 16
+    executor_cpu_workers: int = 2
+    percentile_sidecar_cache_bytes: int = 128 * 1024 ** 2
+    fast_json_responses: bool = True
+    cache_control_max_age: int = 7 * 24 * 3600
+    cache_control_max_age_latest: int = 60
+    compression_minimum_size: int = 1024
+    compression_encodings: str = "zstd,br,gzip"
+    batch_max_requests: int = 50
 
     model_config = SettingsConfigDict(env_file=".env")
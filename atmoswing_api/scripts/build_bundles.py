@@ -0,0 +1,73 @@
+# Consolidation script that packs the forecast files of each forecast datetime
+# (YYYY-MM-DD_HH.method.configuration.nc) into a single bundle
+# (YYYY-MM-DD_HH.bundle.h5) next to them, with one group per method and
+# configuration, so that the aggregation and meta endpoints open a single file
+# instead of all the forecast files of a region.
+
+import argparse
+from collections import defaultdict
+from pathlib import Path
+
+from atmoswing_api.app.utils.bundle import build_bundle, get_bundle_path, \
+    is_bundle_up_to_date
+from atmoswing_api.app.utils.catalog import parse_forecast_filename
+from atmoswing_api.scripts.build_percentiles import collect_forecast_files
+
+
+def group_by_bundle(file_paths: list[str]) -> dict[str, list[str]]:
+    bundles = defaultdict(list)
+    for file_path in file_paths:
+        bundles[get_bundle_path(file_path)].append(file_path)
+    return dict(bundles)
+
+
+def list_bundle_files(bundle_path: str) -> list[str]:
+    # All the forecast files of the date, including the ones older than the look
+    # back period
+    return sorted(str(p) for p in Path(bundle_path).parent.iterdir()
+                  if parse_forecast_filename(p.name) is not None and
+                  get_bundle_path(str(p)) == bundle_path)
+
+
+def build_if_needed(bundle_path: str, file_paths: list[str], force: bool = False,
+                    dry_run: bool = False) -> bool:
+    if not force and is_bundle_up_to_date(file_paths):
+        return False
+    if dry_run:
+        print(f"[DRY] Would bundle {len(file_paths)} file(s) into {bundle_path}")
+        return True
+    try:
+        build_bundle(file_paths)
+        print(f"Wrote {bundle_path} ({len(file_paths)} file(s))")
+    except Exception as e:
+        print(f"Failed {bundle_path}: {e}")
+        return False
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pack the forecast files of each forecast date into a bundle")
+    parser.add_argument("--data-dir", default="/app/data", help="Path to data directory")
+    parser.add_argument("--days", type=int, default=10, help="Look back N days")
+    parser.add_argument("--regions", nargs='*', help="Subset of regions")
+    parser.add_argument("--force", action='store_true', help="Rebuild up-to-date bundles")
+    parser.add_argument("--dry-run", action='store_true', help="Only show actions")
+    args = parser.parse_args(argv)
+
+    base = Path(args.data_dir)
+    regions = [p.name for p in base.iterdir() if
+               p.is_dir() and not p.name.startswith('.')]
+    if args.regions:
+        regions = [r for r in regions if r in args.regions]
+
+    built = 0
+    for region in regions:
+        recent = group_by_bundle(collect_forecast_files(base / region, args.days))
+        for bundle_path in sorted(recent):
+            built += build_if_needed(bundle_path, list_bundle_files(bundle_path),
+                                     force=args.force, dry_run=args.dry_run)
+    print(f"{built} bundle(s) written")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+# Ingest script that maintains the percentile history stores. For each region,
+# method and configuration, a store (data_dir/.history/region/method.configuration/)
+# holds one file per run with the percentiles 0-100 per entity and lead time, so
+# that the evolution of the forecasts over past runs is read from small files
+# instead of opening every past forecast file.
+
+import argparse
+from pathlib import Path
+
+from atmoswing_api.app.utils.history_store import append_forecast
+from atmoswing_api.scripts.build_percentiles import collect_forecast_files
+
+
+def append_if_needed(data_dir: str, region: str, file_path: str,
+                     dry_run: bool = False) -> bool:
+    if dry_run:
+        print(f"[DRY] Would add {file_path} to the history")
+        return True
+    try:
+        appended = append_forecast(data_dir, region, file_path)
+    except Exception as e:
+        print(f"Failed {file_path}: {e}")
+        return False
+    if appended:
+        print(f"Added {file_path}")
+    return appended
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Add the forecasts to the percentile history stores")
+    parser.add_argument("--data-dir", default="/app/data", help="Path to data directory")
+    parser.add_argument("--days", type=int, default=10, help="Look back N days")
+    parser.add_argument("--regions", nargs='*', help="Subset of regions")
+    parser.add_argument("--dry-run", action='store_true', help="Only show actions")
+    args = parser.parse_args(argv)
+
+    base = Path(args.data_dir)
+    regions = [p.name for p in base.iterdir() if
+               p.is_dir() and not p.name.startswith('.')]
+    if args.regions:
+        regions = [r for r in regions if r in args.regions]
+
+    appended = 0
+    for region in regions:
+        for file_path in collect_forecast_files(base / region, args.days):
+            appended += append_if_needed(str(base), region, file_path,
+                                         dry_run=args.dry_run)
+    print(f"{appended} forecast(s) added to the history")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+# Ingest script that mirrors the arrays read by the forecast endpoints of the latest
+# forecasts, which receive most of the requests. For each YYYY-MM-DD_HH.method.
+# configuration.nc file of the latest forecast dates, the analog values, numbers of
+# analogs, target dates and reference values are written as uncompressed .npy files
+# (in a .mirror directory next to it) that the API maps in memory. The mirrors of
+# the older forecast dates are removed.
+
+import argparse
+import os
+from collections import defaultdict
+from pathlib import Path
+
+from atmoswing_api.app.utils.array_mirror import build_mirror, \
+    is_mirror_up_to_date, prune_mirrors
+from atmoswing_api.app.utils.catalog import parse_forecast_filename
+
+
+def collect_latest_forecast_files(region_path: Path, latest: int) -> list[str]:
+    by_date = defaultdict(list)
+    for root, _, filenames in os.walk(region_path):
+        for f in filenames:
+            parsed = parse_forecast_filename(f)
+            if parsed is not None:
+                by_date[parsed[0]].append(os.path.join(root, f))
+    dates = sorted(by_date, reverse=True)[:max(latest, 0)]
+    return sorted(f for dt in dates for f in by_date[dt])
+
+
+def build_if_needed(file_path: str, force: bool = False, dry_run: bool = False) -> bool:
+    if not force and is_mirror_up_to_date(file_path):
+        return False
+    if dry_run:
+        print(f"[DRY] Would build the array mirror of {file_path}")
+        return True
+    try:
+        mirror_path = build_mirror(file_path, force=force)
+        print(f"Wrote {mirror_path}")
+    except Exception as e:
+        print(f"Failed {file_path}: {e}")
+        return False
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mirror the arrays of the latest forecasts")
+    parser.add_argument("--data-dir", default="/app/data", help="Path to data directory")
+    parser.add_argument("--latest", type=int, default=2, help="Number of latest forecast dates per region")
+    parser.add_argument("--regions", nargs='*', help="Subset of regions")
+    parser.add_argument("--force", action='store_true', help="Rebuild up-to-date mirrors")
+    parser.add_argument("--dry-run", action='store_true', help="Only show actions")
+    args = parser.parse_args(argv)
+
+    base = Path(args.data_dir)
+    regions = [p.name for p in base.iterdir() if
+               p.is_dir() and not p.name.startswith('.')]
+    if args.regions:
+        regions = [r for r in regions if r in args.regions]
+
+    built = 0
+    removed = 0
+    for region in regions:
+        for file_path in collect_latest_forecast_files(base / region, args.latest):
+            built += build_if_needed(file_path, force=args.force, dry_run=args.dry_run)
+        if not args.dry_run:
+            removed += prune_mirrors(str(base / region), args.latest)
+    print(f"{built} mirror(s) built, {removed} removed")
+
+
+if __name__ == '__main__':
+    main()
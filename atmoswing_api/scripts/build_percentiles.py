@@ -0,0 +1,71 @@
+# Ingest script that precomputes the percentiles of the analog values of the
+# forecast files. For each YYYY-MM-DD_HH.method.configuration.nc file, a sidecar
+# (.pct.npz) holding the percentiles 0-100 per entity and lead time is written next
+# to it, and is used by the percentile endpoints instead of sorting the analogs.
+
+import os
+import argparse
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from atmoswing_api.app.utils.catalog import parse_forecast_filename
+from atmoswing_api.app.utils.percentile_sidecar import build_sidecar, \
+    is_sidecar_up_to_date
+
+
+def collect_forecast_files(region_path: Path, days: int) -> list[str]:
+    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+    files = []
+    for root, _, filenames in os.walk(region_path):
+        for f in filenames:
+            if parse_forecast_filename(f) is None:
+                continue
+            full = os.path.join(root, f)
+            try:
+                mtime = datetime.fromtimestamp(os.stat(full).st_mtime, timezone.utc)
+            except OSError:
+                continue
+            if mtime >= cutoff:
+                files.append(full)
+    return sorted(files)
+
+
+def build_if_needed(file_path: str, force: bool = False, dry_run: bool = False) -> bool:
+    if not force and is_sidecar_up_to_date(file_path):
+        return False
+    if dry_run:
+        print(f"[DRY] Would build percentiles for {file_path}")
+        return True
+    try:
+        sidecar_path = build_sidecar(file_path)
+        print(f"Wrote {sidecar_path}")
+    except Exception as e:
+        print(f"Failed {file_path}: {e}")
+        return False
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute the percentiles of the forecast files")
+    parser.add_argument("--data-dir", default="/app/data", help="Path to data directory")
+    parser.add_argument("--days", type=int, default=10, help="Look back N days")
+    parser.add_argument("--regions", nargs='*', help="Subset of regions")
+    parser.add_argument("--force", action='store_true', help="Rebuild up-to-date sidecars")
+    parser.add_argument("--dry-run", action='store_true', help="Only show actions")
+    args = parser.parse_args(argv)
+
+    base = Path(args.data_dir)
+    regions = [p.name for p in base.iterdir() if
+               p.is_dir() and not p.name.startswith('.')]
+    if args.regions:
+        regions = [r for r in regions if r in args.regions]
+
+    built = 0
+    for region in regions:
+        for file_path in collect_forecast_files(base / region, args.days):
+            built += build_if_needed(file_path, force=args.force, dry_run=args.dry_run)
+    print(f"{built} sidecar(s) built")
+
+
+if __name__ == '__main__':
+    main()
@@ -5,6 +5,8 @@ import shutil
 import datetime
 import argparse
 
+from atmoswing_api.app.utils.history_store import prune_history
+
 
 parser = argparse.ArgumentParser(description="Remove forecasts older than X days.")
 parser.add_argument("--data-dir", default="/app/data", help="Path to the data directory")
@@ -95,4 +97,10 @@ if os.path.isdir(prebuilt_cache_dir):
             except OSError as e:
                 print(f"Failed removing cache file {full_path}: {e}")
 
+# --- Remove the runs older than keep-days from the percentile history stores ---
+removed_runs = prune_history(data_path, datetime.datetime.combine(cutoff_date,
+                                                                  datetime.time()))
+if removed_runs:
+    print(f"Removed {removed_runs} run(s) from the history stores")
+
 print("Cleanup completed.")
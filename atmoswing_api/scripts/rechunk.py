@@ -0,0 +1,103 @@
+# Conversion script that rewrites the forecast files with a chunking of the analog
+# variables suited to the access patterns of the API (series of an entity, map of
+# a lead time), so that a request only decompresses the chunks it reads. The files
+# are rewritten in place, or into a mirror of the data directory (--output-dir).
+# With --measure, nothing is written: the bytes read by each endpoint are reported
+# for the current layout and for the new one.
+
+import argparse
+import os
+import tempfile
+from collections import defaultdict
+from pathlib import Path
+
+from atmoswing_api.app.utils.rechunk import measure_file, rechunk_file
+from atmoswing_api.scripts.build_percentiles import collect_forecast_files
+
+
+def rechunk_if_needed(file_path: str, output_path: str | None, layout_options: dict,
+                      dry_run: bool = False) -> bool:
+    if dry_run:
+        print(f"[DRY] Would rechunk {file_path}")
+        return True
+    try:
+        written = rechunk_file(file_path, output_path, **layout_options)
+    except Exception as e:
+        print(f"Failed {file_path}: {e}")
+        return False
+    if written:
+        print(f"Wrote {output_path or file_path}")
+    return written
+
+
+def measure(file_paths: list[str], layout_options: dict):
+    before = defaultdict(list)
+    after = defaultdict(list)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for file_path in file_paths:
+            output_path = os.path.join(tmp_dir, os.path.basename(file_path))
+            try:
+                rechunk_file(file_path, output_path, **layout_options)
+                for results, path in ((before, file_path), (after, output_path)):
+                    for endpoint, value in measure_file(path).items():
+                        results[endpoint].append(value)
+            except Exception as e:
+                print(f"Failed {file_path}: {e}")
+            finally:
+                if os.path.exists(output_path):
+                    os.remove(output_path)
+
+    print(f"Mean bytes per request over {len(file_paths)} file(s) "
+          f"(read from the file / decompressed):")
+    print(f"{'endpoint':48s} {'before':>19s} {'after':>19s}")
+    for endpoint in before:
+        values = [[sum(v[k] for v in results[endpoint]) / len(results[endpoint])
+                   for k in (0, 1)] for results in (before, after)]
+        print(f"{endpoint:48s} " + " ".join(
+            f"{read:9.0f} /{decoded:8.0f}" for read, decoded in values))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rewrite the forecast files with a chunking suited to the API")
+    parser.add_argument("--data-dir", default="/app/data", help="Path to data directory")
+    parser.add_argument("--output-dir", help="Write the files into this mirror of the data directory instead of replacing them")
+    parser.add_argument("--days", type=int, default=10, help="Look back N days")
+    parser.add_argument("--regions", nargs='*', help="Subset of regions")
+    parser.add_argument("--entities-per-chunk", type=int, default=8, help="Number of entities per chunk")
+    parser.add_argument("--lead-times-per-chunk", type=int, default=4, help="Number of lead times per chunk")
+    parser.add_argument("--compression-level", type=int, default=4, help="Gzip compression level")
+    parser.add_argument("--measure", action='store_true', help="Only report the bytes read per endpoint before and after")
+    parser.add_argument("--dry-run", action='store_true', help="Only show actions")
+    args = parser.parse_args(argv)
+
+    layout_options = dict(entities_per_chunk=args.entities_per_chunk,
+                          lead_times_per_chunk=args.lead_times_per_chunk,
+                          compression_level=args.compression_level)
+
+    base = Path(args.data_dir)
+    regions = [p.name for p in base.iterdir() if
+               p.is_dir() and not p.name.startswith('.')]
+    if args.regions:
+        regions = [r for r in regions if r in args.regions]
+
+    file_paths = []
+    for region in regions:
+        file_paths += collect_forecast_files(base / region, args.days)
+
+    if args.measure:
+        measure(file_paths, layout_options)
+        return
+
+    written = 0
+    for file_path in file_paths:
+        output_path = None
+        if args.output_dir:
+            output_path = os.path.join(args.output_dir,
+                                       os.path.relpath(file_path, base))
+        written += rechunk_if_needed(file_path, output_path, layout_options,
+                                     dry_run=args.dry_run)
+    print(f"{written} file(s) rechunked")
+
+
+if __name__ == '__main__':
+    main()
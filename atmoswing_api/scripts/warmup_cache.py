@@ -336,11 +336,34 @@ def generate_if_needed(data_dir: str, func_name: str, region: str, forecast_date
     print(f"Unknown function: {func_name}")
 
 
+DEFAULT_FUNCTIONS = ['series_synthesis_per_method', 'series_synthesis_total',
+                     'list_methods', 'list_methods_and_configs',
+                     'entities_analog_values_percentile']
+
+
+def warmup_forecast(data_dir: str, region: str, forecast_date: str, functions: list | None = None, percentile: int = 90, normalize: int = 10, dry_run: bool = False, methods: list | None = None, lead_times: list | None = None):
+    """Prebuild the JSON responses of the given functions for a single forecast."""
+    prebuilt_dir = resolve_data_dir(data_dir) / '.prebuilt_cache'
+    for func_name in functions or DEFAULT_FUNCTIONS:
+        generate_if_needed(
+            data_dir,
+            func_name,
+            region,
+            forecast_date,
+            percentile,
+            normalize,
+            prebuilt_dir,
+            dry_run=dry_run,
+            methods=methods,
+            lead_times=lead_times
+        )
+
+
 def main(argv=None):
     parser = argparse.ArgumentParser(description="Warm up prebuilt JSON caches for heavy endpoints")
     parser.add_argument("--data-dir", default="/app/data", help="Path to data directory")
     parser.add_argument("--days", type=int, default=10, help="Look back N days")
-    parser.add_argument("--functions", nargs='+', default=['series_synthesis_per_method','series_synthesis_total','list_methods','list_methods_and_configs','entities_analog_values_percentile'], help="Functions to warm up")
+    parser.add_argument("--functions", nargs='+', default=DEFAULT_FUNCTIONS, help="Functions to warm up")
     parser.add_argument("--regions", nargs='*', help="Subset of regions")
     parser.add_argument("--percentile", type=int, default=90, help="Percentile (for percentile-based funcs)")
     parser.add_argument("--normalize", type=int, default=10, help="Normalization reference")
@@ -394,19 +417,17 @@ def main(argv=None):
                 print(f"No recent forecasts for region {region}")
                 continue
             for fd in sorted(forecast_dates):
-                for func_name in args.functions:
-                    generate_if_needed(
-                        args.data_dir,
-                        func_name,
-                        region,
-                        fd,
-                        args.percentile,
-                        args.normalize,
-                        prebuilt_dir,
-                        dry_run=args.dry_run,
-                        methods=args.methods,
-                        lead_times=lead_times
-                    )
+                warmup_forecast(
+                    args.data_dir,
+                    region,
+                    fd,
+                    functions=args.functions,
+                    percentile=args.percentile,
+                    normalize=args.normalize,
+                    dry_run=args.dry_run,
+                    methods=args.methods,
+                    lead_times=lead_times
+                )
     finally:
         singleton.release()
 
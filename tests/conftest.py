@@ -0,0 +1,27 @@
+import os
+import shutil
+
+import pytest
+
+from atmoswing_api.app.utils.array_mirror import mirror_cache
+from atmoswing_api.app.utils.bundle import bundle_pool
+
+# Path to the data directory
+cwd = os.path.dirname(os.path.abspath(__file__))
+data_dir = os.path.join(cwd, "data")
+
+
+@pytest.fixture
+def tmp_data_dir(tmp_path, request):
+    """
+    Temporary data directory holding copies of the forecast files listed in the
+    `forecast_files` variable of the test module (paths relative to the data
+    directory), so that the tests can write next to them.
+    """
+    for relative_path in request.module.forecast_files:
+        target = tmp_path / relative_path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy(os.path.join(data_dir, relative_path), target)
+    yield tmp_path
+    bundle_pool.clear()
+    mirror_cache.clear()
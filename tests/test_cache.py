@@ -0,0 +1,250 @@
+import asyncio
+import fnmatch
+import time
+from datetime import datetime
+from typing import Annotated, List
+
+import pytest
+
+from fastapi.responses import Response
+
+from atmoswing_api.cache import CacheCodec, CachedResponse, LocalCache, \
+    make_cache_key, _make_forecast_pattern, _coalesce, _inflight, _is_numeric
+
+
+def test_local_cache_bytes_budget():
+    local_cache = LocalCache(max_bytes=100, max_ttl=60)
+    local_cache.set("a", {"a": 1}, 40, 60)
+    local_cache.set("b", {"b": 1}, 40, 60)
+    assert local_cache.get("a") == {"a": 1}
+
+    # The least recently used entry is evicted
+    local_cache.set("c", {"c": 1}, 40, 60)
+    assert local_cache.get("b") is None
+    assert local_cache.get("a") == {"a": 1}
+    assert local_cache.stats()["bytes"] == 80
+
+    # Entries larger than the budget are not stored
+    local_cache.set("d", {"d": 1}, 200, 60)
+    assert local_cache.get("d") is None
+
+
+def test_local_cache_ttl():
+    local_cache = LocalCache(max_bytes=100, max_ttl=0.05)
+    local_cache.set("a", 1, 10, 3600)
+    assert local_cache.get("a") == 1
+    time.sleep(0.1)
+    assert local_cache.get("a") is None
+    assert local_cache.stats()["entries"] == 0
+
+
+def test_local_cache_invalidate_tags():
+    local_cache = LocalCache()
+    local_cache.set("a", 1, 10, 60, tag="adn:2024-10-05T00")
+    local_cache.set("b", 2, 10, 60, tag="adn:2024-10-05T12")
+    local_cache.set("c", 3, 10, 60, tag="zap:2024-10-05T00")
+
+    assert local_cache.invalidate_tags(["adn:2024-10-05T00",
+                                        "adn:2024-10-05T12"]) == 2
+    assert local_cache.get("a") is None
+    assert local_cache.get("c") == 3
+
+
+def test_make_cache_key_normalizes_parameters():
+    key = make_cache_key("forecasts.analog_values", {
+        "region": "adn", "forecast_date": "2024-10-05", "method": "4Zo-CEP",
+        "lead_time": "48", "percentiles": [90, 20]})
+
+    assert key == ("atmoswing:forecasts.analog_values:adn:2024-10-05T00:"
+                   "lead_time=48:method=4Zo-CEP:percentiles=90,20")
+    assert key == make_cache_key("forecasts.analog_values", {
+        "percentiles": ["90", "20"], "lead_time": 48, "method": "4Zo-CEP",
+        "forecast_date": datetime(2024, 10, 5), "region": "adn"})
+    assert make_cache_key("forecasts.analog_values", {
+        "region": "adn", "forecast_date": "2024-10-05T00", "lead_time": "2024-10-07"}) \
+        .endswith(":lead_time=2024-10-07T00")
+
+
+def test_make_cache_key_keeps_leading_zeros_of_text_parameters():
+    params = {"region": "adn", "forecast_date": "2024-10-05", "lead_time": "048",
+              "entities": ["01", "2"], "percentiles": ["090"]}
+    key = make_cache_key("forecasts.analog_values", params,
+                         numeric_params=["lead_time", "percentiles"])
+    assert key.endswith(":entities=01,2:lead_time=48:percentiles=90")
+    assert make_cache_key("forecasts.analog_values", params).endswith(
+        ":entities=01,2:lead_time=048:percentiles=090")
+
+
+def test_redis_cache_numeric_parameters_follow_the_annotations():
+    assert _is_numeric(int)
+    assert _is_numeric(int | str)
+    assert _is_numeric(List[int])
+    assert _is_numeric(Annotated[int, "doc"])
+    assert not _is_numeric(str)
+    assert not _is_numeric(List[str])
+    assert not _is_numeric(None)
+
+
+def test_make_cache_key_prefix_matches_forecast_pattern():
+    key = make_cache_key("meta.list_methods", {
+        "region": "adn", "forecast_date": "2024-10-05T00"})
+    assert fnmatch.fnmatchcase(key, _make_forecast_pattern("adn", "2024-10-05"))
+    assert not fnmatch.fnmatchcase(key, _make_forecast_pattern("adn", "2024-10-05T12"))
+    assert make_cache_key("meta.show_config", {}) == "atmoswing:meta.show_config:-:-:"
+
+
+def test_cache_codec_compresses_large_entries():
+    codec = CacheCodec("json", "zlib", threshold=100)
+    small = {"series_values": [1.5, 2.5]}
+    large = {"series_values": [0.1 * i for i in range(1000)]}
+
+    payload, _ = codec.encode(small)
+    assert payload[0] == 0x80
+    assert codec.decode(payload)[0] == small
+
+    payload, nbytes = codec.encode(large)
+    assert payload[0] == 0x81
+    assert len(payload) < nbytes
+    assert codec.decode(payload)[0] == large
+
+
+def test_cache_codec_decodes_json_text():
+    assert CacheCodec().decode(b'{"has_forecasts": true}')[0] == {"has_forecasts": True}
+
+
+def test_cache_codec_msgpack_keeps_datetimes():
+    pytest.importorskip("msgpack")
+    codec = CacheCodec("msgpack", "zlib", threshold=10)
+    value = {"target_dates": [datetime(2024, 10, 5, 6), datetime(2024, 10, 5, 12)],
+             "values": [0.5, 1.25]}
+
+    payload, _ = codec.encode(value)
+    assert payload[0] == 0x89
+    assert codec.decode(payload)[0] == value
+    # Entries are decoded from their header, whatever the current settings
+    assert CacheCodec("json", "none").decode(payload)[0] == value
+
+
+def test_cache_codec_keeps_serialized_responses():
+    response = CachedResponse(b'{"values":[1.5]}\n' * 500, "application/json", '"abc"',
+                              (("gzip", b"\x1f\x8b\n"), ("zstd", b"\x28\xb5")))
+    codec = CacheCodec("json", "zlib", threshold=100)
+
+    payload, nbytes = codec.encode(response)
+    assert payload[0] == 0x91
+    assert len(payload) < nbytes
+    assert codec.decode(payload)[0] == response
+
+
+def test_cache_codec_rejects_unknown_settings():
+    with pytest.raises(ValueError):
+        CacheCodec("pickle")
+    with pytest.raises(ValueError):
+        CacheCodec("json", "lzma")
+
+
+@pytest.mark.asyncio
+async def test_coalesce_runs_identical_computations_once():
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"value": 1}
+
+    results = await asyncio.gather(*[_coalesce("key", compute) for _ in range(10)])
+
+    assert len(calls) == 1
+    assert results == [{"value": 1}] * 10
+    assert "key" not in _inflight
+
+    await _coalesce("key", compute)
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_coalesce_propagates_errors():
+    async def compute():
+        await asyncio.sleep(0.01)
+        raise FileNotFoundError("Region directory not found")
+
+    results = await asyncio.gather(*[_coalesce("error", compute) for _ in range(3)],
+                                   return_exceptions=True)
+
+    assert all(isinstance(r, FileNotFoundError) for r in results)
+
+
+@pytest.mark.asyncio
+async def test_redis_cache_serves_stale_entries_while_refreshing(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    from atmoswing_api import cache
+
+    monkeypatch.setattr(cache, "redis_client", fakeredis.FakeAsyncRedis())
+    monkeypatch.setattr(cache, "redis_available", True)
+    monkeypatch.setattr(cache, "local_cache", LocalCache())
+    calls = []
+
+    @cache.redis_cache(ttl=1, stale_ttl=60)
+    async def synthesis(region: str, forecast_date: str):
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"version": len(calls)}
+
+    assert await synthesis(region="adn", forecast_date="2024-10-05T00") == {"version": 1}
+    await asyncio.sleep(1.1)
+    cache.local_cache.clear()
+
+    # The stale entry is returned at once, and refreshed once in background
+    results = await asyncio.gather(
+        *[synthesis(region="adn", forecast_date="2024-10-05T00") for _ in range(5)])
+    assert results == [{"version": 1}] * 5
+    await asyncio.sleep(0.2)
+    assert len(calls) == 2
+    cache.local_cache.clear()
+    assert await synthesis(region="adn", forecast_date="2024-10-05T00") == {"version": 2}
+
+
+@pytest.mark.asyncio
+async def test_redis_cache_returns_serialized_responses(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    from atmoswing_api import cache
+
+    monkeypatch.setattr(cache, "redis_client", fakeredis.FakeAsyncRedis())
+    monkeypatch.setattr(cache, "redis_available", True)
+    monkeypatch.setattr(cache, "local_cache", LocalCache())
+    calls = []
+
+    @cache.redis_cache(ttl=60)
+    async def synthesis(region: str, forecast_date: str):
+        calls.append(1)
+        return Response(b'{"values":[1.5]}', media_type="application/json")
+
+    first = await synthesis(region="adn", forecast_date="2024-10-05T00")
+    cache.local_cache.clear()
+    second = await synthesis(region="adn", forecast_date="2024-10-05T00")
+
+    assert len(calls) == 1
+    assert second is not first
+    assert second.body == first.body == b'{"values":[1.5]}'
+    assert second.media_type == "application/json"
+    assert second.headers["ETag"] == first.headers["ETag"]
+
+
+@pytest.mark.asyncio
+async def test_claim_warmup_elects_a_single_worker(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    from atmoswing_api import cache
+
+    monkeypatch.setattr(cache, "redis_client", fakeredis.FakeAsyncRedis())
+    monkeypatch.setattr(cache, "redis_available", True)
+
+    claims = await asyncio.gather(
+        *[cache.claim_warmup("adn:2024-10-05T00:abc", 60) for _ in range(4)])
+    assert sorted(claims) == [False, False, False, True]
+    # Another version of the forecast is warmed up again
+    assert await cache.claim_warmup("adn:2024-10-05T00:def", 60)
+
+    # Without Redis, every worker warms up
+    monkeypatch.setattr(cache, "redis_available", False)
+    monkeypatch.setattr(cache, "_redis_retry_at", time.time() + 60)
+    assert await cache.claim_warmup("adn:2024-10-05T00:abc", 60)
@@ -0,0 +1,81 @@
+import os
+from functools import lru_cache
+
+import pytest
+from fastapi.testclient import TestClient
+
+from atmoswing_api import config
+from atmoswing_api.app.main import app
+from atmoswing_api.app.routes.forecasts import get_settings as original_get_settings
+from atmoswing_api.app.routes.batch import get_settings as original_get_settings_batch
+
+
+@lru_cache
+def get_settings():
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    data_dir = os.path.join(cwd, "data")
+    return config.Settings(data_dir=data_dir)
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def override_settings():
+    # Other test modules override the settings with wrong paths
+    app.dependency_overrides[original_get_settings] = get_settings
+
+
+base = "/forecasts/adn/2024-10-05T00/4Zo-CEP/Alpes_Nord"
+
+
+def test_batch():
+    response = client.post("/batch", json={"requests": [
+        {"id": "percentiles", "path": f"{base}/1/48/analog-values-percentiles",
+         "params": {"percentiles": [20, 60, 90]}},
+        {"id": "best", "path": f"{base}/3/series-values-best-analogs?number=5"},
+        {"id": "dates", "path": f"{base}/48/analog-dates"},
+    ]})
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert list(results) == ["percentiles", "best", "dates"]
+    assert all(result["status"] == 200 for result in results.values())
+
+    single = client.get(f"{base}/1/48/analog-values-percentiles",
+                        params={"percentiles": [20, 60, 90]})
+    assert results["percentiles"]["data"] == single.json()
+    assert len(results["best"]["data"]["series_values"][0]) == 5
+
+
+def test_batch_item_errors():
+    response = client.post("/batch", json={"requests": [
+        {"id": "ok", "path": f"{base}/48/analog-dates"},
+        {"id": "missing", "path": "/forecasts/xx/2024-10-05T00/4Zo-CEP/Alpes_Nord/48/analog-dates"},
+        {"id": "unknown", "path": "/unknown/route"},
+    ]})
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert results["ok"]["status"] == 200
+    assert results["missing"]["status"] == 400
+    assert results["missing"]["detail"].startswith("Region or forecast not found")
+    assert results["unknown"]["status"] == 404
+
+
+def test_batch_too_many_requests():
+    app.dependency_overrides[original_get_settings_batch] = lambda: config.Settings(
+        batch_max_requests=1)
+    try:
+        response = client.post("/batch", json={"requests": [
+            {"id": "a", "path": f"{base}/48/analog-dates"},
+            {"id": "b", "path": f"{base}/48/analogy-criteria"},
+        ]})
+    finally:
+        del app.dependency_overrides[original_get_settings_batch]
+    assert response.status_code == 400
+
+
+def test_batch_duplicate_ids():
+    response = client.post("/batch", json={"requests": [
+        {"id": "a", "path": f"{base}/48/analog-dates"},
+        {"id": "a", "path": f"{base}/48/analogy-criteria"},
+    ]})
+    assert response.status_code == 400
@@ -0,0 +1,66 @@
+import os
+from functools import lru_cache
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+from atmoswing_api import config
+from atmoswing_api.app.main import app
+from atmoswing_api.app.routes.forecasts import get_settings as original_get_settings
+from atmoswing_api.app.routes.meta import get_settings as original_get_settings_meta
+
+
+@lru_cache
+def get_settings():
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    data_dir = os.path.join(cwd, "data")
+    return config.Settings(data_dir=data_dir)
+
+app.dependency_overrides[original_get_settings] = get_settings
+app.dependency_overrides[original_get_settings_meta] = get_settings
+client = TestClient(app)
+
+url = "/forecasts/adn/2024-10-05T00/4Zo-CEP/Alpes_Nord/3/series-values-percentiles"
+
+
+def test_etag_and_cache_control_of_past_forecast():
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.headers["etag"].startswith('W/"')
+    assert response.headers["cache-control"] == "public, max-age=604800, immutable"
+
+    # The ETag depends on the query parameters
+    other = client.get(url, params={"percentiles": [10, 50]})
+    assert other.headers["etag"] != response.headers["etag"]
+
+
+def test_not_modified_before_reading_files():
+    etag = client.get(url).headers["etag"]
+
+    with patch("atmoswing_api.app.routes.forecasts.get_series_analog_values_percentiles") \
+            as mock_service:
+        response = client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+        mock_service.assert_not_called()
+
+    response = client.get(url, headers={"If-None-Match": 'W/"0123456789abcdef"'})
+    assert response.status_code == 200
+
+
+def test_cache_control_of_latest_forecast():
+    response = client.get("/meta/adn/latest/methods")
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == "public, max-age=60"
+
+    response = client.get("/meta/adn/last-forecast-date")
+    assert response.status_code == 200
+    assert "etag" in response.headers
+
+
+def test_no_validators_on_errors():
+    response = client.get("/forecasts/unknown/2024-10-05T00/4Zo-CEP/Alpes_Nord/3/"
+                          "series-values-percentiles")
+    assert response.status_code == 400
+    assert "etag" not in response.headers
+    assert "cache-control" not in response.headers
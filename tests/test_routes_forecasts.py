@@ -99,6 +99,30 @@ def test_analog_values_best():
     data = response.json()
     assert "values" in data
 
+def test_entities_analog_values_percentiles():
+    response = client.get("/forecasts/adn/2024-10-05T00/4Zo-CEP/Alpes_Nord/48/entities-analog-values-percentiles?entities=1,3&percentiles=20&percentiles=90")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["entity_ids"] == [1, 3]
+    assert len(data["values"]) == 2
+    assert len(data["values"][0]) == 2
+
+def test_entities_series_analog_values_percentiles():
+    response = client.get("/forecasts/adn/2024-10-05T00/4Zo-CEP/Alpes_Nord/entities-series-values-percentiles?entities=all")
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data["series_values"]) == len(data["entity_ids"])
+
+def test_entities_invalid_ids():
+    response = client.get("/forecasts/adn/2024-10-05T00/4Zo-CEP/Alpes_Nord/entities-series-values-percentiles?entities=abc")
+    assert response.status_code == 400
+
+def test_analog_values_percentiles_history():
+    response = client.get("/forecasts/adn/2024-10-06T12/4Zo-CEP/Alpes_Nord/3/2024-10-08/analog-values-percentiles-history?number=3")
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data["forecast_dates"]) == len(data["values"])
+
 def test_exception_file_not_found():
     @lru_cache
     def get_settings_wrong():
@@ -249,3 +249,57 @@ async def test_get_series_analog_values_percentiles_history():
     assert result["past_forecasts"][0]["series_percentiles"][0]["percentile"] == 20
     assert result["past_forecasts"][0]["series_percentiles"][1]["percentile"] == 60
     assert result["past_forecasts"][0]["series_percentiles"][2]["percentile"] == 90
+
+
+@pytest.mark.asyncio
+async def test_get_series_analog_values_percentiles_history_all_available():
+    # /forecasts/adn/2024-10-06T18/4Zo-CEP/Alpes_Nord/3/series-values-percentiles-history?number=40
+    result = await get_series_analog_values_percentiles_history(
+        data_dir, region="adn", forecast_date="2024-10-06T18", method="4Zo-CEP",
+        configuration="Alpes_Nord", entity=3, percentiles=[20, 60, 90], number=40)
+
+    assert [f["forecast_date"] for f in result["past_forecasts"]] == [
+        datetime(2024, 10, 6, 12), datetime(2024, 10, 6, 0),
+        datetime(2024, 10, 5, 12), datetime(2024, 10, 5, 0)]
+
+    single = await get_series_analog_values_percentiles(
+        data_dir, region="adn", forecast_date="2024-10-05", method="4Zo-CEP",
+        configuration="Alpes_Nord", entity=3, percentiles=[20, 60, 90])
+    assert result["past_forecasts"][3] == single["series_values"]
+
+
+@pytest.mark.asyncio
+async def test_get_entities_analog_values_percentiles():
+    # /forecasts/adn/2024-10-05T00/4Zo-CEP/Alpes_Nord/2024-10-07/entities-analog-values-percentiles?entities=3&entities=1
+    result = await get_entities_analog_values_percentiles(
+        data_dir, region="adn", forecast_date="2024-10-05", method="4Zo-CEP",
+        configuration="Alpes_Nord", entities=[3, 1], lead_time="2024-10-07",
+        percentiles=[20, 60, 90])
+
+    assert result["entity_ids"] == [3, 1]
+    assert result["values"][0] == pytest.approx([0.93, 23.14, 67.00], rel=1e-2)
+
+    single = await get_analog_values_percentiles(
+        data_dir, region="adn", forecast_date="2024-10-05", method="4Zo-CEP",
+        configuration="Alpes_Nord", entity=1, lead_time="2024-10-07",
+        percentiles=[20, 60, 90])
+    assert result["values"][1] == pytest.approx(single["values"])
+
+
+@pytest.mark.asyncio
+async def test_get_entities_series_analog_values_percentiles_all():
+    # /forecasts/adn/2024-10-05T00/4Zo-CEP/Alpes_Nord/entities-series-values-percentiles?entities=all
+    result = await get_entities_series_analog_values_percentiles(
+        data_dir, region="adn", forecast_date="2024-10-05", method="4Zo-CEP",
+        configuration="Alpes_Nord", entities=None, percentiles=[20, 60, 90])
+
+    assert len(result["entity_ids"]) == len(result["series_values"])
+    assert len(result["target_dates"]) == 8
+
+    entity_idx = result["entity_ids"].index(3)
+    single = await get_series_analog_values_percentiles(
+        data_dir, region="adn", forecast_date="2024-10-05", method="4Zo-CEP",
+        configuration="Alpes_Nord", entity=3, percentiles=[20, 60, 90])
+    for i, series in enumerate(single["series_values"]["series_percentiles"]):
+        assert result["series_values"][entity_idx][i] == pytest.approx(
+            series["series_values"])
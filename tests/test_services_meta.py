@@ -5,6 +5,7 @@ from unittest.mock import patch, MagicMock
 from atmoswing_api.app.services.meta import get_last_forecast_date, \
     _get_last_forecast_date, get_method_list, _get_methods_from_netcdf, \
     get_method_configs_list, get_entities_list, get_relevant_entities_list
+from atmoswing_api.app.utils import dataset_pool
 
 # Path to the data directory
 cwd = os.path.dirname(os.path.abspath(__file__))
@@ -160,8 +161,8 @@ async def test_get_method_list():
 
 @patch("atmoswing_api.app.utils.utils.list_files")
 @patch("atmoswing_api.app.utils.utils.check_region_path")
-@patch("xarray.open_dataset")
-def test_get_methods_from_netcdf_mock(mock_open_dataset, mock_check_region_path,
+@patch("atmoswing_api.app.utils.utils.read_global_attributes")
+def test_get_methods_from_netcdf_mock(mock_read_attributes, mock_check_region_path,
                                       mock_list_files):
     # Mock list_files
     mock_list_files.return_value = ["/mocked/file1.nc", "/mocked/file2.nc"]
@@ -169,24 +170,17 @@ def test_get_methods_from_netcdf_mock(mock_open_dataset, mock_check_region_path,
     # Mock check_region_path to return a mocked path
     mock_check_region_path.return_value = "/mocked_path/region"
 
-    # Mock NetCDF datasets
-    mock_ds1 = MagicMock()
-    mock_ds1.method_id = 1
-    mock_ds1.method_id_display = "Method A"
-    mock_ds1.__enter__.return_value = mock_ds1  # For the sorting to work
-
-    mock_ds2 = MagicMock()
-    mock_ds2.method_id = 2
-    mock_ds2.method_id_display = "Method B"
-    mock_ds2.__enter__.return_value = mock_ds2  # For the sorting to work
-
-    mock_open_dataset.side_effect = [mock_ds1, mock_ds2]
+    # Mock the global attributes of the NetCDF files
+    mock_read_attributes.side_effect = [
+        {"method_id": 1, "method_id_display": "Method A"},
+        {"method_id": 2, "method_id_display": "Method B"},
+    ]
 
     result = _get_methods_from_netcdf("/mocked_path", "region", "2023-01-01")
 
     assert result["methods"] == [{"id": 1, "name": "Method A"}, {"id": 2, "name": "Method B"}]
     mock_list_files.assert_called_once_with("/mocked_path/region", "2023-01-01")
-    assert mock_open_dataset.call_count == 2
+    assert mock_read_attributes.call_count == 2
 
 
 @patch("atmoswing_api.app.utils.utils.list_files")
@@ -203,11 +197,11 @@ def test_get_methods_from_netcdf_no_files(mock_check_region_path, mock_list_file
 
 
 @pytest.mark.asyncio
-@patch("xarray.open_dataset")
+@patch("atmoswing_api.app.utils.utils.read_global_attributes")
 @patch("atmoswing_api.app.utils.utils.list_files")
 @patch("atmoswing_api.app.utils.utils.check_region_path")
 async def test_get_method_configs_list_mock(
-    mock_check_region_path, mock_list_files, mock_open_dataset
+    mock_check_region_path, mock_list_files, mock_read_attributes
 ):
     # Mock check_region_path to return a mocked path
     mock_check_region_path.return_value = "/mocked_path/region1"
@@ -215,29 +209,15 @@ async def test_get_method_configs_list_mock(
     # Mock list_files to return mocked file paths
     mock_list_files.return_value = ["/mocked/file1.nc", "/mocked/file2.nc", "/mocked/file3.nc"]
 
-    # Mock NetCDF datasets
-    mock_ds1 = MagicMock()
-    mock_ds1.method_id = 1
-    mock_ds1.method_id_display = "Method A"
-    mock_ds1.specific_tag = "Alpes_Nord"
-    mock_ds1.specific_tag_display = "Alpes du Nord"
-    mock_ds1.__enter__.return_value = mock_ds1  # Handle context manager
-
-    mock_ds2 = MagicMock()
-    mock_ds2.method_id = 2
-    mock_ds2.method_id_display = "Method B"
-    mock_ds2.specific_tag = "Alpes_Nord"
-    mock_ds2.specific_tag_display = "Alpes du Nord"
-    mock_ds2.__enter__.return_value = mock_ds2  # Handle context manager
-
-    mock_ds3 = MagicMock()
-    mock_ds3.method_id = 1
-    mock_ds3.method_id_display = "Method A"
-    mock_ds3.specific_tag = "Alpes_Sud"
-    mock_ds3.specific_tag_display = "Alpes du Sud"
-    mock_ds3.__enter__.return_value = mock_ds3  # Handle context manager
-
-    mock_open_dataset.side_effect = [mock_ds1, mock_ds2, mock_ds3]
+    # Mock the global attributes of the NetCDF files
+    mock_read_attributes.side_effect = [
+        {"method_id": 1, "method_id_display": "Method A",
+         "specific_tag": "Alpes_Nord", "specific_tag_display": "Alpes du Nord"},
+        {"method_id": 2, "method_id_display": "Method B",
+         "specific_tag": "Alpes_Nord", "specific_tag_display": "Alpes du Nord"},
+        {"method_id": 1, "method_id_display": "Method A",
+         "specific_tag": "Alpes_Sud", "specific_tag_display": "Alpes du Sud"},
+    ]
 
     result = await get_method_configs_list("/mocked_path", "region1", "2023-01-01")
 
@@ -262,8 +242,8 @@ async def test_get_method_configs_list_mock(
     # Ensure the mocked methods were called with expected arguments
     mock_check_region_path.assert_called_once_with("/mocked_path", "region1")
     mock_list_files.assert_called_once_with("/mocked_path/region1", "2023-01-01")
-    mock_open_dataset.assert_any_call("/mocked/file1.nc", engine="h5netcdf")
-    mock_open_dataset.assert_any_call("/mocked/file2.nc", engine="h5netcdf")
+    mock_read_attributes.assert_any_call("/mocked/file1.nc")
+    mock_read_attributes.assert_any_call("/mocked/file2.nc")
 
 
 @pytest.mark.asyncio
@@ -360,7 +340,9 @@ async def test_get_entities_list_mock(
     mock_check_region_path.assert_called_once_with(data_dir, region)
     mock_get_file_path.assert_called_once_with(region_path, date, method, configuration)
     mock_exists.assert_called_once_with(file_path)
-    mock_open_dataset.assert_called_once_with(file_path, engine="h5netcdf")
+    mock_open_dataset.assert_called_once_with(file_path, engine="h5netcdf",
+                                              decode_times=False,
+                                              lock=dataset_pool.HDF5_LOCK)
 
 
 @pytest.mark.asyncio
@@ -0,0 +1,93 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import xarray as xr
+
+from atmoswing_api.app.services.forecasts import _get_analog_values, \
+    _get_series_analog_values_percentiles
+from atmoswing_api.app.utils import array_mirror, dataset_pool
+from atmoswing_api.app.utils.array_mirror import build_mirror, get_mirror_path, \
+    is_mirror_up_to_date, prune_mirrors
+
+day_dir = os.path.join("adn", "2024", "10", "05")
+file_name = "2024-10-05_00.4Zo-CEP.Alpes_Nord.nc"
+latest_file_name = "2024-10-05_06.4Zo-GFS.Alpes_Nord.nc"
+# Files copied into the temporary data directory (see conftest.py)
+forecast_files = [os.path.join(day_dir, name) for name in (file_name, latest_file_name)]
+
+
+def test_build_mirror(tmp_data_dir):
+    file_path = str(tmp_data_dir / day_dir / file_name)
+    assert not is_mirror_up_to_date(file_path)
+    assert build_mirror(file_path) == get_mirror_path(file_path)
+    assert is_mirror_up_to_date(file_path)
+
+    with array_mirror.open_dataset(file_path) as ds:
+        assert isinstance(ds.analog_values_raw.data, np.memmap)
+        with xr.open_dataset(file_path, engine="h5netcdf",
+                             decode_times=False) as expected:
+            for name in array_mirror.MIRROR_VARIABLES:
+                assert ds[name].attrs == expected[name].attrs
+                np.testing.assert_array_equal(ds[name].values, expected[name].values)
+
+
+def test_build_mirror_skips_up_to_date_mirrors(tmp_data_dir):
+    file_path = str(tmp_data_dir / day_dir / file_name)
+    manifest = os.path.join(build_mirror(file_path), array_mirror.MANIFEST_NAME)
+    st = os.stat(manifest)
+
+    build_mirror(file_path)
+    assert os.stat(manifest).st_ino == st.st_ino
+    build_mirror(file_path, force=True)
+    assert os.stat(manifest).st_ino != st.st_ino
+    assert is_mirror_up_to_date(file_path)
+
+
+def test_concurrent_builds_replace_the_mirror(tmp_data_dir):
+    file_path = str(tmp_data_dir / day_dir / file_name)
+    build_mirror(file_path)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(lambda _: build_mirror(file_path, force=True),
+                                    range(8)))
+    assert results == [get_mirror_path(file_path)] * 8
+    assert is_mirror_up_to_date(file_path)
+    assert sorted(os.listdir(tmp_data_dir / day_dir)) == sorted(
+        [file_name, latest_file_name, os.path.basename(get_mirror_path(file_path)),
+         os.path.basename(get_mirror_path(file_path)) + ".lock"])
+
+
+def test_stale_mirror_is_ignored(tmp_data_dir):
+    file_path = str(tmp_data_dir / day_dir / file_name)
+    build_mirror(file_path)
+    with array_mirror.open_dataset(file_path) as ds:
+        assert isinstance(ds.analog_values_raw.data, np.memmap)
+
+    st = os.stat(file_path)
+    os.utime(file_path, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+    assert not is_mirror_up_to_date(file_path)
+    with array_mirror.open_dataset(file_path) as ds:
+        assert not isinstance(ds.analog_values_raw.data, np.memmap)
+    dataset_pool.pool.invalidate(file_path)
+
+
+def test_prune_mirrors(tmp_data_dir):
+    day = tmp_data_dir / day_dir
+    for name in os.listdir(day):
+        build_mirror(str(day / name))
+
+    assert prune_mirrors(str(tmp_data_dir / "adn"), 1) == 1
+    assert not os.path.exists(get_mirror_path(str(day / file_name)))
+    assert not os.path.exists(get_mirror_path(str(day / file_name)) + ".lock")
+    assert os.path.isdir(get_mirror_path(str(day / latest_file_name)))
+
+
+def test_services_read_the_mirror(tmp_data_dir):
+    args = (str(tmp_data_dir), "adn", "2024-10-05", "4Zo-CEP", "Alpes_Nord", 3)
+    values = _get_analog_values(*args, "2024-10-07")
+    percentiles = _get_series_analog_values_percentiles(*args, [20, 60, 90])
+
+    build_mirror(str(tmp_data_dir / day_dir / file_name))
+    assert _get_analog_values(*args, "2024-10-07") == values
+    assert _get_series_analog_values_percentiles(*args, [20, 60, 90]) == percentiles
@@ -0,0 +1,36 @@
+import os
+import shutil
+
+from atmoswing_api.app.utils import dataset_pool
+from atmoswing_api.app.utils.utils import read_global_attributes, \
+    decode_surrogate_escaped_utf8
+
+# Path to the data directory
+cwd = os.path.dirname(os.path.abspath(__file__))
+data_dir = os.path.join(cwd, "data")
+file_name = "2024-10-05_00.2Z-2MI-24h-GFS.Alpes_Nord.nc"
+file_path = os.path.join(data_dir, "adn/2024/10/05", file_name)
+
+
+def test_read_global_attributes_matches_xarray():
+    attrs = read_global_attributes(file_path)
+
+    with dataset_pool.open_dataset(file_path) as ds:
+        for name in ["method_id", "method_id_display", "specific_tag",
+                     "specific_tag_display"]:
+            assert attrs[name] == decode_surrogate_escaped_utf8(ds.attrs[name])
+
+    assert attrs["method_id"] == "2Z-2MI-24h-GFS"
+    assert attrs["method_id_display"] == "Analogie humidité (2Z-2MI) 24h GFS"
+
+
+def test_read_global_attributes_is_refreshed_when_file_changes(tmp_path):
+    path = tmp_path / file_name
+    shutil.copy(file_path, path)
+    attrs = read_global_attributes(str(path))
+    assert read_global_attributes(str(path)) is attrs
+
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    assert read_global_attributes(str(path)) is not attrs
+    assert read_global_attributes(str(path)) == attrs
@@ -0,0 +1,98 @@
+import os
+from unittest.mock import patch
+
+import h5py
+import numpy as np
+import xarray as xr
+
+from atmoswing_api.app.services.aggregations import _get_series_synthesis_per_method
+from atmoswing_api.app.services.meta import _get_entities_from_netcdf, \
+    _get_method_configs_from_netcdf
+from atmoswing_api.app.utils import bundle, utils
+from atmoswing_api.app.utils.bundle import build_bundle, bundle_pool, \
+    get_bundle_path, get_member_name, is_bundle_up_to_date
+
+# Path to the data directory
+cwd = os.path.dirname(os.path.abspath(__file__))
+data_dir = os.path.join(cwd, "data")
+day_dir = os.path.join("adn", "2024", "10", "05")
+
+
+# Files copied into the temporary data directory (see conftest.py)
+forecast_files = [os.path.join(day_dir, f)
+                  for f in sorted(os.listdir(os.path.join(data_dir, day_dir)))
+                  if f.startswith("2024-10-05_00.") and f.endswith(".nc")]
+
+
+def _files(tmp_data_dir):
+    day = tmp_data_dir / day_dir
+    return sorted(str(day / f) for f in os.listdir(day) if f.endswith(".nc"))
+
+
+def test_get_bundle_path():
+    file_path = os.path.join("/data", day_dir, "2024-10-05_00.4Zo-CEP.Alpes_Nord.nc")
+    assert get_bundle_path(file_path) == \
+           os.path.join("/data", day_dir, "2024-10-05_00.bundle.h5")
+    assert get_member_name(file_path) == "4Zo-CEP.Alpes_Nord"
+
+
+def test_build_bundle(tmp_data_dir):
+    files = _files(tmp_data_dir)
+    assert not is_bundle_up_to_date(files)
+    bundle_path = build_bundle(files)
+    assert is_bundle_up_to_date(files)
+
+    with h5py.File(bundle_path, "r") as h5:
+        assert sorted(h5) == sorted([get_member_name(fp) for fp in files] +
+                                    ["_stations"])
+        # The station variables are shared per configuration
+        assert len(h5["_stations"]) == 2
+        assert "station_ids" not in h5["4Zo-CEP.Alpes_Nord"]
+        assert h5["4Zo-CEP.Alpes_Nord"].attrs["_stations"] == \
+               h5["4Zo-GFS.Alpes_Nord"].attrs["_stations"]
+
+    for file_path in files:
+        with bundle.open_dataset(file_path) as ds, \
+                xr.open_dataset(file_path, engine="h5netcdf",
+                                decode_times=False) as expected:
+            assert ds.attrs == expected.attrs
+            assert set(ds.variables) == set(expected.variables)
+            for name, variable in expected.variables.items():
+                assert ds[name].dims == variable.dims
+                assert ds[name].attrs == variable.attrs
+                np.testing.assert_array_equal(ds[name].values, variable.values)
+        assert bundle.read_global_attributes(file_path) == \
+               utils.read_global_attributes(file_path)
+
+
+def test_changed_file_is_read_directly(tmp_data_dir):
+    files = _files(tmp_data_dir)
+    build_bundle(files)
+    st = os.stat(files[0])
+    os.utime(files[0], ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+
+    assert not is_bundle_up_to_date(files)
+    assert bundle_pool.acquire(files[0]) is None
+    entry, name = bundle_pool.acquire(files[1])
+    bundle_pool.release(entry)
+    assert name == get_member_name(files[1])
+
+    with bundle.open_dataset(files[0]) as ds:
+        assert ds.attrs["method_id"] == \
+               utils.read_global_attributes(files[0])["method_id"]
+
+
+def test_services_read_the_bundle(tmp_data_dir):
+    args = (str(tmp_data_dir), "adn", "2024-10-05T00")
+    synthesis = _get_series_synthesis_per_method(*args, 90)
+    configs = _get_method_configs_from_netcdf(*args)
+    entities = _get_entities_from_netcdf(*args, "4Zo-CEP", "Alpes_Nord")
+
+    build_bundle(_files(tmp_data_dir))
+    with patch("atmoswing_api.app.utils.dataset_pool.open_dataset",
+               side_effect=AssertionError), \
+            patch("atmoswing_api.app.utils.utils.read_global_attributes",
+                  side_effect=AssertionError):
+        assert _get_series_synthesis_per_method(*args, 90) == synthesis
+        assert _get_method_configs_from_netcdf(*args) == configs
+        assert _get_entities_from_netcdf(*args, "4Zo-CEP", "Alpes_Nord") == entities
@@ -0,0 +1,127 @@
+import os
+import shutil
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from atmoswing_api.app.utils.catalog import ForecastCatalog, parse_forecast_filename
+from atmoswing_api.app.utils.utils import list_files
+
+# Path to the data directory
+cwd = os.path.dirname(os.path.abspath(__file__))
+data_dir = os.path.join(cwd, "data")
+region_path = str(Path(data_dir, "adn").resolve())
+
+
+def test_parse_forecast_filename():
+    assert parse_forecast_filename("2024-10-05_00.4Zo-CEP.Alpes_Nord.nc") == (
+        datetime(2024, 10, 5, 0), "4Zo-CEP", "Alpes_Nord")
+    assert parse_forecast_filename("2024-10-05_00.4Zo-CEP.nc") is None
+    assert parse_forecast_filename("invalid_file_name.nc") is None
+    assert parse_forecast_filename("app.log") is None
+
+
+def test_catalog_forecasts():
+    catalog = ForecastCatalog()
+
+    assert catalog.get_last_forecast_date(region_path) == "2024-10-06T18"
+    assert len(catalog.get_forecast_dates(region_path)) == 8
+
+    entries = catalog.get_entries(region_path, datetime(2024, 10, 5, 0))
+    assert len(entries) == 9
+    assert {e.method for e in entries} == {
+        "2Z-06h-CEP", "2Z-06h-GFS", "2Z-2MI-24h-GFS", "4Zo-ARPEGE", "4Zo-CEP",
+        "4Zo-GFS"}
+    assert catalog.get_entries(region_path, datetime(2024, 10, 1, 0)) == []
+
+
+def test_catalog_ignores_missing_regions():
+    catalog = ForecastCatalog()
+
+    assert catalog.get_region("/mocked_path/region") is None
+    assert catalog.get_last_forecast_date("/mocked_path/region") is None
+
+
+def test_catalog_incremental_refresh(tmp_path):
+    src = os.path.join(data_dir, "adn/2024/10/05/2024-10-05_00.4Zo-CEP.Alpes_Nord.nc")
+    day_1 = tmp_path / "2024" / "10" / "05"
+    day_1.mkdir(parents=True)
+    shutil.copy(src, day_1 / "2024-10-05_00.4Zo-CEP.Alpes_Nord.nc")
+
+    catalog = ForecastCatalog(refresh_interval=3600)
+    assert catalog.get_last_forecast_date(str(tmp_path)) == "2024-10-05T00"
+
+    day_2 = tmp_path / "2024" / "10" / "06"
+    day_2.mkdir()
+    shutil.copy(src, day_2 / "2024-10-06_12.4Zo-CEP.Alpes_Nord.nc")
+
+    # Not refreshed before the interval unless invalidated
+    assert catalog.get_last_forecast_date(str(tmp_path)) == "2024-10-05T00"
+    catalog.invalidate(str(tmp_path))
+    assert catalog.get_last_forecast_date(str(tmp_path)) == "2024-10-06T12"
+    assert catalog.stats()["files"] == 2
+
+
+def test_catalog_previous_forecasts():
+    catalog = ForecastCatalog()
+
+    previous = catalog.get_previous_forecasts(
+        region_path, datetime(2024, 10, 6, 18), "4Zo-CEP", "Alpes_Nord", 40)
+    assert [dt for dt, _ in previous] == [
+        datetime(2024, 10, 6, 12), datetime(2024, 10, 6, 0),
+        datetime(2024, 10, 5, 12), datetime(2024, 10, 5, 0)]
+    assert previous[0][1].path.endswith("2024-10-06_12.4Zo-CEP.Alpes_Nord.nc")
+
+    previous = catalog.get_previous_forecasts(
+        region_path, datetime(2024, 10, 6, 0), "4Zo-GFS", "Alpes_Sud", 2)
+    assert [dt for dt, _ in previous] == [
+        datetime(2024, 10, 5, 18), datetime(2024, 10, 5, 12)]
+
+    assert catalog.get_previous_forecasts(
+        "/mocked_path/region", datetime(2024, 10, 6, 0), "4Zo-GFS", "Alpes_Sud",
+        2) is None
+
+
+def test_catalog_periodic_refresh_checks_the_latest_month(tmp_path):
+    src = os.path.join(data_dir, "adn/2024/10/05/2024-10-05_00.4Zo-CEP.Alpes_Nord.nc")
+    old_day = tmp_path / "2024" / "09" / "30"
+    old_day.mkdir(parents=True)
+    shutil.copy(src, old_day / "2024-09-30_00.4Zo-CEP.Alpes_Nord.nc")
+    day_1 = tmp_path / "2024" / "10" / "05"
+    day_1.mkdir(parents=True)
+    shutil.copy(src, day_1 / "2024-10-05_00.4Zo-CEP.Alpes_Nord.nc")
+
+    catalog = ForecastCatalog(refresh_interval=0)
+    assert len(catalog.get_forecast_dates(str(tmp_path))) == 2
+
+    # New days of the latest month are found without invalidation, and the
+    # directories of the older months are not checked
+    day_2 = tmp_path / "2024" / "10" / "06"
+    day_2.mkdir()
+    shutil.copy(src, day_2 / "2024-10-06_12.4Zo-CEP.Alpes_Nord.nc")
+    with patch("atmoswing_api.app.utils.catalog.os.stat", side_effect=os.stat) as stat:
+        assert catalog.get_last_forecast_date(str(tmp_path)) == "2024-10-06T12"
+    checked = {call.args[0] for call in stat.call_args_list}
+    assert str(day_1) in checked
+    assert not any(path.startswith(str(tmp_path / "2024" / "09")) for path in checked)
+
+    # A full refresh checks them
+    catalog.invalidate(str(tmp_path))
+    with patch("atmoswing_api.app.utils.catalog.os.stat", side_effect=os.stat) as stat:
+        assert len(catalog.get_forecast_dates(str(tmp_path))) == 3
+    assert str(old_day) in {call.args[0] for call in stat.call_args_list}
+
+
+def test_list_files_of_a_missing_date(tmp_path):
+    src = os.path.join(data_dir, "adn/2024/10/05/2024-10-05_00.4Zo-CEP.Alpes_Nord.nc")
+    day = tmp_path / "2024" / "10" / "05"
+    day.mkdir(parents=True)
+    shutil.copy(src, day / "2024-10-05_00.4Zo-CEP.Alpes_Nord.nc")
+
+    assert list_files(str(tmp_path), "2024-10-05T00") == [
+        str(day / "2024-10-05_00.4Zo-CEP.Alpes_Nord.nc")]
+    assert list_files(str(tmp_path), "2024-10-05T12") == []
+    with pytest.raises(FileNotFoundError, match="Date directory not found"):
+        list_files(str(tmp_path), "2024-10-07T00")
@@ -0,0 +1,63 @@
+import os
+from functools import lru_cache
+
+import pytest
+from fastapi.testclient import TestClient
+
+from atmoswing_api import config
+from atmoswing_api.app.main import app
+from atmoswing_api.app.routes.forecasts import get_settings as original_get_settings
+from atmoswing_api.app.utils.compression import negotiate, parse_accept_encoding
+
+
+@lru_cache
+def get_settings():
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    data_dir = os.path.join(cwd, "data")
+    return config.Settings(data_dir=data_dir)
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def override_settings():
+    # Other test modules override the settings with wrong paths
+    app.dependency_overrides[original_get_settings] = get_settings
+
+
+url = "/forecasts/adn/2024-10-05T00/4Zo-CEP/Alpes_Nord/3/series-values-best-analogs"
+
+
+def test_parse_accept_encoding():
+    assert parse_accept_encoding("gzip, deflate, br;q=0.5, zstd;q=0") == {
+        "gzip": 1.0, "deflate": 1.0, "br": 0.5, "zstd": 0.0}
+    assert parse_accept_encoding(None) == {}
+
+
+def test_negotiate():
+    encodings = ["zstd", "br", "gzip"]
+    assert negotiate(parse_accept_encoding("gzip, br"), encodings) == "br"
+    assert negotiate(parse_accept_encoding("gzip, br;q=0.5"), encodings) == "gzip"
+    assert negotiate(parse_accept_encoding("zstd;q=0, *"), encodings) == "br"
+    assert negotiate(parse_accept_encoding("identity"), encodings) is None
+    assert negotiate({}, encodings) is None
+
+
+def test_compressed_response():
+    plain = client.get(url, params={"number": 30}, headers={"Accept-Encoding": "identity"})
+    assert plain.status_code == 200
+    assert "content-encoding" not in plain.headers
+    assert len(plain.content) > 1024
+
+    response = client.get(url, params={"number": 30}, headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) < len(plain.content)
+    assert response.content == plain.content
+    assert response.headers["etag"] == plain.headers["etag"]
+
+
+def test_small_response_is_not_compressed():
+    response = client.get(url, params={"number": 1}, headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
@@ -0,0 +1,119 @@
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from atmoswing_api.app.utils import array_mirror, dataset_pool, utils
+from atmoswing_api.app.utils.dataset_pool import DatasetPool
+
+# Path to the data directory
+cwd = os.path.dirname(os.path.abspath(__file__))
+data_dir = os.path.join(cwd, "data")
+file_1 = os.path.join(data_dir, "adn/2024/10/05/2024-10-05_00.4Zo-CEP.Alpes_Nord.nc")
+file_2 = os.path.join(data_dir, "adn/2024/10/05/2024-10-05_00.4Zo-GFS.Alpes_Nord.nc")
+
+
+def test_dataset_pool_hits_and_misses():
+    pool = DatasetPool(max_handles=4)
+
+    with pool.open_dataset(file_1) as ds:
+        assert ds.method_id == "4Zo-CEP"
+    with pool.open_dataset(file_1) as ds:
+        assert ds.method_id == "4Zo-CEP"
+
+    stats = pool.stats()
+    assert stats["misses"] == 1
+    assert stats["hits"] == 1
+    assert stats["handles"] == 1
+    pool.clear()
+
+
+def test_dataset_pool_evicts_least_recently_used():
+    pool = DatasetPool(max_handles=1)
+
+    with pool.open_dataset(file_1):
+        pass
+    with pool.open_dataset(file_2) as ds:
+        assert ds.method_id == "4Zo-GFS"
+
+    stats = pool.stats()
+    assert stats["handles"] == 1
+    assert stats["evictions"] == 1
+    pool.clear()
+
+
+def test_dataset_pool_reopens_modified_file(tmp_path):
+    pool = DatasetPool(max_handles=4)
+    file_path = str(tmp_path / "forecast.nc")
+    shutil.copy(file_1, file_path)
+
+    with pool.open_dataset(file_path):
+        pass
+    st = os.stat(file_path)
+    os.utime(file_path, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+    with pool.open_dataset(file_path) as ds:
+        assert ds.method_id == "4Zo-CEP"
+
+    stats = pool.stats()
+    assert stats["misses"] == 2
+    assert stats["invalidations"] == 1
+    pool.clear()
+
+
+def test_dataset_pool_concurrent_borrowers():
+    pool = DatasetPool(max_handles=1)
+
+    def read(file_path):
+        with pool.open_dataset(file_path) as ds:
+            return int(ds.analogs_nb.values.sum())
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(read, [file_1, file_2] * 20))
+
+    assert results == results[:2] * 20
+    assert pool.stats()["handles"] == 1
+    pool.clear()
+
+
+def test_dataset_pool_opens_a_file_once():
+    pool = DatasetPool(max_handles=4)
+    opened = []
+    barrier = threading.Barrier(8)
+    open_file = dataset_pool._open
+
+    def slow_open(file_path):
+        opened.append(file_path)
+        time.sleep(0.2)
+        return open_file(file_path)
+
+    def read(file_path):
+        barrier.wait()
+        with pool.open_dataset(file_path) as ds:
+            return ds.method_id
+
+    with patch.object(dataset_pool, "_open", slow_open), \
+            ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(read, [file_1] * 8))
+
+    assert results == ["4Zo-CEP"] * 8
+    assert opened == [file_1]
+    assert pool.stats()["misses"] == 1
+    assert pool.stats()["hits"] == 7
+    pool.clear()
+
+
+def test_hdf5_accesses_outside_the_pool_take_the_lock(tmp_path):
+    file_path = str(tmp_path / os.path.basename(file_1))
+    shutil.copy(file_1, file_path)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        with dataset_pool.HDF5_LOCK:
+            attrs = executor.submit(utils.read_global_attributes, file_path)
+            mirror = executor.submit(array_mirror.build_mirror, file_path)
+            time.sleep(0.2)
+            assert not attrs.done()
+            assert not mirror.done()
+        assert attrs.result(timeout=10)["method_id"] == "4Zo-CEP"
+        assert os.path.isdir(mirror.result(timeout=10))
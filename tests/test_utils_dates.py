@@ -0,0 +1,36 @@
+import os
+from datetime import datetime
+
+import pytest
+import xarray as xr
+
+from atmoswing_api.app.utils import dataset_pool
+from atmoswing_api.app.utils.utils import decode_dates
+
+# Path to the data directory
+cwd = os.path.dirname(os.path.abspath(__file__))
+data_dir = os.path.join(cwd, "data")
+file_path = os.path.join(data_dir, "adn/2024/10/05/2024-10-05_00.4Zo-CEP.Alpes_Nord.nc")
+
+
+def test_decode_dates_mjd():
+    dates = decode_dates([60588.25, 43409.0], "days since 1858-11-17 00:00:00.0")
+    assert dates.tolist() == [datetime(2024, 10, 5, 6), datetime(1977, 9, 23)]
+
+
+def test_decode_dates_other_units():
+    assert decode_dates([6], "hours since 2024-10-05T00:00:00Z").tolist() == \
+           [datetime(2024, 10, 5, 6)]
+    with pytest.raises(ValueError):
+        decode_dates([6], "months since 2024-10-05")
+
+
+def test_decode_dates_matches_xarray_decoding():
+    with xr.open_dataset(file_path, engine="h5netcdf") as ds:
+        expected = ds.analog_dates.values[10:34].astype("datetime64[s]").tolist()
+
+    with dataset_pool.open_dataset(file_path) as ds:
+        dates = decode_dates(ds.analog_dates[10:34].values,
+                             ds.analog_dates.attrs["units"])
+
+    assert dates.tolist() == expected
@@ -0,0 +1,77 @@
+import asyncio
+import os
+import shutil
+import time
+
+import pytest
+
+from atmoswing_api.app.utils.executors import NamedExecutor, init_cpu_process
+from atmoswing_api.app.utils.utils import get_last_forecast_date
+
+# Path to the data directory
+cwd = os.path.dirname(os.path.abspath(__file__))
+data_dir = os.path.join(cwd, "data")
+
+
+@pytest.mark.asyncio
+async def test_thread_executor_queue_depth():
+    executor = NamedExecutor("test", "thread", max_workers=2)
+    try:
+        tasks = [asyncio.create_task(executor.run(time.sleep, 0.1)) for _ in range(5)]
+        await asyncio.sleep(0.05)
+        stats = executor.stats()
+        assert stats["running"] == 2
+        assert stats["queued"] == 3
+
+        await asyncio.gather(*tasks)
+        stats = executor.stats()
+        assert stats["running"] == 0
+        assert stats["max_in_flight"] == 5
+        assert stats["completed"] == 5
+    finally:
+        executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_executor_counts_failures():
+    executor = NamedExecutor("test", "thread", max_workers=1)
+    try:
+        with pytest.raises(ValueError):
+            await executor.run(int, "not a number")
+        assert executor.stats()["failed"] == 1
+    finally:
+        executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_process_executor():
+    executor = NamedExecutor("test", "process", max_workers=1)
+    try:
+        assert await executor.run(sum, [1, 2, 3]) == 6
+        assert executor.stats()["completed"] == 1
+    finally:
+        executor.shutdown()
+
+
+def test_executor_rejects_unknown_kind():
+    with pytest.raises(ValueError):
+        NamedExecutor("test", "fiber")
+
+
+@pytest.mark.asyncio
+async def test_process_executor_sees_new_forecasts(tmp_path):
+    day = tmp_path / "adn" / "2024" / "10" / "05"
+    day.mkdir(parents=True)
+    src = os.path.join(data_dir, "adn/2024/10/05/2024-10-05_00.4Zo-CEP.Alpes_Nord.nc")
+    shutil.copy(src, day / "2024-10-05_00.4Zo-CEP.Alpes_Nord.nc")
+
+    executor = NamedExecutor("test", "process", max_workers=1,
+                             initializer=init_cpu_process)
+    try:
+        assert await executor.run(get_last_forecast_date, str(tmp_path),
+                                  "adn") == "2024-10-05T00"
+        shutil.copy(src, day / "2024-10-05_12.4Zo-CEP.Alpes_Nord.nc")
+        assert await executor.run(get_last_forecast_date, str(tmp_path),
+                                  "adn") == "2024-10-05T12"
+    finally:
+        executor.shutdown()
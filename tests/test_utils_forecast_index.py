@@ -0,0 +1,48 @@
+import os
+import pytest
+from datetime import datetime
+
+from atmoswing_api.app.utils import dataset_pool
+from atmoswing_api.app.utils.forecast_index import ForecastFileIndex, get_index
+
+# Path to the data directory
+cwd = os.path.dirname(os.path.abspath(__file__))
+data_dir = os.path.join(cwd, "data")
+file_path = os.path.join(data_dir, "adn/2024/10/05/2024-10-05_00.4Zo-CEP.Alpes_Nord.nc")
+
+
+def test_forecast_index_row_indices():
+    with dataset_pool.open_dataset(file_path) as ds:
+        index = ForecastFileIndex(ds)
+
+    assert index.lead_times_nb == 8
+    assert index.get_rows(0) == (0, 24)
+    assert index.get_row_indices("2024-10-07") == (48, 72, datetime(2024, 10, 7))
+    # Between two target dates: the previous one is used
+    assert index.get_row_indices("2024-10-07T12") == (48, 72, datetime(2024, 10, 7))
+    # Outside the forecast period
+    assert index.get_row_indices("2024-10-20") is None
+    assert index.get_row_indices("2024-10-01") is None
+
+
+def test_forecast_index_entities():
+    with dataset_pool.open_dataset(file_path) as ds:
+        index = ForecastFileIndex(ds)
+
+    assert index.station_ids == [1, 2, 3, 4, 5, 6, 7, 8, 9]
+    assert index.get_entity_index(3) == 2
+    assert index.get_entity_index("3") == 2
+    assert index.relevant_station_idx == [0, 1, 2, 4, 5]
+    assert index.get_reference_index(10) == 3
+    with pytest.raises(ValueError, match="Entity not found"):
+        index.get_entity_index(42)
+    with pytest.raises(ValueError, match="normalize must be in"):
+        index.get_reference_index(7)
+
+
+def test_forecast_index_is_cached():
+    with dataset_pool.open_dataset(file_path) as ds:
+        index_1 = get_index(file_path, ds)
+        index_2 = get_index(file_path, ds)
+
+    assert index_1 is index_2
@@ -0,0 +1,175 @@
+import os
+from datetime import datetime
+from unittest.mock import patch
+
+import h5py
+import numpy as np
+import pytest
+
+from atmoswing_api.app.services.forecasts import \
+    _read_series_analog_values_percentiles, get_lagged_analog_values_percentiles, \
+    get_series_analog_values_percentiles_history
+from atmoswing_api.app.utils.catalog import forecast_catalog
+from atmoswing_api.app.utils.history_store import append_forecast, get_run_path, \
+    get_store_path, prune_history, read_entity_history
+
+# Path to the data directory
+cwd = os.path.dirname(os.path.abspath(__file__))
+data_dir = os.path.join(cwd, "data")
+file_names = ["2024-10-05_00.4Zo-CEP.Alpes_Nord.nc",
+              "2024-10-05_12.4Zo-CEP.Alpes_Nord.nc",
+              "2024-10-06_00.4Zo-CEP.Alpes_Nord.nc"]
+
+
+def _day_dir(file_name):
+    return os.path.join(*file_name[:10].split("-"))
+
+
+# Files copied into the temporary data directory (see conftest.py)
+forecast_files = [os.path.join("adn", _day_dir(f), f) for f in file_names]
+
+
+def _forecasts(tmp_data_dir):
+    return [(datetime.strptime(f[:13], "%Y-%m-%d_%H"),
+             str(tmp_data_dir / "adn" / _day_dir(f) / f)) for f in file_names]
+
+
+def test_get_store_path():
+    store_path = get_store_path("/data", "adn", "4Zo-CEP", "Alpes_Nord")
+    assert store_path == os.path.join("/data", ".history", "adn", "4Zo-CEP.Alpes_Nord")
+    assert get_run_path(store_path, datetime(2024, 10, 5, 12)) == \
+           os.path.join(store_path, "2024-10-05_12.h5")
+
+
+def test_append_and_read(tmp_data_dir):
+    forecasts = _forecasts(tmp_data_dir)
+    assert read_entity_history(str(tmp_data_dir), "adn", "4Zo-CEP", "Alpes_Nord", 3,
+                               forecasts, [20, 60, 90]) == {}
+
+    for _, file_path in forecasts:
+        assert append_forecast(str(tmp_data_dir), "adn", file_path)
+    # Unchanged files are not stored again
+    assert not append_forecast(str(tmp_data_dir), "adn", forecasts[0][1])
+
+    history = read_entity_history(str(tmp_data_dir), "adn", "4Zo-CEP", "Alpes_Nord",
+                                  3, forecasts, [20, 60, 90])
+    assert list(history) == [dt for dt, _ in forecasts]
+    for dt, file_path in forecasts:
+        expected = _read_series_analog_values_percentiles(file_path, dt, 3,
+                                                          [20, 60, 90])
+        target_dates, values = history[dt]
+        assert target_dates == expected["target_dates"]
+        for i, pc in enumerate(expected["series_percentiles"]):
+            assert values[i] == pytest.approx(pc["series_values"], rel=1e-5,
+                                              nan_ok=True)
+
+    # Non-integer percentiles are not stored
+    assert read_entity_history(str(tmp_data_dir), "adn", "4Zo-CEP", "Alpes_Nord", 3,
+                               forecasts, [12.5]) == {}
+
+
+def test_changed_files_are_not_read_from_the_store(tmp_data_dir):
+    forecasts = _forecasts(tmp_data_dir)
+    for _, file_path in forecasts:
+        append_forecast(str(tmp_data_dir), "adn", file_path)
+
+    st = os.stat(forecasts[1][1])
+    os.utime(forecasts[1][1], ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+    history = read_entity_history(str(tmp_data_dir), "adn", "4Zo-CEP", "Alpes_Nord",
+                                  3, forecasts, [50])
+    assert forecasts[1][0] not in history
+    assert len(history) == 2
+
+    # The run is rewritten when ingested again
+    assert append_forecast(str(tmp_data_dir), "adn", forecasts[1][1])
+    history = read_entity_history(str(tmp_data_dir), "adn", "4Zo-CEP", "Alpes_Nord",
+                                  3, forecasts, [50])
+    assert len(history) == 3
+
+
+def test_append_does_not_modify_stored_runs(tmp_data_dir):
+    forecasts = _forecasts(tmp_data_dir)
+    append_forecast(str(tmp_data_dir), "adn", forecasts[0][1])
+    store_path = get_store_path(str(tmp_data_dir), "adn", "4Zo-CEP", "Alpes_Nord")
+    run_path = get_run_path(store_path, forecasts[0][0])
+    st = os.stat(run_path)
+
+    with h5py.File(run_path, "r", locking=False) as h5:
+        append_forecast(str(tmp_data_dir), "adn", forecasts[1][1])
+        assert h5["values"].shape[0] == len(h5["station_ids"])
+
+    assert os.stat(run_path).st_mtime_ns == st.st_mtime_ns
+    assert sorted(os.listdir(store_path)) == ["2024-10-05_00.h5", "2024-10-05_12.h5"]
+
+
+def test_prune_history(tmp_data_dir):
+    forecasts = _forecasts(tmp_data_dir)
+    for _, file_path in forecasts:
+        append_forecast(str(tmp_data_dir), "adn", file_path)
+
+    assert prune_history(str(tmp_data_dir), datetime(2024, 10, 5, 12)) == 1
+    assert prune_history(str(tmp_data_dir), datetime(2024, 10, 5, 12)) == 0
+    history = read_entity_history(str(tmp_data_dir), "adn", "4Zo-CEP", "Alpes_Nord",
+                                  3, forecasts, [50])
+    assert list(history) == [dt for dt, _ in forecasts[1:]]
+
+    assert prune_history(str(tmp_data_dir), datetime(2024, 10, 7)) == 2
+    store_path = get_store_path(str(tmp_data_dir), "adn", "4Zo-CEP", "Alpes_Nord")
+    assert not os.path.exists(store_path)
+
+    # Stores of the previous version (a single file) are removed
+    with open(f"{store_path}.h5", "w"):
+        pass
+    assert prune_history(str(tmp_data_dir), datetime(2024, 10, 7)) == 0
+    assert not os.path.exists(f"{store_path}.h5")
+
+
+@pytest.mark.asyncio
+async def test_history_endpoints_use_the_store(tmp_data_dir):
+    forecast_catalog.invalidate()
+    expected = await get_series_analog_values_percentiles_history(
+        str(tmp_data_dir), region="adn", forecast_date="2024-10-06T00",
+        method="4Zo-CEP", configuration="Alpes_Nord", entity=3,
+        percentiles=[20, 60, 90], number=5)
+    assert len(expected["past_forecasts"]) == 2
+
+    for _, file_path in _forecasts(tmp_data_dir):
+        append_forecast(str(tmp_data_dir), "adn", file_path)
+    with patch("atmoswing_api.app.services.forecasts."
+               "_read_series_analog_values_percentiles") as mock_read:
+        result = await get_series_analog_values_percentiles_history(
+            str(tmp_data_dir), region="adn", forecast_date="2024-10-06T00",
+            method="4Zo-CEP", configuration="Alpes_Nord", entity=3,
+            percentiles=[20, 60, 90], number=5)
+        mock_read.assert_not_called()
+    for past, expected_past in zip(result["past_forecasts"],
+                                   expected["past_forecasts"]):
+        assert past["forecast_date"] == expected_past["forecast_date"]
+        for pc, expected_pc in zip(past["series_percentiles"],
+                                   expected_past["series_percentiles"]):
+            assert np.allclose(pc["series_values"], expected_pc["series_values"],
+                               rtol=1e-5, equal_nan=True)
+
+
+@pytest.mark.asyncio
+async def test_get_lagged_analog_values_percentiles():
+    # /forecasts/adn/2024-10-06T12/4Zo-CEP/Alpes_Nord/3/2024-10-08/analog-values-percentiles-history
+    result = await get_lagged_analog_values_percentiles(
+        data_dir, region="adn", forecast_date="2024-10-06T12", method="4Zo-CEP",
+        configuration="Alpes_Nord", entity=3, lead_time="2024-10-08",
+        percentiles=[20, 60, 90], number=5)
+
+    assert result["parameters"]["target_date"] == datetime(2024, 10, 8)
+    assert result["forecast_dates"][0] == datetime(2024, 10, 6, 12)
+    assert result["forecast_dates"] == sorted(result["forecast_dates"], reverse=True)
+    assert result["lead_times"][0] == 36
+    assert len(result["values"]) == len(result["forecast_dates"])
+    assert all(len(values) == 3 for values in result["values"])
+
+    # The value of the 2024-10-05T00 forecast for the 3rd day
+    single = await get_lagged_analog_values_percentiles(
+        data_dir, region="adn", forecast_date="2024-10-05T00", method="4Zo-CEP",
+        configuration="Alpes_Nord", entity=3, lead_time="2024-10-07",
+        percentiles=[20, 60, 90], number=0)
+    assert single["forecast_dates"] == [datetime(2024, 10, 5)]
+    assert single["values"][0] == pytest.approx([0.93, 23.14, 67.00], rel=1e-2)
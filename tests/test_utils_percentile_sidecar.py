@@ -0,0 +1,57 @@
+import os
+
+import numpy as np
+
+from atmoswing_api.app.services.forecasts import _get_series_analog_values_percentiles
+from atmoswing_api.app.utils.percentile_sidecar import SidecarCache, build_sidecar, \
+    get_percentiles, get_sidecar_path, is_sidecar_up_to_date
+
+file_name = "2024-10-05_00.4Zo-CEP.Alpes_Nord.nc"
+# Files copied into the temporary data directory (see conftest.py)
+forecast_files = [os.path.join("adn", "2024", "10", "05", file_name)]
+
+
+def test_get_sidecar_path():
+    assert get_sidecar_path("/data/adn/2024-10-05_00.4Zo-CEP.Alpes_Nord.nc") == \
+           "/data/adn/2024-10-05_00.4Zo-CEP.Alpes_Nord.pct.npz"
+
+
+def test_sidecar_matches_computed_percentiles(tmp_data_dir):
+    file_path = str(tmp_data_dir / "adn/2024/10/05" / file_name)
+    assert get_percentiles(file_path, [20, 60, 90]) is None
+
+    computed = _get_series_analog_values_percentiles(
+        str(tmp_data_dir), "adn", "2024-10-05", "4Zo-CEP", "Alpes_Nord", 3, [20, 60, 90])
+
+    build_sidecar(file_path)
+    assert is_sidecar_up_to_date(file_path)
+    assert get_percentiles(file_path, [20, 60, 90]).shape[2] == 3
+    # Non-integer percentiles cannot be looked up
+    assert get_percentiles(file_path, [20.5]) is None
+
+    from_sidecar = _get_series_analog_values_percentiles(
+        str(tmp_data_dir), "adn", "2024-10-05", "4Zo-CEP", "Alpes_Nord", 3, [20, 60, 90])
+    assert from_sidecar == computed
+
+
+def test_outdated_sidecar_is_ignored(tmp_data_dir):
+    file_path = str(tmp_data_dir / "adn/2024/10/05" / file_name)
+    build_sidecar(file_path)
+    cache = SidecarCache()
+    assert cache.get(file_path) is not None
+
+    # Rewriting the forecast file makes the sidecar outdated
+    st = os.stat(file_path)
+    os.utime(file_path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    assert not is_sidecar_up_to_date(file_path)
+    assert cache.get(file_path) is None
+
+
+def test_sidecar_cache_bytes_budget(tmp_data_dir):
+    file_path = str(tmp_data_dir / "adn/2024/10/05" / file_name)
+    build_sidecar(file_path)
+    grid = SidecarCache().get(file_path)
+
+    cache = SidecarCache(max_bytes=grid.nbytes - 1)
+    assert np.array_equal(cache.get(file_path), grid, equal_nan=True)
+    assert cache.nbytes == 0
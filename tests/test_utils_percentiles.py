@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from atmoswing_api.app.utils.utils import build_cumulative_frequency, \
+    compute_analog_percentiles
+
+
+def _reference_percentiles(values, analogs_nb, percentiles):
+    # Scalar implementation used by the services before vectorization
+    output = np.full((values.shape[0], len(analogs_nb), len(percentiles)), np.nan)
+    start_idx = 0
+    for i_lt, n in enumerate(analogs_nb):
+        freq = build_cumulative_frequency(n)
+        for i_ent in range(values.shape[0]):
+            values_sorted = np.sort(values[i_ent, start_idx:start_idx + n])
+            for i_pc, pc in enumerate(percentiles):
+                output[i_ent, i_lt, i_pc] = np.interp(pc / 100, freq, values_sorted)
+        start_idx += n
+    return output
+
+
+def test_compute_analog_percentiles_ragged_blocks():
+    rng = np.random.default_rng(42)
+    analogs_nb = [24, 24, 30, 30, 50, 1]
+    values = rng.gamma(0.5, 10, size=(7, sum(analogs_nb)))
+    percentiles = [0, 5, 20, 50, 60, 90, 100]
+
+    result = compute_analog_percentiles(values, analogs_nb, percentiles)
+
+    assert result.shape == (7, 6, 7)
+    assert result == pytest.approx(
+        _reference_percentiles(values, analogs_nb, percentiles), rel=1e-12)
+
+
+def test_compute_analog_percentiles_single_entity():
+    values = np.array([0.5, 2.9, 59.6, 0.0, 23.8, 1.3, 83.1, 64.2, 9.3, 37.1, 6.2, 0.2,
+                       6.3, 2.1, 31.9, 25.4, 0.0, 16.3, 39.1, 40.7, 8.0, 103.0, 12.0,
+                       0.8])
+
+    result = compute_analog_percentiles(values, [24], [20, 60, 90])
+
+    assert result.shape == (1, 1, 3)
+    assert result[0, 0, :] == pytest.approx([0.93, 23.14, 67.00], rel=1e-2)
+
+
+def test_compute_analog_percentiles_empty_lead_time():
+    values = np.arange(10, dtype=float)
+
+    result = compute_analog_percentiles(values, [0, 10], [50])
+
+    assert np.isnan(result[0, 0, 0])
+    assert result[0, 1, 0] == pytest.approx(4.5)
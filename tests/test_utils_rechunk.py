@@ -0,0 +1,63 @@
+import os
+
+import h5py
+import numpy as np
+import pytest
+import xarray as xr
+
+from atmoswing_api.app.utils.rechunk import measure_file, rechunk_file
+
+# Path to the data directory
+cwd = os.path.dirname(os.path.abspath(__file__))
+data_dir = os.path.join(cwd, "data")
+relative_path = os.path.join("zap", "2025", "09", "09",
+                             "2025-09-09_00.4Zo-ARPEGE.Cevennes_Delta_Rhone_Ouest.nc")
+file_path = os.path.join(data_dir, relative_path)
+# Files copied into the temporary data directory (see conftest.py)
+forecast_files = [relative_path]
+
+
+@pytest.fixture
+def tmp_file(tmp_data_dir):
+    return str(tmp_data_dir / relative_path)
+
+
+def test_rechunk_file(tmp_file):
+    mtime_ns = os.stat(tmp_file).st_mtime_ns
+    assert rechunk_file(tmp_file)
+    assert os.stat(tmp_file).st_mtime_ns == mtime_ns
+    # Rechunked files are not rewritten
+    assert not rechunk_file(tmp_file)
+
+    with h5py.File(tmp_file, "r") as h5:
+        assert h5["analog_values_raw"].chunks == (8, 92)
+        assert h5["analog_dates"].chunks is None
+
+    with xr.open_dataset(tmp_file, engine="h5netcdf", decode_times=False) as ds, \
+            xr.open_dataset(file_path, engine="h5netcdf",
+                            decode_times=False) as expected:
+        assert ds.attrs == expected.attrs
+        assert set(ds.variables) == set(expected.variables)
+        for name, variable in expected.variables.items():
+            assert ds[name].dims == variable.dims
+            assert ds[name].attrs == variable.attrs
+            np.testing.assert_array_equal(ds[name].values, variable.values)
+
+
+def test_rechunk_file_to_mirror(tmp_path):
+    output_path = str(tmp_path / "mirror" / os.path.basename(file_path))
+    assert rechunk_file(file_path, output_path, entities_per_chunk=1)
+
+    with h5py.File(output_path, "r") as h5:
+        assert h5["analog_values_raw"].chunks == (1, 92)
+
+
+def test_measure_file(tmp_file):
+    before = measure_file(file_path)
+    rechunk_file(tmp_file)
+    after = measure_file(tmp_file)
+
+    read, decoded = after["{entity}/{lead_time}/analog-values"]
+    assert read < before["{entity}/{lead_time}/analog-values"][0] / 10
+    assert decoded < before["{entity}/{lead_time}/analog-values"][1] / 10
+    assert after["{entity}/reference-values"] == before["{entity}/reference-values"]
@@ -0,0 +1,73 @@
+import json
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from atmoswing_api.app.models.models import AnalogsResponse, \
+    SeriesValuesPercentilesHistoryResponse, SeriesAnalogValuesResponse
+from atmoswing_api.app.utils.responses import build_payload, FastJSONResponse
+
+pytest.importorskip("orjson")
+
+
+def _pydantic_json(model, result):
+    return json.loads(model.model_validate(result).model_dump_json(exclude_none=True))
+
+
+def _fast_json(model, result):
+    return json.loads(FastJSONResponse(build_payload(model, result)).body)
+
+
+def test_fast_response_matches_pydantic_serialization():
+    result = {
+        "parameters": {"region": "adn", "forecast_date": datetime(2024, 10, 5),
+                       "method": "4Zo-CEP", "configuration": "Alpes_Nord",
+                       "entity_id": 3, "percentiles": [20, 90], "number": None},
+        "past_forecasts": [{
+            "forecast_date": datetime(2024, 10, 4, 12),
+            "target_dates": [datetime(2024, 10, 5), datetime(2024, 10, 6)],
+            "series_percentiles": [
+                {"percentile": 20, "series_values": np.array([0.123456, 1.0051])},
+                {"percentile": 90, "series_values": [12.34567, float("nan")]},
+            ]}],
+        "unexpected": "dropped as by the response model",
+    }
+
+    payload = _fast_json(SeriesValuesPercentilesHistoryResponse, result)
+
+    assert payload == _pydantic_json(SeriesValuesPercentilesHistoryResponse, result)
+    assert "number" not in payload["parameters"]
+    assert payload["past_forecasts"][0]["series_percentiles"][1]["series_values"] == \
+           [12.35, None]
+
+
+def test_fast_response_rounds_nested_lists_and_scalars():
+    series = {
+        "parameters": {"region": "adn"},
+        "target_dates": [datetime(2024, 10, 5, 6)],
+        "series_values": [[0.004, 2.5551], [3.14159, 1]],
+    }
+    assert _fast_json(SeriesAnalogValuesResponse, series) == \
+           _pydantic_json(SeriesAnalogValuesResponse, series)
+
+    analogs = {
+        "parameters": {"region": "adn"},
+        "analogs": [{"date": datetime(1977, 9, 23), "value": 4.567, "criteria": 37.7921,
+                     "rank": 1}],
+    }
+    assert _fast_json(AnalogsResponse, analogs)["analogs"][0] == {
+        "date": "1977-09-23T00:00:00", "value": 4.57, "criteria": 37.79, "rank": 1}
+
+
+def test_fast_response_parses_cached_dates():
+    # Results decoded from the JSON cache hold the dates as strings
+    result = {
+        "parameters": {"region": "adn", "forecast_date": "2024-10-05 00:00:00"},
+        "target_dates": ["2024-10-05 06:00:00"],
+        "series_values": [[1.0]],
+    }
+    payload = _fast_json(SeriesAnalogValuesResponse, result)
+
+    assert payload["parameters"]["forecast_date"] == "2024-10-05T00:00:00"
+    assert payload["target_dates"] == ["2024-10-05T06:00:00"]
@@ -0,0 +1,91 @@
+import os
+import shutil
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from atmoswing_api.app.utils.watcher import ForecastEvent, ForecastWatcher, \
+    _remove_prebuilt_results, make_invalidation_listener
+
+# Path to the data directory
+cwd = os.path.dirname(os.path.abspath(__file__))
+data_dir = os.path.join(cwd, "data")
+src = os.path.join(data_dir, "adn/2024/10/05/2024-10-05_00.4Zo-CEP.Alpes_Nord.nc")
+
+
+def test_watcher_poll_detects_changes(tmp_path):
+    day = tmp_path / "adn" / "2024" / "10" / "05"
+    day.mkdir(parents=True)
+    shutil.copy(src, day / "2024-10-05_00.4Zo-CEP.Alpes_Nord.nc")
+
+    watcher = ForecastWatcher(str(tmp_path), force_polling=True)
+    assert watcher.poll() == []
+
+    new_file = day / "2024-10-05_12.4Zo-CEP.Alpes_Nord.nc"
+    shutil.copy(src, new_file)
+    assert watcher.poll() == [ForecastEvent(
+        "created", str(new_file.resolve()), "adn", "2024-10-05T12")]
+    assert watcher.poll() == []
+
+    new_file.unlink()
+    assert watcher.poll() == [ForecastEvent(
+        "deleted", str(new_file.resolve()), "adn", "2024-10-05T12")]
+
+
+def test_watcher_to_event(tmp_path):
+    (tmp_path / "adn").mkdir()
+    watcher = ForecastWatcher(str(tmp_path))
+    watcher.poll()
+    region_path = str((tmp_path / "adn").resolve())
+
+    path = os.path.join(region_path, "2024/10/06/2024-10-06_18.4Zo-GFS.Alpes_Nord.nc")
+    assert watcher.to_event("modified", path) == ForecastEvent(
+        "modified", path, "adn", "2024-10-06T18")
+    assert watcher.to_event("created", os.path.join(region_path, "app.log")) is None
+    assert watcher.to_event("created", "/elsewhere/2024-10-06_18.4Zo-GFS.Alpes_Nord.nc") is None
+
+
+def test_remove_prebuilt_results(tmp_path):
+    prebuilt_dir = tmp_path / ".prebuilt_cache"
+    prebuilt_dir.mkdir()
+    (prebuilt_dir / "list_methods_adn_2024-10-05T00_abc.json").write_text("{}")
+    (prebuilt_dir / "series_synthesis_total_adn_2024-10-05T00_def.json").write_text("{}")
+    (prebuilt_dir / "list_methods_adn_2024-10-05T12_abc.json").write_text("{}")
+    (prebuilt_dir / "list_methods_zap_2024-10-05T00_abc.json").write_text("{}")
+
+    assert _remove_prebuilt_results(str(tmp_path), "adn", "2024-10-05T00") == 2
+    assert sorted(p.name for p in prebuilt_dir.iterdir()) == [
+        "list_methods_adn_2024-10-05T12_abc.json",
+        "list_methods_zap_2024-10-05T00_abc.json"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("claimed", [True, False])
+async def test_invalidation_listener_warms_up_after_invalidating(tmp_path, claimed):
+    calls = []
+    event = ForecastEvent("created", src, "adn", "2024-10-05T00")
+
+    async def invalidate_forecast(region, forecast_date):
+        calls.append(("invalidate", region, forecast_date))
+        return 0
+
+    async def warmup_forecast(data_dir, region, forecast_date, events):
+        calls.append(("warmup", region, forecast_date))
+
+    with patch("atmoswing_api.cache.invalidate_forecast", invalidate_forecast), \
+            patch("atmoswing_api.cache.claim_warmup",
+                  AsyncMock(return_value=claimed)) as claim, \
+            patch("atmoswing_api.app.utils.watcher._warmup_forecast",
+                  warmup_forecast):
+        listener = make_invalidation_listener(str(tmp_path), warmup=True)
+        await listener([event])
+        await listener([event])
+
+    # The second claim of the same change is the same name (elected once in Redis)
+    assert claim.await_args_list[0] == claim.await_args_list[1]
+    invalidated = ("invalidate", "adn", "2024-10-05T00")
+    warmed_up = ("warmup", "adn", "2024-10-05T00")
+    if claimed:
+        assert calls == [invalidated, warmed_up] * 2
+    else:
+        assert calls == [invalidated] * 2